@@ -0,0 +1,171 @@
+"""
+MongoDB index registry
+Every query shape issued by app/routes/*.py should be served by one of the indexes
+declared here. ensure_indexes() is applied at startup and is idempotent: indexes
+that already exist with the same definition are left untouched.
+"""
+from typing import Dict, List
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.services.sync_service import TOMBSTONE_RETENTION_DAYS
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        # get_current_user, login, signup, create_user
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        # get_users?role= and the user directory by role (keyset on name/_id)
+        IndexModel([("role", ASCENDING), ("name", ASCENDING), ("_id", ASCENDING)], name="role_name"),
+        # user directory without a role filter
+        IndexModel([("name", ASCENDING), ("_id", ASCENDING)], name="name"),
+        # GET /api/auth/users/search (anchored prefix regex, optional role)
+        IndexModel([("search_terms", ASCENDING), ("role", ASCENDING)], name="search_terms_role"),
+    ],
+    "appointments": [
+        # get_appointments for receptionist/admin (newest first, keyset on created_at/_id)
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at"),
+        # patient role, doctor panel ($in) and ?patient= filter; delete_user cascade
+        IndexModel(
+            [("patient_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="patient_created_at",
+        ),
+        # ?doctor= filter; delete_user cascade
+        IndexModel(
+            [("doctor_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="doctor_created_at",
+        ),
+        # ?from=&to= ranges: per doctor (?doctor= or doctor calendars), per patient (patient role,
+        # doctor panel $in, ?patient=) and across all appointments (receptionist/admin)
+        IndexModel([("doctor_id", ASCENDING), ("starts_at", ASCENDING)], name="doctor_starts_at"),
+        IndexModel([("patient_id", ASCENDING), ("starts_at", ASCENDING)], name="patient_starts_at"),
+        IndexModel([("starts_at", ASCENDING)], name="starts_at"),
+        # ?status= filter
+        IndexModel(
+            [("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="status_created_at",
+        ),
+        # double-booking guard: no two scheduled appointments may hold the same doctor slot
+        IndexModel(
+            [("slot_keys", ASCENDING)],
+            name="slot_keys_unique",
+            unique=True,
+            partialFilterExpression={"slot_keys": {"$exists": True}},
+        ),
+        # delta sync for receptionist/admin and the doctor panel ($in)
+        IndexModel([("change_seq", ASCENDING)], name="change_seq"),
+        # delta sync for the patient role
+        IndexModel([("patient_id", ASCENDING), ("change_seq", ASCENDING)], name="patient_change_seq"),
+        # GET /api/appointments/search
+        IndexModel([("reason", TEXT)], name="reason_text"),
+    ],
+    "comments": [
+        # batched comment loading and the delete_appointment cascade
+        IndexModel(
+            [("appointment_id", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)],
+            name="appointment_timestamp",
+        ),
+        # GET /api/appointments/search
+        IndexModel([("content", TEXT)], name="content_text"),
+    ],
+    "appointment_tombstones": [
+        # delta sync (same shapes as appointments.change_seq / patient_change_seq)
+        IndexModel([("change_seq", ASCENDING)], name="change_seq"),
+        IndexModel([("patient_id", ASCENDING), ("change_seq", ASCENDING)], name="patient_change_seq"),
+        # doctors also see deletions of their own appointments
+        IndexModel([("doctor_id", ASCENDING), ("change_seq", ASCENDING)], name="doctor_change_seq"),
+        # bounded retention: MongoDB purges tombstones after TOMBSTONE_RETENTION_DAYS
+        IndexModel(
+            [("deleted_at", ASCENDING)],
+            name="deleted_at_ttl",
+            expireAfterSeconds=TOMBSTONE_RETENTION_DAYS * 24 * 3600,
+        ),
+    ],
+    "revoked_tokens": [
+        # revocation catch-up queries of each worker
+        IndexModel([("revoked_at", ASCENDING)], name="revoked_at"),
+        # a revoked token only needs remembering until it would have expired
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "doctor_patients": [
+        # doctor panel lookup (covered: doctor_id -> patient_id) and counter updates
+        IndexModel([("doctor_id", ASCENDING), ("patient_id", ASCENDING)], name="doctor_patient_unique", unique=True),
+        # delete_user cascade when the deleted user is a patient
+        IndexModel([("patient_id", ASCENDING)], name="patient"),
+    ],
+}
+
+
+def _key(spec, weights: dict = None) -> tuple:
+    """
+    Comparable form of an index key
+    MongoDB reports text indexes as {_fts: "text", _ftsx: 1} plus a weights document,
+    so text fields are taken from the weights when given
+    """
+    spec = list(spec)
+    key = tuple(
+        (field, int(direction)) for field, direction in spec
+        if direction != TEXT and field not in ("_fts", "_ftsx")
+    )
+    text_fields = sorted(weights) if weights else sorted(field for field, direction in spec if direction == TEXT)
+    return key + tuple((field, TEXT) for field in text_fields)
+
+
+async def ensure_collection_indexes(db: AsyncIOMotorDatabase, collection: str) -> List[str]:
+    """Create the registered indexes of one collection, returning their names"""
+    models = INDEXES.get(collection, [])
+    if not models:
+        return []
+    return await db[collection].create_indexes(models)
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> Dict[str, List[str]]:
+    """
+    Apply the whole registry
+    A collection whose indexes cannot be built (e.g. duplicate emails blocking the unique index)
+    is reported and skipped so the API can still start
+    """
+    created = {}
+    for collection in INDEXES:
+        try:
+            created[collection] = await ensure_collection_indexes(db, collection)
+        except OperationFailure as e:
+            print(f"Could not create indexes on {collection}: {e}")
+            created[collection] = []
+    return created
+
+
+async def index_report(db: AsyncIOMotorDatabase) -> Dict[str, dict]:
+    """
+    Compare the registry with the live database
+    For each collection returns:
+    - missing: registered indexes that do not exist
+    - unregistered: existing indexes that are not in the registry
+    - unused: existing indexes with no recorded accesses since the server started
+    """
+    report = {}
+    for collection, models in INDEXES.items():
+        existing = await db[collection].index_information()
+        existing_keys = {_key(info["key"], info.get("weights")): name for name, info in existing.items()}
+        registered_keys = {_key(model.document["key"].items()): model.document["name"] for model in models}
+
+        usage = {}
+        try:
+            async for stats in db[collection].aggregate([{"$indexStats": {}}]):
+                usage[stats["name"]] = stats["accesses"]["ops"]
+        except OperationFailure:
+            # $indexStats needs the clusterMonitor role on some deployments
+            pass
+
+        report[collection] = {
+            "missing": [name for key, name in registered_keys.items() if key not in existing_keys],
+            "unregistered": [
+                name for key, name in existing_keys.items()
+                if key not in registered_keys and name != "_id_"
+            ],
+            "unused": [
+                name for name, ops in usage.items()
+                if ops == 0 and name != "_id_"
+            ],
+        }
+    return report
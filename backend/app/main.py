@@ -2,16 +2,30 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from app.database import connect_to_mongo, close_mongo_connection
-from app.routes import auth, appointments, ai
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.indexes import ensure_indexes
+from app.services.change_feed import change_feed
+from app.services.user_service import backfill_search_terms
+from app.utils.admission import login_admission
+from app.utils.cache import cache_stats
+from app.utils.executor import cpu_executor, executor_stats
+from app.routes import auth, appointments, ai, doctors
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Connect to MongoDB
     await connect_to_mongo()
+    # Create any missing indexes (no-op when they already exist)
+    await ensure_indexes(await get_database())
+    # Make users created outside the API findable by the typeahead
+    await backfill_search_terms(await get_database())
+    # One change stream per worker feeds every live-update connection
+    change_feed.start(await get_database())
     yield
-    # Shutdown: Close MongoDB connection
+    # Shutdown: Stop the change stream and the password-hashing threads, close MongoDB connection
+    await change_feed.stop()
+    cpu_executor.shutdown()
     await close_mongo_connection()
 
 
@@ -41,6 +55,7 @@ app.add_middleware(
 # Include routers
 app.include_router(auth.router)
 app.include_router(appointments.router)
+app.include_router(doctors.router)
 app.include_router(ai.router)
 
 
@@ -57,3 +72,9 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "CareFlowAI API", "database": "MongoDB"}
+
+
+@app.get("/metrics")
+async def metrics():
+    """In-process cache, CPU executor and login admission statistics of this worker"""
+    return {"caches": cache_stats(), "executors": executor_stats(), "login_admission": login_admission.stats()}
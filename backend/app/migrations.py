@@ -0,0 +1,29 @@
+"""
+Data migration registry
+Every structural change to stored documents is declared here with the next version number
+and applied online by scripts/migrate.py (see app/services/migration_service.py).
+Never renumber or remove a migration that may have run somewhere.
+"""
+from typing import List
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.services.migration_service import Migration
+from app.services.scheduling_service import starts_at_update
+
+
+async def set_starts_at(db: AsyncIOMotorDatabase, appointments: List[dict]) -> List[UpdateOne]:
+    return [starts_at_update(appointment) for appointment in appointments]
+
+
+MIGRATIONS: List[Migration] = [
+    # ?from=&to= range queries; until it is done, older appointments are missing from ranges
+    Migration(
+        version=1,
+        name="appointments_starts_at",
+        collection="appointments",
+        pending={"starts_at": {"$exists": False}},
+        projection={"date": 1, "time": 1},
+        build_updates=set_starts_at,
+    ),
+]
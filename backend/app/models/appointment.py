@@ -32,6 +32,7 @@ class AppointmentModel(BaseModel):
     reason: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: Optional[datetime] = None
+    version: int = 1
 
     class Config:
         populate_by_name = True
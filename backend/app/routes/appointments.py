@@ -1,27 +1,173 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status, Query
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Optional
+from typing import List, Literal, Optional, Union
 from bson import ObjectId
+from pymongo import InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+from collections import Counter
 from datetime import datetime
+import asyncio
+import json
 
 from app.database import get_db
 from app.schemas.appointment import (
     AppointmentCreate,
     AppointmentUpdate,
     AppointmentResponse,
+    AppointmentPage,
+    AppointmentChanges,
+    AppointmentSearchHit,
+    AppointmentSearchPage,
+    AppointmentSummary,
+    AppointmentSummaryPage,
+    BulkAppointmentRequest,
+    BulkAppointmentResponse,
+    BulkItemResult,
     CommentCreate,
+    CommentPage,
     CommentResponse,
 )
+from app.services.appointment_service import (
+    appointment_to_response,
+    appointment_to_summary,
+    build_appointment_responses,
+    comment_summary_update,
+    comment_to_response,
+    load_comments_for_appointments,
+    visible_appointments_query,
+)
+from app.services.change_feed import change_feed
+from app.services.search_service import next_offset, search_appointments
+from app.services.version_service import (
+    appointment_scopes,
+    bump_scopes,
+    get_scope_versions,
+    list_cache,
+    list_etag,
+    list_scopes,
+    visibility_key,
+)
+from app.services.sync_service import (
+    change_fields,
+    current_change_seq,
+    decode_sync_token,
+    encode_sync_token,
+    load_changes,
+    next_change_seq,
+    record_tombstones,
+    tombstone_query,
+)
+from app.services.panel_service import add_to_panel, apply_panel_deltas, move_in_panel, remove_from_panel
+from app.services.scheduling_service import (
+    DOUBLE_BOOKING_DETAIL,
+    BatchBookings,
+    apply_schedule_fields,
+    conflict_detector,
+    ensure_bookable,
+    parse_range_bound,
+    starts_at_filter,
+)
 from app.utils.auth import get_current_user, require_role
+from app.utils.etag import etag_matches, make_etag, match_versions, raise_missing_or_conflict, version_filter
+from app.utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    encode_cursor,
+    keyset_filter,
+    keyset_sort,
+    merge_filters,
+)
 
 router = APIRouter(prefix="/api/appointments", tags=["Appointments"])
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 100
+# Comment line sent on idle event streams so proxies do not close them
+EVENTS_KEEPALIVE_SECONDS = 15
+# Updating any of these fields re-runs the double-booking check
+SCHEDULE_FIELDS = {"doctor_id", "date", "time", "status"}
+
+
+async def build_list_query(
+    db: AsyncIOMotorDatabase,
+    current_user: dict,
+    status_filter: Optional[str],
+    patient_filter: Optional[str],
+    doctor_filter: Optional[str],
+    starts_from: Optional[str] = None,
+    starts_to: Optional[str] = None,
+) -> dict:
+    """
+    Role-based scoping plus the optional status/patient/doctor filters of the list endpoints,
+    and the from/to range on starts_at (see parse_range_bound)
+    """
+    # Role-based filtering
+    query = await visible_appointments_query(db, current_user)
+
+    # Additional filters
+    if status_filter and status_filter != "all":
+        query["status"] = status_filter
+
+    if patient_filter:
+        query["patient_id"] = patient_filter
+
+    if doctor_filter:
+        query["doctor_id"] = doctor_filter
+
+    range_filter = starts_at_filter(parse_range_bound(starts_from), parse_range_bound(starts_to, end=True))
+    return merge_filters(query, range_filter)
+
+
+def build_update_doc(appointment_data: AppointmentUpdate, now: datetime) -> dict:
+    """Build the $set document for the fields present in an AppointmentUpdate"""
+    update_doc = {"updated_at": now}
+    for field, value in appointment_data.model_dump(exclude_none=True).items():
+        update_doc[field] = value
+    return update_doc
 
-@router.get("", response_model=List[AppointmentResponse])
+
+def ndjson_response(db: AsyncIOMotorDatabase, query: dict, comments_limit: Optional[int] = None) -> StreamingResponse:
+    """
+    Stream every appointment matching query as NDJSON, newest first
+    Appointments are read from the cursor and written out in small batches
+    (one batched comments query per batch), so memory use stays flat however large the result is
+    """
+    cursor = db.appointments.find(query).sort(keyset_sort("created_at")).batch_size(STREAM_BATCH_SIZE)
+
+    async def generate():
+        batch = []
+        async for appointment in cursor:
+            batch.append(appointment)
+            if len(batch) >= STREAM_BATCH_SIZE:
+                for item in await build_appointment_responses(db, batch, comments_limit):
+                    yield item.model_dump_json() + "\n"
+                batch = []
+        if batch:
+            for item in await build_appointment_responses(db, batch, comments_limit):
+                yield item.model_dump_json() + "\n"
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.get(
+    "",
+    response_model=Union[AppointmentPage, AppointmentSummaryPage, List[AppointmentResponse], List[AppointmentSummary]],
+)
 async def get_appointments(
+    response: Response,
+    view: Literal["full", "summary"] = Query("full"),
     status_filter: Optional[str] = Query(None, alias="status"),
     patient_filter: Optional[str] = Query(None, alias="patient"),
     doctor_filter: Optional[str] = Query(None, alias="doctor"),
+    starts_from: Optional[str] = Query(None, alias="from"),
+    starts_to: Optional[str] = Query(None, alias="to"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    fetch_all: bool = Query(False, alias="all"),
+    comments_limit: Optional[int] = Query(None, ge=0, le=MAX_PAGE_SIZE),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
@@ -30,83 +176,245 @@ async def get_appointments(
     - Patient: Only their appointments (filtered by patient_id)
     - Doctor: Only their patients' appointments across all doctors (filtered by patient list)
     - Receptionist/Admin: All appointments with optional patient/doctor filters
+
+    Results are ordered newest first and paginated with an opaque cursor:
+    pass the returned next_cursor back as ?cursor= to get the following page.
+    ?all=true returns every matching appointment in one response, as a bare array (as before pagination).
+    With Accept: application/x-ndjson the full result is streamed instead (see /stream).
+
+    ?comments_limit=K inlines only the latest K comments of each appointment (comment_count
+    still gives the total); page through the rest with GET /{id}/comments.
+    ?view=summary returns each appointment without its comments, with comment_count and a
+    last_comment preview instead; it does not read the comments collection at all.
+
+    ?from= and ?to= keep appointments starting in that range: ISO dates (whole days, `to`
+    inclusive) or ISO datetimes; values without an offset are in the clinic's time zone.
+
+    Every response carries an ETag; send it back as If-None-Match to get 304 Not Modified
+    while nothing in the list's scope has been written.
     """
-    query = {}
-    user_role = current_user["role"]
-    user_id = str(current_user["_id"])
+    # Only the scope counters are read to answer a conditional request
+    versions = await get_scope_versions(db, list_scopes(current_user))
+    etag = make_etag(list_etag(
+        versions, str(current_user["_id"]), current_user["role"],
+        view, status_filter, patient_filter, doctor_filter, starts_from, starts_to,
+        limit, cursor, fetch_all, comments_limit, accept,
+    ))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    if accept and NDJSON_MEDIA_TYPE in accept:
+        query = await build_list_query(
+            db, current_user, status_filter, patient_filter, doctor_filter, starts_from, starts_to
+        )
+        stream = ndjson_response(db, query, comments_limit)
+        stream.headers["ETag"] = etag
+        return stream
 
-    # Role-based filtering
-    if user_role == "patient":
-        # Patient can only see their own appointments
-        query["patient_id"] = user_id
-    elif user_role == "doctor":
-        # Doctor can see all appointments for their patients (across all doctors)
-        # First, get all unique patient IDs from appointments where this doctor is the doctor
-        doctor_appointments = await db.appointments.find({"doctor_id": user_id}).to_list(length=None)
-        patient_ids = list(set([appt["patient_id"] for appt in doctor_appointments]))
-
-        # Now get all appointments for these patients
-        if patient_ids:
-            query["patient_id"] = {"$in": patient_ids}
-        else:
-            # Doctor has no patients yet
-            query["patient_id"] = {"$in": []}
-    # For receptionist and admin, no additional filter is added (they see all)
+    response.headers["ETag"] = etag
 
-    # Additional filters
-    if status_filter and status_filter != "all":
-        query["status"] = status_filter
+    async def load_page() -> Union[AppointmentPage, AppointmentSummaryPage, list]:
+        query = await build_list_query(
+            db, current_user, status_filter, patient_filter, doctor_filter, starts_from, starts_to
+        )
+        sort = keyset_sort("created_at")
+
+        if fetch_all:
+            appointments = await db.appointments.find(query).sort(sort).to_list(length=None)
+            if view == "summary":
+                return [appointment_to_summary(a) for a in appointments]
+            return await build_appointment_responses(db, appointments, comments_limit)
+
+        # Keyset pagination: seek past the cursor instead of skipping, so every page costs the same
+        page_query = merge_filters(query, keyset_filter("created_at", cursor))
+        appointments = await db.appointments.find(page_query).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+
+        next_cursor = None
+        if len(appointments) > limit:
+            appointments = appointments[:limit]
+            last = appointments[-1]
+            next_cursor = encode_cursor(last["created_at"], last["_id"])
+
+        if view == "summary":
+            return AppointmentSummaryPage(
+                items=[appointment_to_summary(a) for a in appointments],
+                next_cursor=next_cursor,
+            )
 
-    if patient_filter:
-        query["patient_id"] = patient_filter
+        # Fetch comments for all appointments in a single batched query
+        return AppointmentPage(
+            items=await build_appointment_responses(db, appointments, comments_limit),
+            next_cursor=next_cursor,
+        )
 
-    if doctor_filter:
-        query["doctor_id"] = doctor_filter
+    # Identical requests from users who see the same list share one cached result;
+    # the scope versions in the key make writes on any worker miss it
+    cache_key = (
+        "appointments",
+        view,
+        visibility_key(current_user),
+        tuple(sorted(versions.items())),
+        None if status_filter == "all" else status_filter,
+        patient_filter,
+        doctor_filter,
+        starts_from,
+        starts_to,
+        None if fetch_all else limit,
+        None if fetch_all else cursor,
+        fetch_all,
+        None if view == "summary" else comments_limit,
+    )
+    return await list_cache.get_or_load(cache_key, load_page, tags=versions.keys())
 
-    appointments = await db.appointments.find(query).sort("created_at", -1).to_list(length=None)
-
-    # Fetch comments for each appointment
-    response = []
-    for appointment in appointments:
-        comments = await db.comments.find({"appointment_id": str(appointment["_id"])}).to_list(length=None)
-
-        response.append(
-            AppointmentResponse(
-                id=str(appointment["_id"]),
-                patient_id=appointment["patient_id"],
-                patient_name=appointment["patient_name"],
-                doctor_id=appointment["doctor_id"],
-                doctor_name=appointment["doctor_name"],
-                date=appointment["date"],
-                time=appointment["time"],
-                status=appointment["status"],
-                reason=appointment.get("reason"),
-                comments=[
-                    CommentResponse(
-                        id=str(c["_id"]),
-                        user_id=c["user_id"],
-                        user_name=c["user_name"],
-                        user_role=c["user_role"],
-                        content=c["content"],
-                        timestamp=c["timestamp"],
-                    )
-                    for c in comments
-                ],
+
+@router.get("/stream")
+async def stream_appointments(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    patient_filter: Optional[str] = Query(None, alias="patient"),
+    doctor_filter: Optional[str] = Query(None, alias="doctor"),
+    starts_from: Optional[str] = Query(None, alias="from"),
+    starts_to: Optional[str] = Query(None, alias="to"),
+    comments_limit: Optional[int] = Query(None, ge=0, le=MAX_PAGE_SIZE),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Export appointments as newline-delimited JSON (one AppointmentResponse per line)
+    Same filters (including from/to), comments_limit and role-based visibility as GET /api/appointments,
+    without pagination
+    """
+    query = await build_list_query(
+        db, current_user, status_filter, patient_filter, doctor_filter, starts_from, starts_to
+    )
+    return ndjson_response(db, query, comments_limit)
+
+
+@router.get("/changes", response_model=AppointmentChanges)
+async def get_appointment_changes(
+    since: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Appointments changed and deleted since a sync token, with the same role-based visibility as the list
+    - Without ?since=: returns no changes, only a token for "now". Get it before loading the full
+      list (GET /api/appointments?all=true), then poll with ?since=<next_since>.
+    - items: appointments created or modified since the token (full documents, including comments)
+    - deleted: IDs of appointments deleted since the token
+    - has_more: more changes are waiting; call again right away with next_since
+    Returns 410 if the token is older than the tombstone retention: reload the full list.
+    """
+    now = datetime.utcnow()
+    if since is None:
+        return AppointmentChanges(items=[], deleted=[], next_since=encode_sync_token(await current_change_seq(db), now))
+
+    since_seq = decode_sync_token(since, now)
+    visible_query = await visible_appointments_query(db, current_user)
+    changed, deleted, last_seq, has_more = await load_changes(
+        db, visible_query, tombstone_query(visible_query, current_user), since_seq, limit, now
+    )
+
+    return AppointmentChanges(
+        items=await build_appointment_responses(db, changed),
+        deleted=[str(tombstone["_id"]) for tombstone in deleted],
+        next_since=encode_sync_token(last_seq, now),
+        has_more=has_more,
+    )
+
+
+@router.get("/search", response_model=AppointmentSearchPage)
+async def search_appointments_route(
+    q: str = Query(..., min_length=1, max_length=200),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Full-text search over appointment reasons and comments, best matches first
+    Same role-based visibility as GET /api/appointments. Each hit is an appointment summary
+    with its relevance score and up to 3 of its matching comments.
+    Supports MongoDB text search syntax: "exact phrase" and -excluded terms.
+    Paginate with ?offset= (next_offset of the previous page).
+    """
+    query = await build_list_query(db, current_user, status_filter, None, None)
+    page, total = await search_appointments(db, query, q, offset, limit)
+
+    return AppointmentSearchPage(
+        items=[
+            AppointmentSearchHit(
+                **appointment_to_summary(appointment).model_dump(),
+                score=round(score, 4),
+                matching_comments=matching_comments,
             )
+            for appointment, score, matching_comments in page
+        ],
+        total=total,
+        next_offset=next_offset(offset, limit, total),
+    )
+
+
+@router.get("/events")
+async def appointment_events(
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Live appointment and comment changes as server-sent events
+    Each event is named after its collection ("appointments" or "comments") and its data is JSON:
+    {"collection", "operation": insert|update|replace|delete, "id", "appointment_id" (comments),
+    "data" (the appointment without comments, or the comment; absent for deletes)}.
+    Only changes the user could see through GET /api/appointments are sent.
+    A "reset" event means events were lost (slow client or stream restart): re-fetch the list and reconnect.
+    """
+    if change_feed.available is False:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Live updates require MongoDB to run as a replica set",
         )
 
-    return response
+    subscription = change_feed.subscribe(current_user)
+
+    async def generate():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    yield "event: reset\ndata: {}\n\n"
+                    break
+                yield f"event: {event['collection']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            change_feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("", response_model=AppointmentResponse, status_code=status.HTTP_201_CREATED)
 async def create_appointment(
     appointment_data: AppointmentCreate,
+    response: Response,
     db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: dict = Depends(require_role("doctor", "receptionist", "admin")),
 ):
     """
     Create a new appointment (requires doctor, receptionist, or admin role)
+    Returns 409 if the doctor already has a scheduled appointment overlapping this one.
     """
+    schedule = await ensure_bookable(
+        db, appointment_data.doctor_id, appointment_data.date, appointment_data.time, "scheduled"
+    )
+
+    now = datetime.utcnow()
     appointment_doc = {
         "_id": ObjectId(),
         "patient_id": appointment_data.patient_id,
@@ -117,23 +425,270 @@ async def create_appointment(
         "time": appointment_data.time,
         "reason": appointment_data.reason,
         "status": "scheduled",
-        "created_at": datetime.utcnow(),
+        "created_at": now,
         "updated_at": None,
+        "version": 1,
+        "starts_at": schedule["starts_at"],
+        "slot_keys": schedule["slot_keys"],
+        **change_fields(await next_change_seq(db), now),
     }
 
-    await db.appointments.insert_one(appointment_doc)
-
-    return AppointmentResponse(
-        id=str(appointment_doc["_id"]),
-        patient_id=appointment_doc["patient_id"],
-        patient_name=appointment_doc["patient_name"],
-        doctor_id=appointment_doc["doctor_id"],
-        doctor_name=appointment_doc["doctor_name"],
-        date=appointment_doc["date"],
-        time=appointment_doc["time"],
-        status=appointment_doc["status"],
-        reason=appointment_doc["reason"],
-        comments=[],
+    try:
+        await db.appointments.insert_one(appointment_doc)
+    except DuplicateKeyError:
+        # Lost a race for the same slot (possibly on another worker)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=DOUBLE_BOOKING_DETAIL,
+        )
+    conflict_detector.record(
+        appointment_doc["doctor_id"], str(appointment_doc["_id"]),
+        appointment_doc["date"], appointment_doc["time"], appointment_doc["status"],
+    )
+    await add_to_panel(db, appointment_doc["doctor_id"], appointment_doc["patient_id"])
+    await bump_scopes(db, appointment_scopes(appointment_doc["patient_id"], doctor_ids=[appointment_doc["doctor_id"]]))
+
+    response.headers["ETag"] = make_etag(appointment_doc["version"])
+    return appointment_to_response(appointment_doc, [])
+
+
+@router.post("/bulk", response_model=BulkAppointmentResponse)
+async def bulk_appointments(
+    bulk_request: BulkAppointmentRequest,
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    current_user: dict = Depends(require_role("doctor", "receptionist", "admin")),
+):
+    """
+    Create, update and change the status of many appointments in one request
+    (requires doctor, receptionist, or admin role)
+
+    All valid operations are sent to MongoDB as a single bulk_write.
+    - ordered=true (default): processing stops at the first failing operation,
+      later operations are reported as skipped (424)
+    - ordered=false: every operation is attempted independently
+    Each operation gets its own result (201 created, 200 updated, 400/404/409/412 on failure).
+    """
+    operations = bulk_request.operations
+    ordered = bulk_request.ordered
+    now = datetime.utcnow()
+    results: List[Optional[BulkItemResult]] = [None] * len(operations)
+    # One sequence number per operation for delta sync, reserved in a single round trip
+    first_seq = await next_change_seq(db, len(operations))
+
+    # Pre-images of every targeted appointment in one query: used to report 404/412
+    # per item (bulk_write only returns aggregate counts), for the double-booking checks
+    # and to maintain the doctor panels
+    target_ids = [
+        ObjectId(operation.id)
+        for operation in operations
+        if operation.op != "create" and ObjectId.is_valid(operation.id)
+    ]
+    existing = {}
+    if target_ids:
+        async for appointment in db.appointments.find(
+            {"_id": {"$in": target_ids}},
+            {"doctor_id": 1, "patient_id": 1, "date": 1, "time": 1, "status": 1, "version": 1},
+        ):
+            existing[str(appointment["_id"])] = appointment
+
+    requests = []
+    request_indexes = []
+    request_panel_changes = []
+    # State of each written appointment after its operation, for the in-memory conflict index
+    request_states = []
+    batch_bookings = BatchBookings()
+
+    for index, operation in enumerate(operations):
+        try:
+            if operation.op == "create":
+                data = operation.appointment
+                schedule = await ensure_bookable(db, data.doctor_id, data.date, data.time, "scheduled")
+                batch_bookings.check(data.doctor_id, None, data.date, data.time, "scheduled")
+                appointment_doc = {
+                    "_id": ObjectId(),
+                    "patient_id": data.patient_id,
+                    "patient_name": data.patient_name,
+                    "doctor_id": data.doctor_id,
+                    "doctor_name": data.doctor_name,
+                    "date": data.date,
+                    "time": data.time,
+                    "reason": data.reason,
+                    "status": "scheduled",
+                    "created_at": now,
+                    "updated_at": None,
+                    "version": 1,
+                    "starts_at": schedule["starts_at"],
+                    "slot_keys": schedule["slot_keys"],
+                    **change_fields(first_seq + index, now),
+                }
+                requests.append(InsertOne(appointment_doc))
+                request_indexes.append(index)
+                request_panel_changes.append([((data.doctor_id, data.patient_id), 1)])
+                request_states.append(appointment_doc)
+                batch_bookings.record(
+                    data.doctor_id, str(appointment_doc["_id"]), data.date, data.time, "scheduled"
+                )
+                results[index] = BulkItemResult(
+                    index=index, op=operation.op, id=str(appointment_doc["_id"]), status_code=status.HTTP_201_CREATED
+                )
+                continue
+
+            current = existing.get(operation.id)
+            if not ObjectId.is_valid(operation.id):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid appointment ID")
+            if current is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Appointment not found")
+            if operation.version is not None and operation.version != current.get("version", 0):
+                raise HTTPException(
+                    status_code=status.HTTP_412_PRECONDITION_FAILED,
+                    detail="Precondition failed: resource has been modified",
+                )
+
+            if operation.op == "update":
+                update_doc = build_update_doc(operation.changes, now)
+            else:
+                update_doc = {"updated_at": now, "status": operation.status}
+
+            # Pin every write to the version that was read, so nothing that changed
+            # since the pre-read is overwritten (see the matched_count check below)
+            write_filter = {"_id": ObjectId(operation.id), **match_versions([current.get("version", 0)])}
+            update = {"$set": {**update_doc, **change_fields(first_seq + index, now)}, "$inc": {"version": 1}}
+
+            merged = {**current, **update_doc}
+            if SCHEDULE_FIELDS & update_doc.keys():
+                schedule = await ensure_bookable(
+                    db, merged["doctor_id"], merged["date"], merged["time"], merged["status"],
+                    exclude_id=operation.id,
+                    schedule_changed=bool({"date", "time"} & update_doc.keys()),
+                )
+                batch_bookings.check(
+                    merged["doctor_id"], operation.id, merged["date"], merged["time"], merged["status"]
+                )
+                apply_schedule_fields(update, schedule)
+        except HTTPException as e:
+            results[index] = BulkItemResult(
+                index=index,
+                op=operation.op,
+                id=getattr(operation, "id", None),
+                status_code=e.status_code,
+                error=e.detail,
+            )
+            if ordered:
+                break
+            continue
+
+        requests.append(UpdateOne(write_filter, update))
+        request_indexes.append(index)
+
+        old_pair = (current["doctor_id"], current["patient_id"])
+        new_pair = (merged["doctor_id"], merged["patient_id"])
+        request_panel_changes.append([(new_pair, 1), (old_pair, -1)] if new_pair != old_pair else [])
+
+        # Later operations in the same batch see this one's effect
+        merged["version"] = current.get("version", 0) + 1
+        existing[operation.id] = merged
+        request_states.append(merged)
+        batch_bookings.record(merged["doctor_id"], operation.id, merged["date"], merged["time"], merged["status"])
+
+        results[index] = BulkItemResult(
+            index=index, op=operation.op, id=operation.id, status_code=status.HTTP_200_OK
+        )
+
+    failed_requests = set()
+    if requests:
+        try:
+            matched = (await db.appointments.bulk_write(requests, ordered=ordered)).matched_count
+            write_errors = []
+        except BulkWriteError as e:
+            # The updates that did run are counted in the error details
+            matched = e.details.get("nMatched", 0)
+            write_errors = e.details.get("writeErrors", [])
+
+        for write_error in write_errors:
+            failed_requests.add(write_error["index"])
+            index = request_indexes[write_error["index"]]
+            duplicate_slot = write_error.get("code") == 11000
+            results[index] = BulkItemResult(
+                index=index,
+                op=results[index].op,
+                id=results[index].id,
+                status_code=status.HTTP_409_CONFLICT if duplicate_slot else status.HTTP_400_BAD_REQUEST,
+                error=DOUBLE_BOOKING_DETAIL if duplicate_slot else write_error.get("errmsg", "Write failed"),
+            )
+        if ordered and failed_requests:
+            # MongoDB stops an ordered bulk write at the first error
+            first_failure = min(failed_requests)
+            for request_index in range(first_failure + 1, len(requests)):
+                results[request_indexes[request_index]] = None
+                failed_requests.add(request_index)
+
+        # An update that matched nothing lost a race with a concurrent write. Versions cannot tell
+        # which (the other writer bumps to the same number), but every operation wrote its own
+        # change_seq: an appointment whose change_seq is not that of its last update here was
+        # written by someone else, so none of this batch's updates to it are counted
+        update_requests = [i for i, r in enumerate(requests) if isinstance(r, UpdateOne) and i not in failed_requests]
+        if matched < len(update_requests):
+            last_seqs = {
+                str(request_states[i]["_id"]): first_seq + request_indexes[i] for i in update_requests
+            }
+            final_seqs = {
+                str(appointment["_id"]): appointment.get("change_seq")
+                async for appointment in db.appointments.find(
+                    {"_id": {"$in": [ObjectId(i) for i in last_seqs]}}, {"change_seq": 1}
+                )
+            }
+            for request_index in update_requests:
+                appointment_id = str(request_states[request_index]["_id"])
+                if final_seqs.get(appointment_id) != last_seqs[appointment_id]:
+                    failed_requests.add(request_index)
+                    index = request_indexes[request_index]
+                    results[index] = BulkItemResult(
+                        index=index,
+                        op=results[index].op,
+                        id=results[index].id,
+                        status_code=status.HTTP_409_CONFLICT,
+                        error="Appointment was modified concurrently, please retry",
+                    )
+
+    for request_index, state in enumerate(request_states):
+        if request_index not in failed_requests:
+            conflict_detector.record(
+                state["doctor_id"], str(state["_id"]), state["date"], state["time"], state["status"]
+            )
+
+    panel_deltas = Counter()
+    for request_index, changes in enumerate(request_panel_changes):
+        if request_index in failed_requests:
+            continue
+        for pair, delta in changes:
+            panel_deltas[pair] += delta
+    await apply_panel_deltas(db, panel_deltas)
+
+    written_states = [state for request_index, state in enumerate(request_states) if request_index not in failed_requests]
+    written_patients = [patient_id for (_, patient_id), _ in panel_deltas.items()]
+    written_patients += [state["patient_id"] for state in written_states]
+    # Doctors an appointment moved away from are in the panel deltas too
+    written_doctors = [doctor_id for (doctor_id, _), _ in panel_deltas.items()]
+    written_doctors += [state["doctor_id"] for state in written_states]
+    if len(failed_requests) < len(requests):
+        await bump_scopes(db, appointment_scopes(*written_patients, doctor_ids=written_doctors))
+
+    for index, operation in enumerate(operations):
+        if results[index] is None:
+            results[index] = BulkItemResult(
+                index=index,
+                op=operation.op,
+                id=getattr(operation, "id", None),
+                status_code=status.HTTP_424_FAILED_DEPENDENCY,
+                error="Not executed: an earlier operation failed",
+            )
+
+    return BulkAppointmentResponse(
+        created=sum(1 for r in results if r.status_code == status.HTTP_201_CREATED),
+        updated=sum(1 for r in results if r.status_code == status.HTTP_200_OK),
+        failed=sum(1 for r in results if r.error and r.status_code != status.HTTP_424_FAILED_DEPENDENCY),
+        skipped=sum(1 for r in results if r.status_code == status.HTTP_424_FAILED_DEPENDENCY),
+        results=results,
     )
 
 
@@ -141,11 +696,15 @@ async def create_appointment(
 async def update_appointment(
     appointment_id: str,
     appointment_data: AppointmentUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: dict = Depends(require_role("doctor", "receptionist", "admin")),
 ):
     """
     Update an appointment (requires doctor, receptionist, or admin role)
+    Send If-Match with the appointment's ETag (its version) to get 412 instead of
+    overwriting a concurrent change.
     """
     if not ObjectId.is_valid(appointment_id):
         raise HTTPException(
@@ -153,71 +712,91 @@ async def update_appointment(
             detail="Invalid appointment ID",
         )
 
-    appointment = await db.appointments.find_one({"_id": ObjectId(appointment_id)})
+    # Build update document
+    now = datetime.utcnow()
+    update_doc = build_update_doc(appointment_data, now)
 
-    if not appointment:
+    write_filter = {"_id": ObjectId(appointment_id), **version_filter(if_match)}
+    update = {"$set": {**update_doc, **change_fields(await next_change_seq(db), now)}, "$inc": {"version": 1}}
+
+    if SCHEDULE_FIELDS & update_doc.keys():
+        # Changing doctor, date, time or status needs the merged schedule for the
+        # double-booking check, so read the current state and pin the write to that version
+        current = await db.appointments.find_one(
+            write_filter, {"doctor_id": 1, "date": 1, "time": 1, "status": 1, "version": 1}
+        )
+        if not current:
+            await raise_missing_or_conflict(
+                db.appointments, ObjectId(appointment_id), if_match, "Appointment not found"
+            )
+        merged = {**current, **update_doc}
+        schedule = await ensure_bookable(
+            db, merged["doctor_id"], merged["date"], merged["time"], merged["status"],
+            exclude_id=appointment_id,
+            schedule_changed=bool({"date", "time"} & update_doc.keys()),
+        )
+        apply_schedule_fields(update, schedule)
+        write_filter.update(match_versions([current.get("version", 0)]))
+
+    # Single round trip: the version check, the write and the read happen in one command.
+    # The pre-image is returned because the doctor panel needs the previous doctor/patient pair;
+    # the post-image is exactly the pre-image with update_doc applied and the version bumped.
+    try:
+        appointment = await db.appointments.find_one_and_update(
+            write_filter,
+            update,
+            return_document=ReturnDocument.BEFORE,
+        )
+    except DuplicateKeyError:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Appointment not found",
+            status_code=status.HTTP_409_CONFLICT,
+            detail=DOUBLE_BOOKING_DETAIL,
         )
 
-    # Build update document
-    update_doc = {"updated_at": datetime.utcnow()}
-    if appointment_data.patient_id is not None:
-        update_doc["patient_id"] = appointment_data.patient_id
-    if appointment_data.patient_name is not None:
-        update_doc["patient_name"] = appointment_data.patient_name
-    if appointment_data.doctor_id is not None:
-        update_doc["doctor_id"] = appointment_data.doctor_id
-    if appointment_data.doctor_name is not None:
-        update_doc["doctor_name"] = appointment_data.doctor_name
-    if appointment_data.date is not None:
-        update_doc["date"] = appointment_data.date
-    if appointment_data.time is not None:
-        update_doc["time"] = appointment_data.time
-    if appointment_data.reason is not None:
-        update_doc["reason"] = appointment_data.reason
-    if appointment_data.status is not None:
-        update_doc["status"] = appointment_data.status
-
-    await db.appointments.update_one(
-        {"_id": ObjectId(appointment_id)},
-        {"$set": update_doc}
+    if not appointment:
+        # Pinned to the version read above: still there means someone else wrote it in between
+        if (
+            SCHEDULE_FIELDS & update_doc.keys()
+            and not if_match
+            and await db.appointments.count_documents({"_id": ObjectId(appointment_id)}, limit=1)
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Appointment was modified concurrently, please retry",
+            )
+        await raise_missing_or_conflict(
+            db.appointments, ObjectId(appointment_id), if_match, "Appointment not found"
+        )
+
+    updated_appointment = {**appointment, **update["$set"], "version": appointment.get("version", 0) + 1}
+    conflict_detector.record(
+        updated_appointment["doctor_id"], appointment_id,
+        updated_appointment["date"], updated_appointment["time"], updated_appointment["status"],
     )
 
-    # Fetch updated appointment
-    updated_appointment = await db.appointments.find_one({"_id": ObjectId(appointment_id)})
+    await move_in_panel(
+        db,
+        appointment["doctor_id"],
+        appointment["patient_id"],
+        appointment_data.doctor_id,
+        appointment_data.patient_id,
+    )
+    await bump_scopes(db, appointment_scopes(
+        appointment["patient_id"], updated_appointment["patient_id"],
+        doctor_ids=[appointment["doctor_id"], updated_appointment["doctor_id"]],
+    ))
 
     # Fetch comments
-    comments = await db.comments.find({"appointment_id": appointment_id}).to_list(length=None)
-
-    return AppointmentResponse(
-        id=str(updated_appointment["_id"]),
-        patient_id=updated_appointment["patient_id"],
-        patient_name=updated_appointment["patient_name"],
-        doctor_id=updated_appointment["doctor_id"],
-        doctor_name=updated_appointment["doctor_name"],
-        date=updated_appointment["date"],
-        time=updated_appointment["time"],
-        status=updated_appointment["status"],
-        reason=updated_appointment.get("reason"),
-        comments=[
-            CommentResponse(
-                id=str(c["_id"]),
-                user_id=c["user_id"],
-                user_name=c["user_name"],
-                user_role=c["user_role"],
-                content=c["content"],
-                timestamp=c["timestamp"],
-            )
-            for c in comments
-        ],
-    )
+    comments_by_appointment = await load_comments_for_appointments(db, [appointment_id])
+
+    response.headers["ETag"] = make_etag(updated_appointment["version"])
+    return appointment_to_response(updated_appointment, comments_by_appointment[appointment_id])
 
 
 @router.delete("/{appointment_id}")
 async def delete_appointment(
     appointment_id: str,
+    if_match: Optional[str] = Header(None),
     db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: dict = Depends(require_role("doctor", "receptionist", "admin")),
 ):
@@ -230,21 +809,71 @@ async def delete_appointment(
             detail="Invalid appointment ID",
         )
 
-    appointment = await db.appointments.find_one({"_id": ObjectId(appointment_id)})
+    # Delete appointment (the returned document replaces a separate existence check)
+    appointment = await db.appointments.find_one_and_delete(
+        {"_id": ObjectId(appointment_id), **version_filter(if_match)},
+        projection={"doctor_id": 1, "patient_id": 1},
+    )
 
     if not appointment:
+        await raise_missing_or_conflict(
+            db.appointments, ObjectId(appointment_id), if_match, "Appointment not found"
+        )
+
+    conflict_detector.forget(appointment_id)
+    await record_tombstones(db, [appointment], datetime.utcnow())
+
+    # Delete associated comments
+    await db.comments.delete_many({"appointment_id": appointment_id})
+    await remove_from_panel(db, appointment["doctor_id"], appointment["patient_id"])
+    await bump_scopes(db, appointment_scopes(appointment["patient_id"], doctor_ids=[appointment["doctor_id"]]))
+
+    return {"success": True, "message": "Appointment deleted successfully"}
+
+
+@router.get("/{appointment_id}/comments", response_model=CommentPage)
+async def get_comments(
+    appointment_id: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Comment thread of an appointment, oldest first, paginated with an opaque cursor
+    (pass next_cursor back as ?cursor=). Only for appointments the user can see in the list.
+    """
+    if not ObjectId.is_valid(appointment_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid appointment ID",
+        )
+
+    visible_query = await visible_appointments_query(db, current_user)
+    if not await db.appointments.count_documents(
+        merge_filters(visible_query, {"_id": ObjectId(appointment_id)}), limit=1
+    ):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Appointment not found",
         )
 
-    # Delete associated comments first
-    await db.comments.delete_many({"appointment_id": appointment_id})
+    # Keyset pagination on (timestamp, _id), served by the appointment_timestamp index
+    page_query = merge_filters(
+        {"appointment_id": appointment_id},
+        keyset_filter("timestamp", cursor, descending=False),
+    )
+    comments = await db.comments.find(page_query).sort(
+        keyset_sort("timestamp", descending=False)
+    ).limit(limit + 1).to_list(length=limit + 1)
 
-    # Delete appointment
-    await db.appointments.delete_one({"_id": ObjectId(appointment_id)})
+    next_cursor = None
+    if len(comments) > limit:
+        comments = comments[:limit]
+        last = comments[-1]
+        next_cursor = encode_cursor(last["timestamp"], last["_id"])
 
-    return {"success": True, "message": "Appointment deleted successfully"}
+    return CommentPage(items=[comment_to_response(c) for c in comments], next_cursor=next_cursor)
 
 
 @router.post("/{appointment_id}/comments", response_model=CommentResponse, status_code=status.HTTP_201_CREATED)
@@ -263,15 +892,7 @@ async def add_comment(
             detail="Invalid appointment ID",
         )
 
-    # Verify appointment exists
-    appointment = await db.appointments.find_one({"_id": ObjectId(appointment_id)})
-
-    if not appointment:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Appointment not found",
-        )
-
+    now = datetime.utcnow()
     comment_doc = {
         "_id": ObjectId(),
         "appointment_id": appointment_id,
@@ -279,16 +900,33 @@ async def add_comment(
         "user_name": current_user["name"],
         "user_role": current_user["role"],
         "content": comment_data.content,
-        "timestamp": datetime.utcnow(),
+        "timestamp": now,
     }
 
+    # The comment goes in first, so comment_count and last_comment never describe a comment
+    # that was not stored. One atomic update then verifies the appointment exists, counts the
+    # comment, keeps the latest-comment preview and marks the appointment changed for delta sync
     await db.comments.insert_one(comment_doc)
+    try:
+        appointment = await db.appointments.find_one_and_update(
+            {"_id": ObjectId(appointment_id)},
+            {
+                "$set": change_fields(await next_change_seq(db), now),
+                **comment_summary_update(comment_doc),
+            },
+            projection={"patient_id": 1},
+        )
+    except PyMongoError:
+        await db.comments.delete_one({"_id": comment_doc["_id"]})
+        raise
 
-    return CommentResponse(
-        id=str(comment_doc["_id"]),
-        user_id=comment_doc["user_id"],
-        user_name=comment_doc["user_name"],
-        user_role=comment_doc["user_role"],
-        content=comment_doc["content"],
-        timestamp=comment_doc["timestamp"],
-    )
+    if not appointment:
+        await db.comments.delete_one({"_id": comment_doc["_id"]})
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Appointment not found",
+        )
+
+    await bump_scopes(db, appointment_scopes(appointment["patient_id"]))
+
+    return comment_to_response(comment_doc)
@@ -1,17 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.security import HTTPAuthorizationCredentials
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
-from typing import List
+from pymongo import ReturnDocument
+from typing import List, Optional
+from datetime import datetime
 
 from app.database import get_db
-from app.schemas.user import UserLogin, UserSignup, UserResponse, Token, UserCreate
+from app.services.panel_service import remove_user_from_panels
+from app.services.scheduling_service import conflict_detector
+from app.services.sync_service import record_tombstones
+from app.services.user_service import (
+    TYPEAHEAD_DEFAULT_LIMIT,
+    TYPEAHEAD_MAX_LIMIT,
+    USER_PROJECTION,
+    count_users,
+    directory_query,
+    load_directory_page,
+    search_users,
+    user_search_fields,
+)
+from app.services.version_service import (
+    USERS_SCOPE,
+    appointment_scopes,
+    bump_scopes,
+    get_scope_versions,
+    list_cache,
+    list_etag,
+)
+from app.schemas.user import UserLogin, UserSignup, UserResponse, UserPage, Token, UserCreate, RefreshRequest
 from app.utils.auth import (
-    verify_password,
-    get_password_hash,
+    check_password,
+    hash_password,
     create_access_token,
+    create_refresh_token,
     get_current_user,
+    refresh_token_subject,
+    security,
+    verify_token,
+    token_claims,
+    invalidate_users,
     require_role,
 )
+from app.utils.tokens import revoke_token
+from app.utils.admission import client_ip, login_admission
+from app.utils.etag import etag_matches, make_etag, raise_missing_or_conflict, version_filter
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
@@ -51,16 +85,17 @@ async def signup(
             "_id": ObjectId(user_id),
             "email": user_data.email,
             "name": user_data.name,
-            "hashed_password": get_password_hash(user_data.password),
+            "hashed_password": await hash_password(user_data.password),
             "role": "patient",  # New signups are always patients
+            **user_search_fields(user_data.name, user_data.email),
         }
 
         await db.users.insert_one(user_doc)
+        invalidate_users(user_doc["email"])
+        await bump_scopes(db, [USERS_SCOPE])
 
         # Create access token
-        access_token = create_access_token(
-            data={"sub": user_doc["email"], "role": user_doc["role"]}
-        )
+        access_token = create_access_token(data=token_claims(user_doc))
 
         user_response = UserResponse(
             id=str(user_doc["_id"]),
@@ -73,6 +108,7 @@ async def signup(
             access_token=access_token,
             token_type="bearer",
             user=user_response,
+            refresh_token=create_refresh_token(user_doc),
         )
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -91,11 +127,14 @@ async def signup(
 @router.post("/login", response_model=Token)
 async def login(
     user_credentials: UserLogin,
+    request: Request,
     db: AsyncIOMotorDatabase = Depends(get_db),
 ):
     """
     Login endpoint - authenticates user and returns JWT token
+    Attempts are rate limited per email and per client IP (429 with Retry-After).
     """
+    login_admission.check(user_credentials.email, client_ip(request))
     user = await db.users.find_one({"email": user_credentials.email})
 
     # For demo purposes, if user doesn't exist, create one
@@ -105,14 +144,20 @@ async def login(
             "_id": ObjectId(user_id),
             "email": user_credentials.email,
             "name": user_credentials.email.split("@")[0],
-            "hashed_password": get_password_hash(user_credentials.password),
             "role": user_credentials.role,
         }
+        async with login_admission.slot():
+            user_doc["hashed_password"] = await hash_password(user_credentials.password)
+        user_doc.update(user_search_fields(user_doc["name"], user_doc["email"]))
         await db.users.insert_one(user_doc)
+        invalidate_users(user_doc["email"])
+        await bump_scopes(db, [USERS_SCOPE])
         user = user_doc
     else:
         # Verify password
-        if not verify_password(user_credentials.password, user["hashed_password"]):
+        async with login_admission.slot():
+            password_ok = await check_password(user_credentials.password, user["hashed_password"])
+        if not password_ok:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
@@ -125,10 +170,10 @@ async def login(
                 detail="Role mismatch",
             )
 
+    login_admission.succeeded(user["email"])
+
     # Create access token
-    access_token = create_access_token(
-        data={"sub": user["email"], "role": user["role"]}
-    )
+    access_token = create_access_token(data=token_claims(user))
 
     user_response = UserResponse(
         id=str(user["_id"]),
@@ -141,14 +186,60 @@ async def login(
         access_token=access_token,
         token_type="bearer",
         user=user_response,
+        refresh_token=create_refresh_token(user),
+    )
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(
+    request: RefreshRequest,
+    db: AsyncIOMotorDatabase = Depends(get_db),
+):
+    """
+    Exchange a refresh token for a new access token (and a new refresh token)
+    The user is re-read, so the new token carries their current name and role;
+    a deleted user or a revoked refresh token gets 401.
+    """
+    email = refresh_token_subject(await verify_token(db, request.refresh_token))
+
+    user = await db.users.find_one({"email": email}, {"hashed_password": 0})
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return Token(
+        access_token=create_access_token(data=token_claims(user)),
+        token_type="bearer",
+        user=UserResponse(
+            id=str(user["_id"]),
+            email=user["email"],
+            name=user["name"],
+            role=user["role"],
+        ),
+        refresh_token=create_refresh_token(user),
     )
 
 
 @router.post("/logout")
-async def logout(current_user: dict = Depends(get_current_user)):
+async def logout(
+    request: Optional[RefreshRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
     """
-    Logout endpoint - invalidates token (client-side token removal)
+    Logout endpoint - revokes the access token on every worker
+    Send {"refresh_token": ...} as the body to revoke the refresh token as well.
     """
+    await revoke_token(db, credentials.credentials, await verify_token(db, credentials.credentials))
+    if request is not None:
+        refresh_token = request.refresh_token
+        payload = await verify_token(db, refresh_token)
+        refresh_token_subject(payload)
+        await revoke_token(db, refresh_token, payload)
     return {"success": True, "message": "Successfully logged out"}
 
 
@@ -167,19 +258,102 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
 
 @router.get("/users", response_model=List[UserResponse])
 async def get_users(
+    response: Response,
     role: str = None,
+    if_none_match: Optional[str] = Header(None),
     db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
     """
     Get all users with optional role filter
+    Send the returned ETag as If-None-Match to get 304 while no user has changed
     """
-    query = {}
-    if role:
-        query["role"] = role
+    versions = await get_scope_versions(db, [USERS_SCOPE])
+    etag = make_etag(list_etag(versions, role))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    async def load_users() -> List[UserResponse]:
+        # Project server-side: password hashes never leave MongoDB
+        users = await db.users.find(directory_query(role), USER_PROJECTION).to_list(length=None)
+
+        return [
+            UserResponse(
+                id=str(user["_id"]),
+                email=user["email"],
+                name=user["name"],
+                role=user["role"],
+            )
+            for user in users
+        ]
+
+    return await list_cache.get_or_load(
+        ("users", versions[USERS_SCOPE], role or None), load_users, tags=[USERS_SCOPE]
+    )
 
-    users = await db.users.find(query).to_list(length=None)
 
+@router.get("/users/directory", response_model=UserPage)
+async def get_user_directory(
+    response: Response,
+    role: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Paginated user directory ordered by name, with optional role filter
+    Pass next_cursor back as ?cursor= for the following page; total counts every matching user.
+    Supports If-None-Match like GET /users.
+    """
+    versions = await get_scope_versions(db, [USERS_SCOPE])
+    version = versions[USERS_SCOPE]
+    etag = make_etag(list_etag(versions, "directory", role, limit, cursor))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    async def load_page() -> UserPage:
+        users, next_cursor = await load_directory_page(db, role, limit, cursor)
+        # The count is shared by every page of the same listing until a user changes
+        total = await list_cache.get_or_load(
+            ("users_count", version, role or None), lambda: count_users(db, role), tags=[USERS_SCOPE]
+        )
+        return UserPage(
+            items=[
+                UserResponse(
+                    id=str(user["_id"]),
+                    email=user["email"],
+                    name=user["name"],
+                    role=user["role"],
+                )
+                for user in users
+            ],
+            next_cursor=next_cursor,
+            total=total,
+        )
+
+    return await list_cache.get_or_load(
+        ("users_directory", version, role or None, limit, cursor), load_page, tags=[USERS_SCOPE]
+    )
+
+
+@router.get("/users/search", response_model=List[UserResponse])
+async def search_users_route(
+    q: str = Query(..., min_length=1, max_length=100),
+    role: Optional[str] = None,
+    limit: int = Query(TYPEAHEAD_DEFAULT_LIMIT, ge=1, le=TYPEAHEAD_MAX_LIMIT),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Typeahead for the patient and doctor pickers: users whose name words or email start with q
+    Every word of q must match ("sarah jo" finds "Dr. Sarah Johnson"); case and accents are ignored.
+    Returns at most `limit` users, names starting with q first.
+    """
+    users = await search_users(db, q, role, limit)
     return [
         UserResponse(
             id=str(user["_id"]),
@@ -221,11 +395,14 @@ async def create_user(
         "_id": ObjectId(user_id),
         "email": user_data.email,
         "name": user_data.name,
-        "hashed_password": get_password_hash(user_data.password),
+        "hashed_password": await hash_password(user_data.password),
         "role": user_data.role,
+        **user_search_fields(user_data.name, user_data.email),
     }
 
     await db.users.insert_one(user_doc)
+    invalidate_users(user_doc["email"])
+    await bump_scopes(db, [USERS_SCOPE])
 
     return UserResponse(
         id=str(user_doc["_id"]),
@@ -239,11 +416,14 @@ async def create_user(
 async def update_user_role(
     user_id: str,
     role: str,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: dict = Depends(require_role("admin")),
 ):
     """
     Update a user's role (admin only)
+    Send If-Match with the user's ETag to get 412 instead of overwriting a concurrent change.
     """
     if not ObjectId.is_valid(user_id):
         raise HTTPException(
@@ -259,23 +439,20 @@ async def update_user_role(
             detail=f"Invalid role. Must be one of: {', '.join(valid_roles)}",
         )
 
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
-
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found",
-        )
-
-    # Update role
-    await db.users.update_one(
-        {"_id": ObjectId(user_id)},
-        {"$set": {"role": role}}
+    # Update role and fetch the updated user in one round trip
+    updated_user = await db.users.find_one_and_update(
+        {"_id": ObjectId(user_id), **version_filter(if_match)},
+        {"$set": {"role": role}, "$inc": {"version": 1}},
+        projection={"hashed_password": 0},
+        return_document=ReturnDocument.AFTER,
     )
 
-    # Fetch updated user
-    updated_user = await db.users.find_one({"_id": ObjectId(user_id)})
+    if not updated_user:
+        await raise_missing_or_conflict(db.users, ObjectId(user_id), if_match, "User not found")
+    invalidate_users(updated_user["email"])
+    await bump_scopes(db, [USERS_SCOPE])
 
+    response.headers["ETag"] = make_etag(updated_user["version"])
     return UserResponse(
         id=str(updated_user["_id"]),
         email=updated_user["email"],
@@ -306,23 +483,36 @@ async def delete_user(
             detail="Cannot delete your own account",
         )
 
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
+    # Delete the user (the returned document replaces a separate existence check)
+    user = await db.users.find_one_and_delete(
+        {"_id": ObjectId(user_id)},
+        projection={"name": 1, "email": 1},
+    )
 
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
+    invalidate_users(user["email"])
 
-    # Delete the user
-    await db.users.delete_one({"_id": ObjectId(user_id)})
-
-    # Also delete all appointments for this user
-    await db.appointments.delete_many({
+    # Also delete all appointments for this user, leaving tombstones for delta sync
+    user_appointments = {
         "$or": [
             {"patient_id": user_id},
             {"doctor_id": user_id}
         ]
-    })
+    }
+    deleted_appointments = await db.appointments.find(
+        user_appointments, {"patient_id": 1, "doctor_id": 1}
+    ).to_list(length=None)
+    await record_tombstones(db, deleted_appointments, datetime.utcnow())
+    await db.appointments.delete_many(user_appointments)
+    await remove_user_from_panels(db, user_id)
+    conflict_detector.invalidate()
+    await bump_scopes(db, [USERS_SCOPE] + appointment_scopes(
+        user_id, *(appointment["patient_id"] for appointment in deleted_appointments),
+        doctor_ids=[user_id, *(appointment["doctor_id"] for appointment in deleted_appointments)],
+    ))
 
     return {"success": True, "message": f"User {user['name']} deleted successfully"}
@@ -0,0 +1,93 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import List
+from bson import ObjectId
+from datetime import date
+
+from app.database import get_db
+from app.schemas.doctor import DoctorAvailability
+from app.services.availability_service import MAX_AVAILABILITY_DAYS, get_availability
+from app.services.scheduling_service import APPOINTMENT_DURATION_MINUTES, SLOT_MINUTES
+from app.utils.auth import get_current_user
+
+router = APIRouter(prefix="/api/doctors", tags=["Doctors"])
+
+
+def validate_range(date_from: date, date_to: date):
+    if date_to < date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'to' must not be before 'from'",
+        )
+    if (date_to - date_from).days + 1 > MAX_AVAILABILITY_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range too large (maximum {MAX_AVAILABILITY_DAYS} days)",
+        )
+
+
+async def validate_doctors(db: AsyncIOMotorDatabase, doctor_ids: List[str]):
+    if not all(ObjectId.is_valid(doctor_id) for doctor_id in doctor_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid doctor ID",
+        )
+    found = await db.users.count_documents(
+        {"_id": {"$in": [ObjectId(doctor_id) for doctor_id in doctor_ids]}, "role": "doctor"}
+    )
+    if found != len(set(doctor_ids)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Doctor not found",
+        )
+
+
+@router.get("/availability", response_model=List[DoctorAvailability])
+async def get_doctors_availability(
+    doctor_ids: str = Query(..., alias="ids", description="Comma-separated doctor IDs"),
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Free time of several doctors between two dates (inclusive)
+    """
+    ids = list(dict.fromkeys(doctor_id.strip() for doctor_id in doctor_ids.split(",") if doctor_id.strip()))
+    validate_range(date_from, date_to)
+    await validate_doctors(db, ids)
+
+    availability = await get_availability(db, ids, date_from, date_to)
+    return [
+        DoctorAvailability(
+            doctor_id=doctor_id,
+            slot_minutes=SLOT_MINUTES,
+            appointment_minutes=APPOINTMENT_DURATION_MINUTES,
+            days=availability[doctor_id],
+        )
+        for doctor_id in ids
+    ]
+
+
+@router.get("/{doctor_id}/availability", response_model=DoctorAvailability)
+async def get_doctor_availability(
+    doctor_id: str,
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Free time of a doctor between two dates (inclusive):
+    configured working hours minus scheduled appointments, as per-day time ranges
+    """
+    validate_range(date_from, date_to)
+    await validate_doctors(db, [doctor_id])
+
+    availability = await get_availability(db, [doctor_id], date_from, date_to)
+    return DoctorAvailability(
+        doctor_id=doctor_id,
+        slot_minutes=SLOT_MINUTES,
+        appointment_minutes=APPOINTMENT_DURATION_MINUTES,
+        days=availability[doctor_id],
+    )
@@ -2,16 +2,34 @@ from app.schemas.user import (
     UserCreate,
     UserLogin,
     UserResponse,
+    UserPage,
     Token,
     TokenData,
+    RefreshRequest,
 )
 from app.schemas.appointment import (
     AppointmentCreate,
     AppointmentUpdate,
     AppointmentResponse,
+    AppointmentPage,
+    AppointmentChanges,
+    AppointmentSummary,
+    AppointmentSummaryPage,
+    AppointmentSearchHit,
+    AppointmentSearchPage,
+    CommentPreview,
+    CommentPage,
+    BulkAppointmentRequest,
+    BulkAppointmentResponse,
+    BulkItemResult,
     CommentCreate,
     CommentResponse,
 )
+from app.schemas.doctor import (
+    FreeRange,
+    DayAvailability,
+    DoctorAvailability,
+)
 from app.schemas.ai import (
     AnalyzeReportResponse,
     ChatRequest,
@@ -25,13 +43,29 @@ __all__ = [
     "UserCreate",
     "UserLogin",
     "UserResponse",
+    "UserPage",
     "Token",
     "TokenData",
+    "RefreshRequest",
     "AppointmentCreate",
     "AppointmentUpdate",
     "AppointmentResponse",
+    "AppointmentPage",
+    "AppointmentChanges",
+    "AppointmentSummary",
+    "AppointmentSummaryPage",
+    "AppointmentSearchHit",
+    "AppointmentSearchPage",
+    "CommentPreview",
+    "CommentPage",
+    "BulkAppointmentRequest",
+    "BulkAppointmentResponse",
+    "BulkItemResult",
     "CommentCreate",
     "CommentResponse",
+    "FreeRange",
+    "DayAvailability",
+    "DoctorAvailability",
     "AnalyzeReportResponse",
     "ChatRequest",
     "ChatResponse",
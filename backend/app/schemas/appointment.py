@@ -1,7 +1,10 @@
-from pydantic import BaseModel
-from typing import Literal, List, Optional
+from pydantic import BaseModel, Field
+from typing import Annotated, Literal, List, Optional, Union
 from datetime import datetime
 
+# Maximum number of operations accepted by POST /api/appointments/bulk
+BULK_MAX_OPERATIONS = 500
+
 
 class CommentBase(BaseModel):
     content: str
@@ -50,7 +53,109 @@ class AppointmentUpdate(BaseModel):
 class AppointmentResponse(AppointmentBase):
     id: str
     status: Literal["scheduled", "completed", "cancelled"]
+    version: int = 0
+    # Start of the appointment in UTC (derived from date/time in the clinic's time zone)
+    starts_at: Optional[datetime] = None
     comments: List[CommentResponse] = []
+    # Total number of comments; may exceed len(comments) when inline comments are capped
+    comment_count: int = 0
 
     class Config:
         from_attributes = True
+
+
+class CommentPage(BaseModel):
+    items: List[CommentResponse]
+    next_cursor: Optional[str] = None
+
+
+class CommentPreview(BaseModel):
+    id: str
+    user_name: str
+    user_role: str
+    content: str
+    timestamp: datetime
+
+
+class AppointmentSummary(AppointmentBase):
+    """Appointment without its comments: only their number and a preview of the latest one"""
+    id: str
+    status: Literal["scheduled", "completed", "cancelled"]
+    version: int = 0
+    starts_at: Optional[datetime] = None
+    comment_count: int = 0
+    last_comment: Optional[CommentPreview] = None
+
+
+class AppointmentPage(BaseModel):
+    items: List[AppointmentResponse]
+    next_cursor: Optional[str] = None
+
+
+class AppointmentSummaryPage(BaseModel):
+    items: List[AppointmentSummary]
+    next_cursor: Optional[str] = None
+
+
+class AppointmentSearchHit(AppointmentSummary):
+    score: float
+    matching_comments: List[CommentPreview] = []
+
+
+class AppointmentSearchPage(BaseModel):
+    items: List[AppointmentSearchHit]
+    total: int
+    next_offset: Optional[int] = None
+
+
+class AppointmentChanges(BaseModel):
+    items: List[AppointmentResponse]
+    deleted: List[str]
+    next_since: str
+    has_more: bool = False
+
+
+class BulkCreateOperation(BaseModel):
+    op: Literal["create"]
+    appointment: AppointmentCreate
+
+
+class BulkUpdateOperation(BaseModel):
+    op: Literal["update"]
+    id: str
+    changes: AppointmentUpdate
+    version: Optional[int] = None
+
+
+class BulkStatusOperation(BaseModel):
+    op: Literal["status"]
+    id: str
+    status: Literal["scheduled", "completed", "cancelled"]
+    version: Optional[int] = None
+
+
+BulkOperation = Annotated[
+    Union[BulkCreateOperation, BulkUpdateOperation, BulkStatusOperation],
+    Field(discriminator="op"),
+]
+
+
+class BulkAppointmentRequest(BaseModel):
+    operations: List[BulkOperation] = Field(..., min_length=1, max_length=BULK_MAX_OPERATIONS)
+    ordered: bool = True
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    op: str
+    id: Optional[str] = None
+    status_code: int
+    error: Optional[str] = None
+
+
+class BulkAppointmentResponse(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    skipped: int
+    results: List[BulkItemResult]
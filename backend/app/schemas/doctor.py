@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import List
+
+
+class FreeRange(BaseModel):
+    start: str
+    end: str
+
+
+class DayAvailability(BaseModel):
+    date: str
+    free: List[FreeRange] = []
+
+
+class DoctorAvailability(BaseModel):
+    doctor_id: str
+    slot_minutes: int
+    appointment_minutes: int
+    days: List[DayAvailability]
@@ -0,0 +1,200 @@
+"""
+Appointment Service Module
+Shared helpers for loading appointments and their comments from MongoDB
+and turning the raw documents into API response models.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from bson import ObjectId
+
+from app.schemas.appointment import AppointmentResponse, AppointmentSummary, CommentPreview, CommentResponse
+from app.services.panel_service import get_panel_patient_ids
+
+# Characters of the latest comment kept on the appointment for summary lists
+COMMENT_PREVIEW_LENGTH = 120
+
+
+async def visible_appointments_query(db: AsyncIOMotorDatabase, current_user: dict) -> dict:
+    """
+    Build the base appointments query for what the current user is allowed to see:
+    - Patient: Only their appointments
+    - Doctor: All appointments of the patients on their panel (across all doctors)
+    - Receptionist/Admin: Everything
+    """
+    user_role = current_user["role"]
+    user_id = str(current_user["_id"])
+
+    if user_role == "patient":
+        return {"patient_id": user_id}
+    if user_role == "doctor":
+        # One indexed lookup on the maintained doctor_patients panel
+        patient_ids = await get_panel_patient_ids(db, user_id)
+        return {"patient_id": {"$in": patient_ids}}
+    return {}
+
+
+async def load_comments_for_appointments(
+    db: AsyncIOMotorDatabase,
+    appointment_ids: Iterable[str],
+    comments_limit: Optional[int] = None,
+) -> Dict[str, List[dict]]:
+    """
+    Fetch the comments of many appointments
+    Returns a dict mapping every requested appointment_id to its comments (oldest first).
+    Without comments_limit this is a single $in query; with it, a single aggregation keeps
+    only the latest comments_limit comments of each appointment ($topN, MongoDB 5.2+).
+    """
+    ids = list(dict.fromkeys(str(appointment_id) for appointment_id in appointment_ids))
+    comments_by_appointment: Dict[str, List[dict]] = {appointment_id: [] for appointment_id in ids}
+
+    if not ids or comments_limit == 0:
+        return comments_by_appointment
+
+    if comments_limit is not None:
+        pipeline = [
+            {"$match": {"appointment_id": {"$in": ids}}},
+            {"$group": {
+                "_id": "$appointment_id",
+                "latest": {"$topN": {
+                    "n": comments_limit,
+                    "sortBy": {"timestamp": -1, "_id": -1},
+                    "output": "$$ROOT",
+                }},
+            }},
+        ]
+        async for group in db.comments.aggregate(pipeline):
+            comments_by_appointment[group["_id"]] = group["latest"][::-1]
+        return comments_by_appointment
+
+    cursor = db.comments.find({"appointment_id": {"$in": ids}}).sort([("timestamp", 1), ("_id", 1)])
+    async for comment in cursor:
+        comments_by_appointment[comment["appointment_id"]].append(comment)
+
+    return comments_by_appointment
+
+
+def comment_to_response(comment: dict) -> CommentResponse:
+    return CommentResponse(
+        id=str(comment["_id"]),
+        user_id=comment["user_id"],
+        user_name=comment["user_name"],
+        user_role=comment["user_role"],
+        content=comment["content"],
+        timestamp=comment["timestamp"],
+    )
+
+
+def utc_datetime(value: Optional[datetime]) -> Optional[datetime]:
+    """MongoDB returns naive UTC datetimes; mark them as UTC so they serialize with an offset"""
+    return value.replace(tzinfo=timezone.utc) if value is not None else None
+
+
+def appointment_to_response(appointment: dict, comments: List[dict]) -> AppointmentResponse:
+    return AppointmentResponse(
+        id=str(appointment["_id"]),
+        patient_id=appointment["patient_id"],
+        patient_name=appointment["patient_name"],
+        doctor_id=appointment["doctor_id"],
+        doctor_name=appointment["doctor_name"],
+        date=appointment["date"],
+        time=appointment["time"],
+        status=appointment["status"],
+        reason=appointment.get("reason"),
+        version=appointment.get("version", 0),
+        starts_at=utc_datetime(appointment.get("starts_at")),
+        comments=[comment_to_response(c) for c in comments],
+        comment_count=max(appointment.get("comment_count", 0), len(comments)),
+    )
+
+
+async def build_appointment_responses(
+    db: AsyncIOMotorDatabase,
+    appointments: List[dict],
+    comments_limit: Optional[int] = None,
+) -> List[AppointmentResponse]:
+    """
+    Attach comments to a list of appointment documents using one batched comments query
+    (or only the latest comments_limit of each, see load_comments_for_appointments)
+    """
+    comments_by_appointment = await load_comments_for_appointments(
+        db, (str(appointment["_id"]) for appointment in appointments), comments_limit
+    )
+    return [
+        appointment_to_response(appointment, comments_by_appointment[str(appointment["_id"])])
+        for appointment in appointments
+    ]
+
+
+def comment_preview(comment: dict) -> dict:
+    """
+    The last_comment stored on an appointment document
+    timestamp must stay the first field: add_comment keeps the newest preview with $max,
+    and MongoDB compares embedded documents field by field in order
+    """
+    return {
+        "timestamp": comment["timestamp"],
+        "id": str(comment["_id"]),
+        "user_name": comment["user_name"],
+        "user_role": comment["user_role"],
+        "content": comment["content"][:COMMENT_PREVIEW_LENGTH],
+    }
+
+
+def comment_summary_update(comment: dict) -> dict:
+    """Update operators recording one new comment in its appointment's comment_count/last_comment"""
+    return {
+        "$inc": {"comment_count": 1},
+        "$max": {"last_comment": comment_preview(comment)},
+    }
+
+
+def appointment_to_summary(appointment: dict) -> AppointmentSummary:
+    last_comment = appointment.get("last_comment")
+    return AppointmentSummary(
+        id=str(appointment["_id"]),
+        patient_id=appointment["patient_id"],
+        patient_name=appointment["patient_name"],
+        doctor_id=appointment["doctor_id"],
+        doctor_name=appointment["doctor_name"],
+        date=appointment["date"],
+        time=appointment["time"],
+        status=appointment["status"],
+        reason=appointment.get("reason"),
+        version=appointment.get("version", 0),
+        starts_at=utc_datetime(appointment.get("starts_at")),
+        comment_count=appointment.get("comment_count", 0),
+        last_comment=CommentPreview(**last_comment) if last_comment else None,
+    )
+
+
+async def rebuild_comment_summaries(db: AsyncIOMotorDatabase, batch_size: int = 1000) -> int:
+    """
+    Recompute comment_count and last_comment of every appointment from the comments collection
+    For data written before these fields existed or outside the API; returns the number of
+    appointments that have comments
+    """
+    await db.appointments.update_many({}, {"$set": {"comment_count": 0}, "$unset": {"last_comment": ""}})
+
+    pipeline = [
+        {"$sort": {"appointment_id": 1, "timestamp": 1, "_id": 1}},
+        {"$group": {"_id": "$appointment_id", "count": {"$sum": 1}, "last": {"$last": "$$ROOT"}}},
+    ]
+    updated = 0
+    requests = []
+    async for group in db.comments.aggregate(pipeline, allowDiskUse=True):
+        if not ObjectId.is_valid(group["_id"]):
+            continue
+        requests.append(UpdateOne(
+            {"_id": ObjectId(group["_id"])},
+            {"$set": {"comment_count": group["count"], "last_comment": comment_preview(group["last"])}},
+        ))
+        if len(requests) >= batch_size:
+            await db.appointments.bulk_write(requests, ordered=False)
+            updated += len(requests)
+            requests = []
+    if requests:
+        await db.appointments.bulk_write(requests, ordered=False)
+        updated += len(requests)
+    return updated
@@ -0,0 +1,161 @@
+"""
+Availability Service Module
+Computes doctors' free time from configured working hours minus booked appointments.
+
+A date range is represented as one bitmap (a Python int) with one bit per SLOT_MINUTES cell,
+bit 0 being the first cell of the first day:
+- the working-hours bitmap is the single-day mask repeated for every working day
+- the booked bitmap ORs one run of bits per scheduled appointment
+- free = working & ~booked
+so a month of availability is a handful of big-integer operations per doctor.
+Booked intervals come from the per-doctor DoctorIntervalIndex. Every appointment write bumps
+the doctor's shared scope counter (version_service.doctor_scope), on whichever worker it runs;
+a request reads the counters of its doctors in one query, reloads an index older than its
+doctor's counter, and caches results against that counter.
+"""
+import os
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from dotenv import load_dotenv
+
+from app.services.scheduling_service import SLOT_MINUTES, conflict_detector
+from app.services.version_service import doctor_scope, get_scope_versions
+
+load_dotenv()
+
+WORKING_HOURS_START = os.getenv("WORKING_HOURS_START", "09:00")
+WORKING_HOURS_END = os.getenv("WORKING_HOURS_END", "17:00")
+# Weekday numbers (Monday = 0)
+WORKING_DAYS = {int(day) for day in os.getenv("WORKING_DAYS", "0,1,2,3,4").split(",") if day.strip()}
+MAX_AVAILABILITY_DAYS = 62
+AVAILABILITY_CACHE_SIZE = 1024
+
+CELLS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _working_day_mask() -> int:
+    first = _minutes(WORKING_HOURS_START) // SLOT_MINUTES
+    last = -(-_minutes(WORKING_HOURS_END) // SLOT_MINUTES)
+    return ((1 << (last - first)) - 1) << first
+
+
+WORKING_DAY_MASK = _working_day_mask()
+
+
+def working_bitmap(start_day: date, days: int) -> int:
+    bitmap = 0
+    for offset in range(days):
+        if (start_day + timedelta(days=offset)).weekday() in WORKING_DAYS:
+            bitmap |= WORKING_DAY_MASK << (offset * CELLS_PER_DAY)
+    return bitmap
+
+
+def booked_bitmap(intervals: List[Tuple[datetime, datetime, str]], range_start: datetime, days: int) -> int:
+    bitmap = 0
+    total_cells = days * CELLS_PER_DAY
+    for start, end, _ in intervals:
+        first = max(0, int((start - range_start).total_seconds() // 60) // SLOT_MINUTES)
+        last = min(total_cells, -(-int((end - range_start).total_seconds() // 60) // SLOT_MINUTES))
+        if last > first:
+            bitmap |= ((1 << (last - first)) - 1) << first
+    return bitmap
+
+
+def bitmap_to_days(bitmap: int, start_day: date, days: int) -> List[dict]:
+    """Decode a free-slot bitmap into per-day lists of free [start, end) time ranges"""
+    result = []
+    day_mask = (1 << CELLS_PER_DAY) - 1
+    for offset in range(days):
+        day_bits = (bitmap >> (offset * CELLS_PER_DAY)) & day_mask
+        ranges = []
+        cell = 0
+        while day_bits:
+            # Skip to the next set bit, then measure the run of set bits
+            skip = (day_bits & -day_bits).bit_length() - 1
+            day_bits >>= skip
+            cell += skip
+            run = (~day_bits & (day_bits + 1)).bit_length() - 1
+            ranges.append({
+                "start": _format_cell(cell),
+                "end": _format_cell(cell + run),
+            })
+            day_bits >>= run
+            cell += run
+        result.append({
+            "date": (start_day + timedelta(days=offset)).isoformat(),
+            "free": ranges,
+        })
+    return result
+
+
+def _format_cell(cell: int) -> str:
+    minutes = cell * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class AvailabilityCache:
+    """LRU of computed availability, each entry tagged with the doctor's scope version and interval index"""
+
+    def __init__(self, max_size: int = AVAILABILITY_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def get(self, key: tuple, tag: tuple):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != tag:
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: tuple, tag: tuple, value):
+        self.entries[key] = (tag, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
+availability_cache = AvailabilityCache()
+
+
+async def get_availability(
+    db: AsyncIOMotorDatabase,
+    doctor_ids: List[str],
+    start_day: date,
+    end_day: date,
+) -> Dict[str, List[dict]]:
+    """Free time per doctor for every day from start_day to end_day (inclusive)"""
+    days = (end_day - start_day).days + 1
+    range_start = datetime.combine(start_day, datetime.min.time())
+    range_end = range_start + timedelta(days=days)
+    working = working_bitmap(start_day, days)
+
+    checked_at = time.monotonic()
+    versions = await get_scope_versions(db, [doctor_scope(doctor_id) for doctor_id in doctor_ids])
+
+    result = {}
+    for doctor_id in doctor_ids:
+        version = versions[doctor_scope(doctor_id)]
+        index = await conflict_detector.index_for(db, doctor_id)
+        if index.scope_version != version and index.loaded_at < checked_at:
+            # The doctor's bookings changed (maybe on another worker) since this index was loaded
+            conflict_detector.invalidate(doctor_id)
+            index = await conflict_detector.index_for(db, doctor_id)
+        index.scope_version = version
+        key = (doctor_id, start_day, end_day)
+        tag = (version, index.loaded_at, index.version)
+
+        cached = availability_cache.get(key, tag)
+        if cached is None:
+            free = working & ~booked_bitmap(index.between(range_start, range_end), range_start, days)
+            cached = bitmap_to_days(free, start_day, days)
+            availability_cache.put(key, tag, cached)
+        result[doctor_id] = cached
+    return result
@@ -0,0 +1,228 @@
+"""
+Change Feed Service Module
+Pushes appointment and comment changes to connected clients.
+
+Each worker runs ONE MongoDB change stream over the appointments and comments collections
+and fans every change out to its in-process subscribers, so the load on MongoDB does not
+grow with the number of open dashboards. Every subscriber only receives changes it could
+see through GET /api/appointments (same role rules as visible_appointments_query).
+
+Change streams need a replica set; a single-node replica set is enough for local
+development (see mongodb_setup.md). Delete events carry the deleted document only when
+the collection has pre-images enabled (MongoDB 6.0+, switched on by enable_pre_images);
+without one the owner of a deleted document is unknown and subscribers receive just its ID.
+"""
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Optional, Set
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from pymongo.errors import OperationFailure, PyMongoError
+from dotenv import load_dotenv
+
+from app.services.appointment_service import appointment_to_response, comment_to_response
+from app.services.panel_service import get_panel_patient_ids
+
+load_dotenv()
+
+WATCHED_COLLECTIONS = ["appointments", "comments"]
+# Events buffered per connection before a slow client is told to resync
+CHANGE_FEED_QUEUE_SIZE = int(os.getenv("CHANGE_FEED_QUEUE_SIZE", "256"))
+CHANGE_FEED_RETRY_SECONDS = 5
+OWNER_CACHE_SIZE = 10000
+# "The $changeStream stage is only supported on replica sets"
+NOT_A_REPLICA_SET_CODE = 40573
+
+
+class Subscription:
+    """One connected client: its visibility scope and a bounded queue of pending events"""
+
+    def __init__(self, user: dict, queue_size: int):
+        self.user_id = str(user["_id"])
+        self.role = user["role"]
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Doctors only: patients on the doctor's panel (None = reload before next use)
+        self.panel: Optional[Set[str]] = None
+        self.overflowed = False
+
+    def push(self, event: Optional[dict]):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Drop everything queued and leave a single None: the client has to resync
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class ChangeFeed:
+    """Per-worker change stream consumer with in-process fan-out"""
+
+    def __init__(self, queue_size: int = CHANGE_FEED_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.subscriptions: Set[Subscription] = set()
+        self.task: Optional[asyncio.Task] = None
+        self.resume_token = None
+        # None while starting, then True (streaming) or False (deployment has no change streams)
+        self.available: Optional[bool] = None
+        # appointment_id -> patient_id, to scope comment events without a lookup per comment
+        self.owners: "OrderedDict[str, str]" = OrderedDict()
+
+    def start(self, db: AsyncIOMotorDatabase):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        for subscription in list(self.subscriptions):
+            subscription.push(None)
+
+    def subscribe(self, user: dict) -> Subscription:
+        subscription = Subscription(user, self.queue_size)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscriptions.discard(subscription)
+
+    async def enable_pre_images(self, db: AsyncIOMotorDatabase):
+        """Ask MongoDB to keep pre-images so delete events can be scoped to their owner"""
+        for collection in WATCHED_COLLECTIONS:
+            try:
+                await db.command("collMod", collection, changeStreamPreAndPostImages={"enabled": True})
+            except OperationFailure as e:
+                # Older servers, missing collections or insufficient privileges: deletes are sent as bare IDs
+                print(f"Could not enable change stream pre-images on {collection}: {e}")
+
+    async def _run(self, db: AsyncIOMotorDatabase):
+        await self.enable_pre_images(db)
+        pipeline = [{"$match": {"ns.coll": {"$in": WATCHED_COLLECTIONS}}}]
+        while True:
+            try:
+                async with db.watch(
+                    pipeline,
+                    full_document="updateLookup",
+                    full_document_before_change="whenAvailable",
+                    resume_after=self.resume_token,
+                ) as stream:
+                    self.available = True
+                    async for change in stream:
+                        self.resume_token = stream.resume_token
+                        await self.dispatch(db, change)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code == NOT_A_REPLICA_SET_CODE:
+                    self.available = False
+                    print("Change streams unavailable (MongoDB is not a replica set): live updates disabled")
+                    return
+                print(f"Change stream error, retrying: {e}")
+                # The resume token may have fallen off the oplog; connected clients must resync
+                self.resume_token = None
+                self._reset_all()
+            except PyMongoError as e:
+                print(f"Change stream error, retrying: {e}")
+            await asyncio.sleep(CHANGE_FEED_RETRY_SECONDS)
+
+    def _reset_all(self):
+        for subscription in list(self.subscriptions):
+            subscription.push(None)
+
+    def _remember_owner(self, appointment_id: str, patient_id: str):
+        self.owners[appointment_id] = patient_id
+        self.owners.move_to_end(appointment_id)
+        while len(self.owners) > OWNER_CACHE_SIZE:
+            self.owners.popitem(last=False)
+
+    async def _appointment_owner(self, db: AsyncIOMotorDatabase, appointment_id: str) -> Optional[str]:
+        patient_id = self.owners.get(appointment_id)
+        if patient_id is not None:
+            return patient_id
+        if not ObjectId.is_valid(appointment_id):
+            return None
+        appointment = await db.appointments.find_one({"_id": ObjectId(appointment_id)}, {"patient_id": 1})
+        if appointment is None:
+            return None
+        self._remember_owner(appointment_id, appointment["patient_id"])
+        return appointment["patient_id"]
+
+    async def dispatch(self, db: Optional[AsyncIOMotorDatabase], change: dict):
+        """Turn one change stream event into a client event and queue it for everyone allowed to see it"""
+        operation = change.get("operationType")
+        if operation not in ("insert", "update", "replace", "delete"):
+            return
+        collection = change["ns"]["coll"]
+        document_id = str(change["documentKey"]["_id"])
+        document = change.get("fullDocument")
+        before = change.get("fullDocumentBeforeChange")
+        if operation != "delete" and document is None:
+            # Deleted again before the update lookup ran; its delete event follows
+            return
+
+        event = {"collection": collection, "operation": operation, "id": document_id}
+        doctor_ids = set()
+        if collection == "appointments":
+            current = document or before
+            patient_id = current["patient_id"] if current else None
+            if document is not None:
+                self._remember_owner(document_id, patient_id)
+                event["data"] = appointment_to_response(document, []).model_dump(mode="json", exclude={"comments"})
+            else:
+                self.owners.pop(document_id, None)
+            doctor_ids = {doc["doctor_id"] for doc in (document, before) if doc}
+        else:
+            current = document or before
+            appointment_id = current["appointment_id"] if current else None
+            patient_id = await self._appointment_owner(db, appointment_id) if appointment_id else None
+            if appointment_id:
+                event["appointment_id"] = appointment_id
+            if document is not None:
+                event["data"] = comment_to_response(document).model_dump(mode="json")
+
+        for subscription in list(self.subscriptions):
+            if await self._can_see(db, subscription, operation, patient_id, doctor_ids):
+                subscription.push(event)
+
+    async def _can_see(
+        self,
+        db: Optional[AsyncIOMotorDatabase],
+        subscription: Subscription,
+        operation: str,
+        patient_id: Optional[str],
+        doctor_ids: Set[str],
+    ) -> bool:
+        if subscription.role not in ("patient", "doctor"):
+            return True
+        if patient_id is None:
+            # Owner unknown (no pre-image): only a bare delete notice is safe to share
+            return operation == "delete"
+        if subscription.role == "patient":
+            return patient_id == subscription.user_id
+
+        if subscription.user_id in doctor_ids:
+            if operation == "delete":
+                # The panel may have shrunk; reload it on next use
+                visible = subscription.panel is None or patient_id in subscription.panel
+                subscription.panel = None
+                return visible
+            # An appointment with this doctor puts the patient on their panel
+            if subscription.panel is not None:
+                subscription.panel.add(patient_id)
+        if subscription.panel is None:
+            subscription.panel = set(await get_panel_patient_ids(db, subscription.user_id))
+            if subscription.user_id in doctor_ids and operation != "delete":
+                subscription.panel.add(patient_id)
+        return patient_id in subscription.panel
+
+
+change_feed = ChangeFeed()
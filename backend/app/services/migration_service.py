@@ -0,0 +1,206 @@
+"""
+Migration Service Module
+Online, resumable data migrations (the registry lives in app/migrations.py).
+
+A migration walks one collection in _id order, one batch at a time: it reads the documents
+still matching its pending filter past the last checkpointed _id, turns them into writes and
+applies them with a single unordered bulk_write. After every batch the position is saved in
+the migrations collection, so an interrupted run resumes where it stopped. Writes are paced
+to a target rate so the API keeps its share of the database while a migration runs.
+
+Migrations run while the API serves traffic, so they must be additive, and readers must
+accept documents in both shapes until the migration is done. Each write should re-check
+the pending condition in its filter, so it never overwrites a document the API has
+already written in the new shape.
+"""
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MIGRATIONS_COLLECTION = "migrations"
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "500"))
+# Documents written per second across all batches (0 = unthrottled)
+MIGRATION_MAX_WRITES_PER_SECOND = float(os.getenv("MIGRATION_MAX_WRITES_PER_SECOND", "500"))
+# A runner that stops renewing its lease for this long is presumed dead and can be taken over
+MIGRATION_LEASE_SECONDS = 300
+
+
+class Migration:
+    """One versioned migration of one collection"""
+
+    def __init__(
+        self,
+        version: int,
+        name: str,
+        collection: str,
+        pending: dict,
+        projection: Optional[dict],
+        build_updates: Callable[[AsyncIOMotorDatabase, List[dict]], Awaitable[List[UpdateOne]]],
+    ):
+        self.version = version
+        self.name = name
+        self.collection = collection
+        # Documents still in the old shape
+        self.pending = pending
+        # Fields build_updates needs (None = whole documents)
+        self.projection = projection
+        self.build_updates = build_updates
+
+
+class MigrationLocked(Exception):
+    """Another runner holds the migration's lease"""
+
+
+def runner_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+async def claim(db: AsyncIOMotorDatabase, migration: Migration, owner: str) -> Optional[dict]:
+    """
+    Take the lease of a migration, creating its checkpoint on the first run
+    Returns the checkpoint, None if the migration is already done; raises MigrationLocked
+    """
+    now = datetime.utcnow()
+    try:
+        return await db[MIGRATIONS_COLLECTION].find_one_and_update(
+            {
+                "_id": migration.version,
+                "state": {"$ne": "done"},
+                "$or": [{"lease_until": {"$lt": now}}, {"lease_until": None}, {"owner": owner}],
+            },
+            {
+                "$set": {"name": migration.name, "owner": owner, "lease_until": now + timedelta(seconds=MIGRATION_LEASE_SECONDS)},
+                "$setOnInsert": {
+                    "collection": migration.collection,
+                    "state": "running",
+                    "last_id": None,
+                    "scanned": 0,
+                    "modified": 0,
+                    "started_at": now,
+                },
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # The checkpoint exists but did not match: done, or leased by someone else
+        checkpoint = await db[MIGRATIONS_COLLECTION].find_one({"_id": migration.version})
+        if checkpoint is not None and checkpoint["state"] == "done":
+            return None
+        raise MigrationLocked(f"Migration {migration.version} ({migration.name}) is being run by {checkpoint and checkpoint.get('owner')}")
+
+
+async def run_migration(
+    db: AsyncIOMotorDatabase,
+    migration: Migration,
+    batch_size: int = MIGRATION_BATCH_SIZE,
+    max_writes_per_second: float = MIGRATION_MAX_WRITES_PER_SECOND,
+    owner: Optional[str] = None,
+    progress: Optional[Callable[[dict], None]] = None,
+) -> Optional[dict]:
+    """
+    Run (or resume) one migration to completion
+    Returns its final checkpoint, or None if it had already been done
+    """
+    owner = owner or runner_id()
+    checkpoint = await claim(db, migration, owner)
+    if checkpoint is None:
+        return None
+
+    collection = db[migration.collection]
+    last_id = checkpoint["last_id"]
+    started = time.monotonic()
+    written = 0
+    while True:
+        query = dict(migration.pending)
+        if last_id is not None:
+            query = {"$and": [migration.pending, {"_id": {"$gt": last_id}}]}
+        documents = await collection.find(query, migration.projection).sort("_id", 1).limit(
+            batch_size
+        ).to_list(length=batch_size)
+        if not documents:
+            break
+
+        requests = await migration.build_updates(db, documents)
+        modified = 0
+        if requests:
+            result = await collection.bulk_write(requests, ordered=False)
+            modified = result.modified_count
+        last_id = documents[-1]["_id"]
+        written += len(requests)
+
+        checkpoint = await db[MIGRATIONS_COLLECTION].find_one_and_update(
+            {"_id": migration.version, "owner": owner},
+            {
+                "$set": {
+                    "last_id": last_id,
+                    "updated_at": datetime.utcnow(),
+                    "lease_until": datetime.utcnow() + timedelta(seconds=MIGRATION_LEASE_SECONDS),
+                },
+                "$inc": {"scanned": len(documents), "modified": modified},
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+        if checkpoint is None:
+            raise MigrationLocked(f"Migration {migration.version} ({migration.name}) lease was taken over")
+        if progress:
+            progress(checkpoint)
+
+        # Pace the writes: sleep until the elapsed time matches the target rate
+        if max_writes_per_second > 0:
+            ahead = written / max_writes_per_second - (time.monotonic() - started)
+            if ahead > 0:
+                await asyncio.sleep(ahead)
+
+    return await db[MIGRATIONS_COLLECTION].find_one_and_update(
+        {"_id": migration.version, "owner": owner},
+        {"$set": {"state": "done", "finished_at": datetime.utcnow(), "lease_until": None}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def run_migrations(
+    db: AsyncIOMotorDatabase,
+    migrations: List[Migration],
+    target: Optional[int] = None,
+    **options,
+) -> List[dict]:
+    """Run every migration up to `target` (default: all) in version order; returns the checkpoints written"""
+    finished = []
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if target is not None and migration.version > target:
+            break
+        checkpoint = await run_migration(db, migration, **options)
+        if checkpoint is not None:
+            finished.append(checkpoint)
+    return finished
+
+
+async def migration_status(db: AsyncIOMotorDatabase, migrations: List[Migration]) -> List[dict]:
+    """State of every registered migration: pending (never started), running or done"""
+    checkpoints = {c["_id"]: c async for c in db[MIGRATIONS_COLLECTION].find({})}
+    status_list = []
+    for migration in sorted(migrations, key=lambda m: m.version):
+        checkpoint = checkpoints.get(migration.version, {})
+        status_list.append({
+            "version": migration.version,
+            "name": migration.name,
+            "collection": migration.collection,
+            "state": checkpoint.get("state", "pending"),
+            "scanned": checkpoint.get("scanned", 0),
+            "modified": checkpoint.get("modified", 0),
+            "last_id": checkpoint.get("last_id"),
+            "owner": checkpoint.get("owner"),
+            "finished_at": checkpoint.get("finished_at"),
+        })
+    return status_list
@@ -0,0 +1,122 @@
+"""
+Doctor Panel Service Module
+Maintains the doctor_patients collection: one document per (doctor_id, patient_id) pair
+with the number of appointments linking them. A doctor's panel is the set of patients
+they have at least one appointment with, so resolving it is a single indexed lookup
+instead of a scan of the doctor's appointments.
+"""
+from typing import Dict, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.indexes import ensure_collection_indexes
+
+PANEL_COLLECTION = "doctor_patients"
+
+
+async def add_to_panel(db: AsyncIOMotorDatabase, doctor_id: str, patient_id: str, count: int = 1):
+    """Record `count` new appointments between a doctor and a patient"""
+    await db[PANEL_COLLECTION].update_one(
+        {"doctor_id": doctor_id, "patient_id": patient_id},
+        {"$inc": {"appointment_count": count}},
+        upsert=True,
+    )
+
+
+async def remove_from_panel(db: AsyncIOMotorDatabase, doctor_id: str, patient_id: str, count: int = 1):
+    """Forget `count` appointments between a doctor and a patient, dropping the pair when none remain"""
+    await db[PANEL_COLLECTION].update_one(
+        {"doctor_id": doctor_id, "patient_id": patient_id},
+        {"$inc": {"appointment_count": -count}},
+    )
+    # Filtered on the counter so a concurrent add_to_panel is never lost
+    await db[PANEL_COLLECTION].delete_one(
+        {"doctor_id": doctor_id, "patient_id": patient_id, "appointment_count": {"$lte": 0}}
+    )
+
+
+async def move_in_panel(
+    db: AsyncIOMotorDatabase,
+    old_doctor_id: str,
+    old_patient_id: str,
+    new_doctor_id: Optional[str],
+    new_patient_id: Optional[str],
+):
+    """Re-point one appointment from its old (doctor, patient) pair to the new one"""
+    new_doctor_id = new_doctor_id or old_doctor_id
+    new_patient_id = new_patient_id or old_patient_id
+    if (new_doctor_id, new_patient_id) == (old_doctor_id, old_patient_id):
+        return
+
+    await add_to_panel(db, new_doctor_id, new_patient_id)
+    await remove_from_panel(db, old_doctor_id, old_patient_id)
+
+
+async def apply_panel_deltas(db: AsyncIOMotorDatabase, deltas: Dict[Tuple[str, str], int]):
+    """Apply many (doctor_id, patient_id) counter changes with one bulk write"""
+    changes = [(pair, delta) for pair, delta in deltas.items() if delta]
+    if not changes:
+        return
+
+    await db[PANEL_COLLECTION].bulk_write(
+        [
+            UpdateOne(
+                {"doctor_id": doctor_id, "patient_id": patient_id},
+                {"$inc": {"appointment_count": delta}},
+                upsert=delta > 0,
+            )
+            for (doctor_id, patient_id), delta in changes
+        ],
+        ordered=False,
+    )
+
+    emptied = [
+        {"doctor_id": doctor_id, "patient_id": patient_id}
+        for (doctor_id, patient_id), delta in changes
+        if delta < 0
+    ]
+    if emptied:
+        await db[PANEL_COLLECTION].delete_many({"$or": emptied, "appointment_count": {"$lte": 0}})
+
+
+async def remove_user_from_panels(db: AsyncIOMotorDatabase, user_id: str):
+    """Drop every panel entry a deleted user takes part in, as doctor or as patient"""
+    await db[PANEL_COLLECTION].delete_many(
+        {"$or": [{"doctor_id": user_id}, {"patient_id": user_id}]}
+    )
+
+
+async def get_panel_patient_ids(db: AsyncIOMotorDatabase, doctor_id: str) -> List[str]:
+    """Return the IDs of all patients on a doctor's panel"""
+    entries = await db[PANEL_COLLECTION].find(
+        {"doctor_id": doctor_id},
+        {"_id": 0, "patient_id": 1},
+    ).to_list(length=None)
+    return [entry["patient_id"] for entry in entries]
+
+
+async def rebuild_doctor_panels(db: AsyncIOMotorDatabase) -> int:
+    """
+    Recompute the doctor_patients collection from the appointments collection
+    $out swaps the new contents in atomically and keeps the existing indexes
+    """
+    await ensure_collection_indexes(db, PANEL_COLLECTION)
+    pipeline = [
+        {
+            "$group": {
+                "_id": {"doctor_id": "$doctor_id", "patient_id": "$patient_id"},
+                "appointment_count": {"$sum": 1},
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "doctor_id": "$_id.doctor_id",
+                "patient_id": "$_id.patient_id",
+                "appointment_count": 1,
+            }
+        },
+        {"$out": PANEL_COLLECTION},
+    ]
+    await db.appointments.aggregate(pipeline).to_list(length=None)
+    return await db[PANEL_COLLECTION].count_documents({})
@@ -0,0 +1,392 @@
+"""
+Scheduling Service Module
+Double-booking detection for doctors.
+
+Appointments keep their free-form date/time strings; this module normalizes them into
+[start, end) intervals of APPOINTMENT_DURATION_MINUTES. The strings are wall-clock times in
+CLINIC_TIMEZONE; every write also stores the start as starts_at, a UTC BSON datetime, so
+date-range queries are index range scans. Two layers guard against overlaps:
+- slot_keys: every scheduled appointment stores one key per SLOT_MINUTES grid cell it touches
+  ("<doctor_id>|<cell start>"). A unique multikey index on slot_keys makes MongoDB reject
+  a second booking of any cell, so concurrent requests (even on other workers) cannot both win.
+  New and moved bookings must start on the grid, so back-to-back bookings never share a cell
+  while any two overlapping ones always do.
+- DoctorIntervalIndex: an in-process sorted interval list per doctor, used to answer
+  "does this overlap anything?" in O(log n) and to report which appointment it clashes with.
+"""
+import os
+import time
+from bisect import bisect_left, insort
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from pymongo import UpdateOne
+from fastapi import HTTPException, status
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SLOT_MINUTES = int(os.getenv("APPOINTMENT_SLOT_MINUTES", "15"))
+APPOINTMENT_DURATION_MINUTES = int(os.getenv("APPOINTMENT_DURATION_MINUTES", "30"))
+# How long a worker trusts its in-memory index before reloading it from MongoDB
+INTERVAL_INDEX_TTL_SECONDS = int(os.getenv("INTERVAL_INDEX_TTL_SECONDS", "60"))
+
+
+def load_timezone(name: str):
+    """
+    IANA time zone by name; UTC needs no tz database
+    Other zones come from the system database or the tzdata package (Windows has no system one).
+    """
+    if name.strip().upper() in ("UTC", "ETC/UTC"):
+        return timezone.utc
+    return ZoneInfo(name.strip())
+
+
+# Time zone of the appointment date/time strings (IANA name, e.g. Europe/London)
+CLINIC_TIMEZONE = load_timezone(os.getenv("CLINIC_TIMEZONE", "UTC"))
+
+DATE_FORMATS = ["%Y-%m-%d", "%m/%d/%Y"]
+TIME_FORMATS = ["%H:%M", "%H:%M:%S", "%I:%M %p", "%I:%M%p", "%I %p"]
+
+
+def parse_appointment_start(date: str, time_str: str) -> Optional[datetime]:
+    """Parse an appointment's date and time strings, returning None if they are not understood"""
+    parsed_date = None
+    for date_format in DATE_FORMATS:
+        try:
+            parsed_date = datetime.strptime(date.strip(), date_format).date()
+            break
+        except (ValueError, AttributeError):
+            continue
+    if parsed_date is None:
+        return None
+
+    for time_format in TIME_FORMATS:
+        try:
+            parsed_time = datetime.strptime(time_str.strip().upper(), time_format).time()
+            return datetime.combine(parsed_date, parsed_time)
+        except (ValueError, AttributeError):
+            continue
+    return None
+
+
+def to_utc(moment: datetime) -> datetime:
+    """
+    Naive UTC datetime (as stored in MongoDB) for a clinic wall-clock time
+    Aware datetimes are converted from their own zone.
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=CLINIC_TIMEZONE)
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def parse_range_bound(value: Optional[str], end: bool = False) -> Optional[datetime]:
+    """
+    Parse a from/to query parameter into a naive UTC datetime
+    Accepts an ISO date (a whole clinic day: `to` then means the end of that day) or an ISO
+    datetime, with or without offset (without one it is clinic time). Raises 400 otherwise.
+    """
+    if not value:
+        return None
+    try:
+        if len(value) == 10:
+            day = date.fromisoformat(value)
+            if end:
+                day += timedelta(days=1)
+            return to_utc(datetime.combine(day, datetime.min.time()))
+        return to_utc(datetime.fromisoformat(value.replace("Z", "+00:00")))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid date range (expected e.g. 2025-01-31 or 2025-01-31T09:00:00+01:00)",
+        )
+
+
+def starts_at_filter(starts_from: Optional[datetime], starts_to: Optional[datetime]) -> dict:
+    """Query fragment for appointments starting in [starts_from, starts_to)"""
+    bounds = {}
+    if starts_from is not None:
+        bounds["$gte"] = starts_from
+    if starts_to is not None:
+        bounds["$lt"] = starts_to
+    return {"starts_at": bounds} if bounds else {}
+
+
+def appointment_interval(date: str, time_str: str) -> Optional[Tuple[datetime, datetime]]:
+    start = parse_appointment_start(date, time_str)
+    if start is None:
+        return None
+    return start, start + timedelta(minutes=APPOINTMENT_DURATION_MINUTES)
+
+
+def slot_keys(doctor_id: str, start: datetime, end: datetime) -> List[str]:
+    """Keys of every SLOT_MINUTES grid cell the interval [start, end) touches"""
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    minutes = (start - day) / timedelta(minutes=1)
+    # Cell containing start
+    cell = day + timedelta(minutes=minutes // SLOT_MINUTES * SLOT_MINUTES)
+    keys = []
+    while cell < end:
+        keys.append(f"{doctor_id}|{cell.isoformat(timespec='minutes')}")
+        cell += timedelta(minutes=SLOT_MINUTES)
+    return keys
+
+
+def on_slot_grid(start: datetime) -> bool:
+    return start.second == 0 and start.microsecond == 0 and (start.hour * 60 + start.minute) % SLOT_MINUTES == 0
+
+
+def schedule_fields(doctor_id: str, date: str, time_str: str, appointment_status: str) -> Optional[dict]:
+    """
+    Fields to $set for an appointment's schedule (starts_at, slot_keys), or None if
+    date/time cannot be parsed. Only scheduled appointments hold slots; for any other status "slot_keys" is None
+    and the caller should $unset it.
+    """
+    interval = appointment_interval(date, time_str)
+    if interval is None:
+        return None
+    starts_at = to_utc(interval[0])
+    if appointment_status != "scheduled":
+        return {"starts_at": starts_at, "slot_keys": None}
+    return {"starts_at": starts_at, "slot_keys": slot_keys(doctor_id, *interval)}
+
+
+def apply_schedule_fields(update: dict, fields: dict):
+    """Merge schedule_fields() output into an update document's $set/$unset"""
+    if "starts_at" in fields:
+        update.setdefault("$set", {})["starts_at"] = fields["starts_at"]
+    if fields["slot_keys"] is None:
+        update.setdefault("$unset", {})["slot_keys"] = ""
+    else:
+        update.setdefault("$set", {})["slot_keys"] = fields["slot_keys"]
+
+
+def starts_at_update(appointment: dict) -> UpdateOne:
+    """
+    Write that sets starts_at on an appointment stored before it existed (migration 1)
+    Filtered on starts_at still missing, so a value the API wrote meanwhile is never replaced.
+    Unparseable date/time strings get None and never match a range.
+    """
+    start = parse_appointment_start(appointment.get("date") or "", appointment.get("time") or "")
+    return UpdateOne(
+        {"_id": appointment["_id"], "starts_at": {"$exists": False}},
+        {"$set": {"starts_at": to_utc(start) if start else None}},
+    )
+
+
+class DoctorIntervalIndex:
+    """Sorted [start, end) intervals of one doctor's scheduled appointments"""
+
+    def __init__(self):
+        self.entries: List[Tuple[datetime, datetime, str]] = []
+        self.by_id: Dict[str, Tuple[datetime, datetime, str]] = {}
+        self.max_duration = timedelta(0)
+        self.loaded_at = time.monotonic()
+        # Bumped on every change so derived results (e.g. availability) can be cached against it
+        self.version = 0
+        # The doctor's shared scope version (version_service) this index is known to include
+        self.scope_version: Optional[int] = None
+
+    def add(self, appointment_id: str, start: datetime, end: datetime):
+        self.remove(appointment_id)
+        entry = (start, end, appointment_id)
+        insort(self.entries, entry)
+        self.by_id[appointment_id] = entry
+        self.max_duration = max(self.max_duration, end - start)
+        self.version += 1
+
+    def remove(self, appointment_id: str):
+        entry = self.by_id.pop(appointment_id, None)
+        if entry is None:
+            return
+        position = bisect_left(self.entries, entry)
+        if position < len(self.entries) and self.entries[position] == entry:
+            del self.entries[position]
+        self.version += 1
+
+    def between(self, start: datetime, end: datetime) -> List[Tuple[datetime, datetime, str]]:
+        """All intervals overlapping [start, end)"""
+        position = bisect_left(self.entries, (start - self.max_duration,))
+        stop = bisect_left(self.entries, (end,))
+        return [entry for entry in self.entries[position:stop] if entry[1] > start]
+
+    def find_overlap(self, start: datetime, end: datetime, exclude_id: Optional[str] = None) -> Optional[str]:
+        """Return the ID of an appointment overlapping [start, end), if any"""
+        # Intervals starting at or after `end` cannot overlap; walk back from there.
+        # Only intervals that start within max_duration before `start` can still reach it.
+        position = bisect_left(self.entries, (end,))
+        earliest = start - self.max_duration
+        while position > 0:
+            position -= 1
+            other_start, other_end, other_id = self.entries[position]
+            if other_start < earliest:
+                break
+            if other_end > start and other_id != exclude_id:
+                return other_id
+        return None
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class ConflictDetector:
+    """Per-worker cache of DoctorIntervalIndex objects, loaded lazily from MongoDB"""
+
+    def __init__(self, ttl_seconds: int = INTERVAL_INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.indexes: Dict[str, DoctorIntervalIndex] = {}
+
+    async def index_for(self, db: AsyncIOMotorDatabase, doctor_id: str) -> DoctorIntervalIndex:
+        index = self.indexes.get(doctor_id)
+        if index is not None and time.monotonic() - index.loaded_at < self.ttl_seconds:
+            return index
+
+        index = DoctorIntervalIndex()
+        cursor = db.appointments.find(
+            {"doctor_id": doctor_id, "status": "scheduled"},
+            {"date": 1, "time": 1},
+        )
+        async for appointment in cursor:
+            interval = appointment_interval(appointment["date"], appointment["time"])
+            if interval is not None:
+                index.add(str(appointment["_id"]), *interval)
+        self.indexes[doctor_id] = index
+        return index
+
+    async def find_conflict(
+        self,
+        db: AsyncIOMotorDatabase,
+        doctor_id: str,
+        start: datetime,
+        end: datetime,
+        exclude_id: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Return the ID of a scheduled appointment of this doctor that overlaps [start, end)
+        A hit is confirmed against MongoDB so an entry made stale by another worker
+        never blocks a booking.
+        """
+        index = await self.index_for(db, doctor_id)
+        while True:
+            conflict_id = index.find_overlap(start, end, exclude_id)
+            if conflict_id is None:
+                return None
+            current = await db.appointments.find_one(
+                {"_id": ObjectId(conflict_id), "doctor_id": doctor_id, "status": "scheduled"},
+                {"date": 1, "time": 1},
+            )
+            interval = current and appointment_interval(current["date"], current["time"])
+            if interval and interval[0] < end and interval[1] > start:
+                return conflict_id
+            # Changed by another worker since the index was loaded: fix the entry and look again
+            if interval:
+                index.add(conflict_id, *interval)
+            else:
+                index.remove(conflict_id)
+
+    def record(self, doctor_id: str, appointment_id: str, date: str, time_str: str, appointment_status: str):
+        """Reflect a successful write in the cached index (if that doctor is cached)"""
+        for index in self.indexes.values():
+            index.remove(appointment_id)
+        index = self.indexes.get(doctor_id)
+        if index is None or appointment_status != "scheduled":
+            return
+        interval = appointment_interval(date, time_str)
+        if interval is not None:
+            index.add(appointment_id, *interval)
+
+    def forget(self, appointment_id: str):
+        for index in self.indexes.values():
+            index.remove(appointment_id)
+
+    def invalidate(self, doctor_id: Optional[str] = None):
+        if doctor_id is None:
+            self.indexes.clear()
+        else:
+            self.indexes.pop(doctor_id, None)
+
+
+conflict_detector = ConflictDetector()
+
+DOUBLE_BOOKING_DETAIL = "Doctor is already booked at this time"
+
+
+class BatchBookings:
+    """
+    Intervals accepted so far within one bulk request, per doctor
+    conflict_detector only learns about a batch's writes after its bulk_write, so operations
+    of the same batch are checked against each other here.
+    """
+
+    def __init__(self):
+        self.indexes: Dict[str, DoctorIntervalIndex] = {}
+
+    def check(self, doctor_id: str, appointment_id: str, date: str, time_str: str, appointment_status: str):
+        """Raise 409 if this booking overlaps one accepted earlier in the batch"""
+        interval = appointment_status == "scheduled" and appointment_interval(date, time_str)
+        index = self.indexes.get(doctor_id)
+        if not interval or index is None:
+            return
+        conflict_id = index.find_overlap(*interval, exclude_id=appointment_id)
+        if conflict_id:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"{DOUBLE_BOOKING_DETAIL} (appointment {conflict_id}, earlier in this batch)",
+            )
+
+    def record(self, doctor_id: str, appointment_id: str, date: str, time_str: str, appointment_status: str):
+        for index in self.indexes.values():
+            index.remove(appointment_id)
+        interval = appointment_status == "scheduled" and appointment_interval(date, time_str)
+        if interval:
+            self.indexes.setdefault(doctor_id, DoctorIntervalIndex()).add(appointment_id, *interval)
+
+
+async def ensure_bookable(
+    db: AsyncIOMotorDatabase,
+    doctor_id: str,
+    date: str,
+    time_str: str,
+    appointment_status: str,
+    exclude_id: Optional[str] = None,
+    schedule_changed: bool = True,
+) -> dict:
+    """
+    Validate an appointment's schedule and check it against the doctor's other bookings
+    Returns the schedule_fields() to write; raises 400 for an unparseable date/time
+    and 409 when the doctor is already booked in that interval.
+    Pass schedule_changed=False when date and time are not being written: an appointment that
+    is not scheduled then only releases its slots, and legacy free-form dates or start times
+    off the SLOT_MINUTES grid are kept as they are (free-form ones hold no slots).
+    """
+    if appointment_status != "scheduled" and not schedule_changed:
+        return {"slot_keys": None}
+
+    fields = schedule_fields(doctor_id, date, time_str, appointment_status)
+    if fields is None and not schedule_changed:
+        # Could never be checked for overlaps; reassigning or rescheduling it is still allowed
+        return {"slot_keys": None}
+    if fields is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid date or time (expected e.g. 2025-01-31 and 09:30 or 9:30 AM)",
+        )
+
+    if appointment_status == "scheduled":
+        start, end = appointment_interval(date, time_str)
+        if schedule_changed and not on_slot_grid(start):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Appointments start on a {SLOT_MINUTES}-minute grid (e.g. 09:00, 09:{SLOT_MINUTES:02d})",
+            )
+        conflict_id = await conflict_detector.find_conflict(
+            db, doctor_id, start, end, exclude_id=exclude_id
+        )
+        if conflict_id:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"{DOUBLE_BOOKING_DETAIL} (appointment {conflict_id})",
+            )
+    return fields
@@ -0,0 +1,96 @@
+"""
+Search Service Module
+Full-text search over appointment reasons and comment contents, backed by the MongoDB text
+indexes reason_text (appointments) and content_text (comments) declared in app/indexes.py.
+
+An appointment's score is the text score of its reason plus the scores of its matching
+comments, so appointments that mention the terms more often rank higher. Role-based
+visibility is applied to the appointments query, and comment matches are only kept for
+appointments that pass it. Ranking needs every candidate, so candidates are capped at
+SEARCH_MAX_CANDIDATES per collection (the best-scoring ones) and paged by offset.
+"""
+import os
+from typing import Dict, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from dotenv import load_dotenv
+
+from app.services.appointment_service import comment_preview
+from app.utils.pagination import merge_filters
+
+load_dotenv()
+
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "1000"))
+# Matching comments returned with each hit
+SEARCH_COMMENTS_PER_HIT = 3
+
+TEXT_SCORE = {"$meta": "textScore"}
+
+
+def text_filter(query: dict, search: str) -> dict:
+    """Add a $text clause at the top level of a query ($text may not be nested in every operator)"""
+    return {**query, "$text": {"$search": search}}
+
+
+async def search_appointments(
+    db: AsyncIOMotorDatabase,
+    visible_query: dict,
+    search: str,
+    offset: int,
+    limit: int,
+) -> Tuple[List[Tuple[dict, float, List[dict]]], int]:
+    """
+    Ranked search over reasons and comments
+    Returns ([(appointment, score, matching comment previews)] for the requested page,
+    total number of matching visible appointments (at most the candidate cap))
+    """
+    reason_hits = await db.appointments.find(
+        text_filter(visible_query, search),
+        {"score": TEXT_SCORE},
+    ).sort([("score", TEXT_SCORE)]).limit(SEARCH_MAX_CANDIDATES).to_list(length=SEARCH_MAX_CANDIDATES)
+
+    comment_query = {"$text": {"$search": search}}
+    if visible_query:
+        # Patients and most doctors see few appointments: restrict the comment search to them,
+        # so matches on other people's appointments cannot crowd theirs out of the candidates
+        visible = await db.appointments.find(visible_query, {"_id": 1}).limit(
+            SEARCH_MAX_CANDIDATES + 1
+        ).to_list(length=SEARCH_MAX_CANDIDATES + 1)
+        if len(visible) <= SEARCH_MAX_CANDIDATES:
+            comment_query["appointment_id"] = {"$in": [str(a["_id"]) for a in visible]}
+
+    comment_hits = await db.comments.find(
+        comment_query,
+        {"score": TEXT_SCORE, "appointment_id": 1, "user_name": 1, "user_role": 1, "content": 1, "timestamp": 1},
+    ).sort([("score", TEXT_SCORE)]).limit(SEARCH_MAX_CANDIDATES).to_list(length=SEARCH_MAX_CANDIDATES)
+
+    appointments: Dict[str, dict] = {str(a["_id"]): a for a in reason_hits}
+    scores: Dict[str, float] = {str(a["_id"]): a["score"] for a in reason_hits}
+    matching_comments: Dict[str, List[dict]] = {}
+
+    # Appointments found only through their comments still have to pass the visibility filter
+    missing = {c["appointment_id"] for c in comment_hits} - appointments.keys()
+    missing_ids = [ObjectId(i) for i in missing if ObjectId.is_valid(i)]
+    if missing_ids:
+        async for appointment in db.appointments.find(merge_filters(visible_query, {"_id": {"$in": missing_ids}})):
+            appointments[str(appointment["_id"])] = appointment
+
+    for comment in comment_hits:
+        appointment_id = comment["appointment_id"]
+        if appointment_id not in appointments:
+            continue
+        scores[appointment_id] = scores.get(appointment_id, 0.0) + comment["score"]
+        previews = matching_comments.setdefault(appointment_id, [])
+        if len(previews) < SEARCH_COMMENTS_PER_HIT:
+            previews.append(comment_preview(comment))
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    page = [
+        (appointments[appointment_id], score, matching_comments.get(appointment_id, []))
+        for appointment_id, score in ranked[offset:offset + limit]
+    ]
+    return page, len(ranked)
+
+
+def next_offset(offset: int, limit: int, total: int) -> Optional[int]:
+    return offset + limit if offset + limit < total else None
@@ -0,0 +1,158 @@
+"""
+Sync Service Module
+Change tracking behind the delta-sync endpoint (GET /api/appointments/changes).
+
+Every write to an appointment stamps it with change_seq, drawn from one counter document,
+and changed_at. Deleting an appointment leaves a tombstone with the same two fields in
+appointment_tombstones, where a TTL index keeps it for TOMBSTONE_RETENTION_DAYS.
+A client keeps the sync token of its last response and receives everything stamped after it.
+
+Sequence numbers are allocated before the write that uses them commits, so a higher number
+can become visible before a lower one. A change is therefore only handed out once it is
+SYNC_SETTLE_SECONDS old, by which time every earlier number has been written.
+"""
+import base64
+import json
+import os
+from datetime import datetime, timedelta
+from typing import List, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+from fastapi import HTTPException, status
+from dotenv import load_dotenv
+
+from app.utils.pagination import merge_filters
+
+load_dotenv()
+
+COUNTERS_COLLECTION = "counters"
+TOMBSTONES_COLLECTION = "appointment_tombstones"
+APPOINTMENT_SEQUENCE = "appointments"
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+SYNC_SETTLE_SECONDS = float(os.getenv("SYNC_SETTLE_SECONDS", "2"))
+# Tokens older than this may predate purged tombstones and must not be honoured
+SYNC_TOKEN_MAX_AGE = timedelta(days=TOMBSTONE_RETENTION_DAYS) - timedelta(hours=1)
+
+
+async def next_change_seq(db: AsyncIOMotorDatabase, count: int = 1) -> int:
+    """Reserve `count` consecutive sequence numbers, returning the first one"""
+    counter = await db[COUNTERS_COLLECTION].find_one_and_update(
+        {"_id": APPOINTMENT_SEQUENCE},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return counter["seq"] - count + 1
+
+
+async def current_change_seq(db: AsyncIOMotorDatabase) -> int:
+    counter = await db[COUNTERS_COLLECTION].find_one({"_id": APPOINTMENT_SEQUENCE})
+    return counter["seq"] if counter else 0
+
+
+def change_fields(seq: int, now: datetime) -> dict:
+    """Fields to $set on an appointment for every write"""
+    return {"change_seq": seq, "changed_at": now}
+
+
+async def record_tombstones(db: AsyncIOMotorDatabase, appointments: List[dict], now: datetime):
+    """
+    Leave a tombstone for each deleted appointment (documents need _id, patient_id and doctor_id)
+    Upserts: a delete and a user-deletion cascade racing on the same appointment both succeed,
+    and the first tombstone written is kept.
+    """
+    if not appointments:
+        return
+    first_seq = await next_change_seq(db, len(appointments))
+    await db[TOMBSTONES_COLLECTION].bulk_write([
+        UpdateOne(
+            {"_id": appointment["_id"]},
+            {"$setOnInsert": {
+                "patient_id": appointment["patient_id"],
+                "doctor_id": appointment["doctor_id"],
+                "change_seq": first_seq + offset,
+                "deleted_at": now,
+            }},
+            upsert=True,
+        )
+        for offset, appointment in enumerate(appointments)
+    ], ordered=False)
+
+
+def encode_sync_token(seq: int, issued_at: datetime) -> str:
+    payload = json.dumps({"seq": seq, "at": issued_at.isoformat()}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_sync_token(token: str, now: datetime) -> int:
+    """
+    Return the sequence number of a token produced by encode_sync_token
+    Raises 400 if it is malformed and 410 if it is too old to sync from
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        seq, issued_at = int(payload["seq"]), datetime.fromisoformat(payload["at"])
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync token",
+        )
+    if now - issued_at > SYNC_TOKEN_MAX_AGE:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Sync token expired, reload all appointments",
+        )
+    return seq
+
+
+def tombstone_query(visible_query: dict, current_user: dict) -> dict:
+    """
+    Scope tombstones like appointments; a doctor also sees deletions of their own
+    appointments, whose patient may have left their panel with the delete
+    """
+    if current_user["role"] == "doctor":
+        return {"$or": [visible_query, {"doctor_id": str(current_user["_id"])}]}
+    return visible_query
+
+
+async def load_changes(
+    db: AsyncIOMotorDatabase,
+    visible_query: dict,
+    deleted_query: dict,
+    since: int,
+    limit: int,
+    now: datetime,
+) -> Tuple[List[dict], List[dict], int, bool]:
+    """
+    Appointments and tombstones stamped after `since`, in sequence order, at most `limit` in total
+    Returns (appointments, tombstones, last sequence number returned, has_more)
+    """
+    after = {"change_seq": {"$gt": since}}
+    appointments = await db.appointments.find(
+        merge_filters(visible_query, after)
+    ).sort("change_seq", 1).to_list(length=limit + 1)
+    tombstones = await db[TOMBSTONES_COLLECTION].find(
+        merge_filters(deleted_query, after)
+    ).sort("change_seq", 1).to_list(length=limit + 1)
+
+    settled_before = now - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    merged = sorted(
+        [(a["change_seq"], a.get("changed_at"), "appointment", a) for a in appointments]
+        + [(t["change_seq"], t["deleted_at"], "tombstone", t) for t in tombstones],
+        key=lambda change: change[0],
+    )
+
+    changed, deleted = [], []
+    last_seq = since
+    has_more = False
+    for seq, changed_at, kind, document in merged:
+        if changed_at is not None and changed_at > settled_before:
+            # Not settled yet: stop here and hand it out on a later poll
+            break
+        if len(changed) + len(deleted) >= limit:
+            has_more = True
+            break
+        (changed if kind == "appointment" else deleted).append(document)
+        last_seq = seq
+    return changed, deleted, last_seq, has_more
@@ -0,0 +1,135 @@
+"""
+User Service Module
+User directory pages and prefix search over user names and emails for the patient and doctor pickers.
+Both only read USER_PROJECTION, so password hashes never leave MongoDB.
+
+Every user document carries search_terms: the words of its name and its full email,
+lowercased and stripped of accents. A search term matches when it starts with a word
+of the query, which MongoDB answers with an anchored, case-sensitive regex on the
+search_terms_role index (a tight index range, not a scan). Writes that create users
+set the field; users written outside the API get it from backfill_search_terms at startup.
+"""
+import re
+import unicodedata
+from typing import List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.utils.pagination import encode_cursor, keyset_filter, keyset_sort, merge_filters
+
+# Matches read from the index before ranking
+TYPEAHEAD_CANDIDATES = 50
+TYPEAHEAD_DEFAULT_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 25
+# The only fields a picker needs; never the password hash
+USER_PROJECTION = {"name": 1, "email": 1, "role": 1}
+
+WORD_SEPARATOR = re.compile(r"[^0-9a-z]+")
+
+
+def directory_query(role: Optional[str]) -> dict:
+    return {"role": role} if role else {}
+
+
+async def load_directory_page(
+    db: AsyncIOMotorDatabase,
+    role: Optional[str],
+    limit: int,
+    cursor: Optional[str],
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of users ordered by (name, _id), served by the role_name / name indexes
+    Returns (users, cursor of the next page or None)
+    """
+    query = merge_filters(directory_query(role), keyset_filter("name", cursor, descending=False))
+    users = await db.users.find(query, USER_PROJECTION).sort(
+        keyset_sort("name", descending=False)
+    ).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1]["name"], users[-1]["_id"])
+    return users, next_cursor
+
+
+async def count_users(db: AsyncIOMotorDatabase, role: Optional[str]) -> int:
+    return await db.users.count_documents(directory_query(role))
+
+
+def normalize(text: str) -> str:
+    """Lowercase and strip accents so "José" is found by "jose" """
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def search_terms(name: str, email: str) -> List[str]:
+    words = [word for word in WORD_SEPARATOR.split(normalize(name)) if word]
+    return list(dict.fromkeys(words + [normalize(email)]))
+
+
+def user_search_fields(name: str, email: str) -> dict:
+    """Fields to store on a user document so it can be found by search_users"""
+    return {"search_terms": search_terms(name, email)}
+
+
+def typeahead_query(prefix: str, role: Optional[str] = None) -> Optional[dict]:
+    """
+    Query matching users with a search term starting with every word of prefix
+    (or, when prefix looks like an email, with the whole of it). None if prefix has no words.
+    """
+    text = normalize(prefix).strip()
+    words = [text] if "@" in text else [word for word in WORD_SEPARATOR.split(text) if word]
+    if not words:
+        return None
+    clauses = [{"search_terms": {"$regex": f"^{re.escape(word)}"}} for word in dict.fromkeys(words)]
+    query = clauses[0] if len(clauses) == 1 else {"$and": clauses}
+    if role:
+        query = {**query, "role": role}
+    return query
+
+
+def rank_key(prefix: str):
+    """Names starting with the query first, then alphabetical"""
+    text = normalize(prefix).strip()
+
+    def key(user: dict):
+        name = normalize(user["name"])
+        return (not name.startswith(text), name, str(user["_id"]))
+
+    return key
+
+
+async def search_users(
+    db: AsyncIOMotorDatabase,
+    prefix: str,
+    role: Optional[str] = None,
+    limit: int = TYPEAHEAD_DEFAULT_LIMIT,
+) -> List[dict]:
+    """Top `limit` users matching prefix, projected to USER_PROJECTION"""
+    query = typeahead_query(prefix, role)
+    if query is None:
+        return []
+    candidates = await db.users.find(query, USER_PROJECTION).limit(
+        max(limit, TYPEAHEAD_CANDIDATES)
+    ).to_list(length=max(limit, TYPEAHEAD_CANDIDATES))
+    return sorted(candidates, key=rank_key(prefix))[:limit]
+
+
+async def backfill_search_terms(db: AsyncIOMotorDatabase, batch_size: int = 1000) -> int:
+    """Set search_terms on users that lack it; returns the number of users updated"""
+    updated = 0
+    batch = []
+    async for user in db.users.find({"search_terms": {"$exists": False}}, {"name": 1, "email": 1}):
+        batch.append(UpdateOne(
+            {"_id": user["_id"]},
+            {"$set": user_search_fields(user.get("name", ""), user.get("email", ""))},
+        ))
+        if len(batch) >= batch_size:
+            await db.users.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        await db.users.bulk_write(batch, ordered=False)
+        updated += len(batch)
+    return updated
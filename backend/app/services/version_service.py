@@ -0,0 +1,103 @@
+"""
+Version Service Module
+Per-scope version counters behind the conditional list endpoints (ETag / If-None-Match).
+
+A scope names a set of list results that change together:
+- "appointments": every appointment (receptionist/admin lists, doctor panels)
+- "appointments:patient:<id>": the appointments of one patient
+- "appointments:doctor:<id>": the bookings of one doctor (keys cached availability)
+- "users": the user directory
+Every write route bumps the scopes it touches after its write. A list request reads only
+the counters of its scope, so an unchanged list is answered with 304 without querying
+the appointments, comments or users collections.
+
+The same versions key list_cache, the in-process cache of list results: a write on any
+worker changes the versions and so the key, and bump_scopes also drops this worker's
+entries of the written scopes right away.
+"""
+import hashlib
+import os
+from typing import Dict, Iterable, List
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+
+from app.utils.cache import ReadThroughCache
+
+load_dotenv()
+
+VERSIONS_COLLECTION = "list_versions"
+APPOINTMENTS_SCOPE = "appointments"
+USERS_SCOPE = "users"
+
+list_cache = ReadThroughCache(
+    "lists",
+    max_size=int(os.getenv("LIST_CACHE_SIZE", "1000")),
+    ttl_seconds=float(os.getenv("LIST_CACHE_TTL_SECONDS", "30")),
+)
+
+
+def patient_scope(patient_id: str) -> str:
+    return f"{APPOINTMENTS_SCOPE}:patient:{patient_id}"
+
+
+def doctor_scope(doctor_id: str) -> str:
+    return f"{APPOINTMENTS_SCOPE}:doctor:{doctor_id}"
+
+
+def appointment_scopes(*patient_ids: str, doctor_ids: Iterable[str] = ()) -> List[str]:
+    """Scopes changed by writing appointments of the given patients (and doctors)"""
+    return (
+        [APPOINTMENTS_SCOPE]
+        + [patient_scope(patient_id) for patient_id in dict.fromkeys(patient_ids) if patient_id]
+        + [doctor_scope(doctor_id) for doctor_id in dict.fromkeys(doctor_ids) if doctor_id]
+    )
+
+
+def list_scopes(current_user: dict) -> List[str]:
+    """Scopes the current user's appointment list depends on"""
+    if current_user["role"] == "patient":
+        return [patient_scope(str(current_user["_id"]))]
+    return [APPOINTMENTS_SCOPE]
+
+
+def visibility_key(current_user: dict) -> tuple:
+    """Users with the same key see the same appointment list (all receptionists and admins share one)"""
+    if current_user["role"] in ("patient", "doctor"):
+        return (current_user["role"], str(current_user["_id"]))
+    return ("all",)
+
+
+async def bump_scopes(db: AsyncIOMotorDatabase, scopes: Iterable[str]):
+    """Increment the counters of the given scopes with one round trip"""
+    scopes = list(dict.fromkeys(scopes))
+    if not scopes:
+        return
+    await db[VERSIONS_COLLECTION].bulk_write(
+        [UpdateOne({"_id": scope}, {"$inc": {"version": 1}}, upsert=True) for scope in scopes],
+        ordered=False,
+    )
+    list_cache.invalidate(scopes)
+
+
+async def bump_all_scopes(db: AsyncIOMotorDatabase):
+    """Invalidate every list at once (after bulk loads that bypass the API)"""
+    await db[VERSIONS_COLLECTION].update_many({}, {"$inc": {"version": 1}})
+    await bump_scopes(db, [APPOINTMENTS_SCOPE, USERS_SCOPE])
+    list_cache.clear()
+
+
+async def get_scope_versions(db: AsyncIOMotorDatabase, scopes: List[str]) -> Dict[str, int]:
+    versions = {scope: 0 for scope in scopes}
+    async for counter in db[VERSIONS_COLLECTION].find({"_id": {"$in": scopes}}):
+        versions[counter["_id"]] = counter["version"]
+    return versions
+
+
+def list_etag(versions: Dict[str, int], *request_parts) -> str:
+    """
+    Strong ETag of a list response: the scope versions plus everything else that shapes
+    the response (caller identity, filters, pagination, media type)
+    """
+    key = repr((sorted(versions.items()), request_parts))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
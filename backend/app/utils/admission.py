@@ -0,0 +1,184 @@
+"""
+Login admission control
+Every login attempt costs a bcrypt check (~250 ms of a core), so a credential-stuffing burst
+can keep all cores of a worker busy and make real users wait behind it. Before any password
+work, login_admission:
+- counts attempts per email and per client IP over a sliding window, and refuses an email or
+  IP past its limit (a successful login clears its email's count). The client IP is read from
+  X-Forwarded-For as written by the TRUSTED_PROXY_HOPS proxies in front of the API; while that
+  is not configured the per-IP limit is off, since every request would seem to come from the
+  load balancer;
+- caps the password checks running at once on the worker; a login that cannot get a slot
+  within LOGIN_ADMISSION_WAIT_SECONDS is refused rather than queued.
+Refusals are 429 with Retry-After. Counters are per worker, like the caches.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Optional
+from fastapi import HTTPException, Request, status
+from dotenv import load_dotenv
+
+from app.utils.executor import cpu_executor
+
+load_dotenv()
+
+LOGIN_WINDOW_SECONDS = float(os.getenv("LOGIN_WINDOW_SECONDS", "60"))
+LOGIN_MAX_ATTEMPTS_PER_EMAIL = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_EMAIL", "10"))
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_IP", "30"))
+# Proxies in front of the API that append to X-Forwarded-For (API Gateway, ALB, nginx...);
+# 0 = clients connect directly, unset = client IPs unknown and the per-IP limit off
+TRUSTED_PROXY_HOPS = int(os.environ["TRUSTED_PROXY_HOPS"]) if os.getenv("TRUSTED_PROXY_HOPS", "").strip() else None
+# Enough to keep every executor thread busy with one check waiting behind it, no more
+LOGIN_MAX_CONCURRENT_HASHES = int(os.getenv("LOGIN_MAX_CONCURRENT_HASHES", str(2 * cpu_executor.max_workers)))
+LOGIN_ADMISSION_WAIT_SECONDS = float(os.getenv("LOGIN_ADMISSION_WAIT_SECONDS", "0.5"))
+# Keys tracked per counter; the least recently seen are forgotten first
+LOGIN_MAX_TRACKED_KEYS = 100_000
+
+
+def client_ip(request: Request, trusted_hops: Optional[int] = TRUSTED_PROXY_HOPS) -> Optional[str]:
+    """
+    Address of the client, or None when it cannot be trusted (trusted_hops unset)
+    Each proxy appends the address it received the request from, so with n proxies the client
+    is the n-th entry from the right; anything further left was sent by the client itself.
+    """
+    if trusted_hops is None:
+        return None
+    peer = request.client.host if request.client else None
+    if trusted_hops == 0:
+        return peer
+    forwarded = [entry.strip() for entry in request.headers.get("x-forwarded-for", "").split(",") if entry.strip()]
+    if len(forwarded) < trusted_hops:
+        # Did not pass through every proxy (e.g. a health check): the peer is the client
+        return peer
+    return forwarded[-trusted_hops]
+
+
+class SlidingWindowCounter:
+    """Attempts per key over the last window_seconds, keeping one timestamp per attempt"""
+
+    def __init__(self, name: str, limit: int, window_seconds: float, max_keys: int = LOGIN_MAX_TRACKED_KEYS):
+        self.name = name
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self.attempts: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self.rejected = 0
+
+    def hit(self, key: str, now: Optional[float] = None) -> Optional[float]:
+        """
+        Record an attempt for key if it is under its limit
+        Returns None when allowed, else the seconds until the oldest attempt leaves the window
+        """
+        now = time.monotonic() if now is None else now
+        attempts = self.attempts.get(key)
+        if attempts is None:
+            attempts = self.attempts[key] = deque()
+        self.attempts.move_to_end(key)
+        while attempts and attempts[0] <= now - self.window_seconds:
+            attempts.popleft()
+        if len(attempts) >= self.limit:
+            self.rejected += 1
+            return attempts[0] + self.window_seconds - now
+        attempts.append(now)
+        while len(self.attempts) > self.max_keys:
+            self.attempts.popitem(last=False)
+        return None
+
+    def reset(self, key: str):
+        self.attempts.pop(key, None)
+
+    def clear(self):
+        self.attempts.clear()
+        self.rejected = 0
+
+
+class LoginAdmission:
+    def __init__(
+        self,
+        per_email: int = LOGIN_MAX_ATTEMPTS_PER_EMAIL,
+        per_ip: int = LOGIN_MAX_ATTEMPTS_PER_IP,
+        window_seconds: float = LOGIN_WINDOW_SECONDS,
+        max_concurrent: int = LOGIN_MAX_CONCURRENT_HASHES,
+        wait_seconds: float = LOGIN_ADMISSION_WAIT_SECONDS,
+    ):
+        self.emails = SlidingWindowCounter("email", per_email, window_seconds)
+        self.ips = SlidingWindowCounter("ip", per_ip, window_seconds)
+        self.max_concurrent = max_concurrent
+        self.wait_seconds = wait_seconds
+        self.running = 0
+        self.waiting = 0
+        self.slot_freed = asyncio.Condition()
+        self.admitted = 0
+        self.rejected_busy = 0
+
+    def check(self, email: str, ip: Optional[str]):
+        """Record a login attempt; raises 429 if its email or IP is over its limit"""
+        retry_after = self.ips.hit(ip) if ip else None
+        if retry_after is None:
+            retry_after = self.emails.hit(email.lower())
+        if retry_after is not None:
+            raise too_many_requests("Too many login attempts, try again later", retry_after)
+
+    def succeeded(self, email: str):
+        self.emails.reset(email.lower())
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the max_concurrent password-check slots; raises 429 if none frees up in time"""
+        if self.running >= self.max_concurrent:
+            self.waiting += 1
+            try:
+                async with self.slot_freed:
+                    await asyncio.wait_for(
+                        self.slot_freed.wait_for(lambda: self.running < self.max_concurrent),
+                        self.wait_seconds,
+                    )
+            except asyncio.TimeoutError:
+                self.rejected_busy += 1
+                raise too_many_requests("Too many logins in progress, try again", 1)
+            finally:
+                self.waiting -= 1
+        self.running += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            async with self.slot_freed:
+                self.slot_freed.notify()
+
+    def clear(self):
+        self.emails.clear()
+        self.ips.clear()
+        self.admitted = 0
+        self.rejected_busy = 0
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self.running,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected_busy": self.rejected_busy,
+            "rejected_email": self.emails.rejected,
+            "rejected_ip": self.ips.rejected,
+            "tracked_emails": len(self.emails.attempts),
+            "tracked_ips": len(self.ips.attempts),
+            # None: per-IP limit off
+            "trusted_proxy_hops": TRUSTED_PROXY_HOPS,
+        }
+
+
+def too_many_requests(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+login_admission = LoginAdmission()
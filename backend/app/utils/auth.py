@@ -1,3 +1,4 @@
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -5,22 +6,47 @@ import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
 import os
 from dotenv import load_dotenv
 
 from app.database import get_db
 from app.models.user import UserModel
 from app.schemas.user import TokenData
+from app.utils.cache import ReadThroughCache
+from app.utils.executor import ExecutorBusy, cpu_executor
+from app.utils.tokens import remember_claims, revocations, token_cache, token_hash
 
 load_dotenv()
 
 # JWT Secret Key (NOT AWS credentials)
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-jwt-secret-key-change-this-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+# Stateless auth (opt-in): access tokens carry uid/name/role and requests are authorized from
+# the verified claims alone, without reading the user. A role change or deletion then takes
+# effect when the short-lived access token expires and the client refreshes it.
+STATELESS_AUTH = os.getenv("STATELESS_AUTH", "false").lower() in ("1", "true", "yes")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(
+    os.getenv("STATELESS_ACCESS_TOKEN_EXPIRE_MINUTES", "5")
+    if STATELESS_AUTH
+    else os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+)
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+REFRESH_TOKEN_TYPE = "refresh"
 
 security = HTTPBearer()
 
+# Authenticated users by token subject (email), so most requests skip the users lookup.
+# Writes on this worker invalidate entries right away (invalidate_users); other workers
+# see a role change or deletion within USER_CACHE_TTL_SECONDS.
+user_cache = ReadThroughCache(
+    "users",
+    max_size=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("USER_CACHE_TTL_SECONDS", "30")),
+)
+# Cached for subjects with no user, so a token for a deleted account does not query MongoDB each time
+UNKNOWN_USER = object()
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     # Truncate password to 72 bytes if needed (bcrypt limitation)
@@ -40,13 +66,60 @@ def get_password_hash(password: str) -> str:
     return hashed.decode('utf-8')
 
 
+async def run_password_work(fn, *args):
+    """Run a bcrypt call on cpu_executor so the event loop keeps serving other requests"""
+    try:
+        return await cpu_executor.run(fn, *args)
+    except ExecutorBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, try again",
+            headers={"Retry-After": "1"},
+        )
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    """verify_password off the event loop, for async routes"""
+    return await run_password_work(verify_password, plain_password, hashed_password)
+
+
+async def hash_password(password: str) -> str:
+    """get_password_hash off the event loop, for async routes"""
+    return await run_password_work(get_password_hash, password)
+
+
+def token_claims(user: dict) -> dict:
+    """Identity claims of an access token (uid/name/role are what stateless auth authorizes from)"""
+    return {"sub": user["email"], "role": user["role"], "uid": str(user["_id"]), "name": user["name"]}
+
+
+def create_refresh_token(user: dict) -> str:
+    """Long-lived token accepted only by POST /api/auth/refresh"""
+    return create_access_token(
+        {"sub": user["email"], "type": REFRESH_TOKEN_TYPE},
+        expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+
+
+def refresh_token_subject(payload: dict) -> str:
+    """Return the email of verified refresh-token claims, raising 401 for any other token"""
+    if payload.get("type") != REFRESH_TOKEN_TYPE or not payload.get("sub"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload["sub"]
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # jti makes every token unique, so revoking one never revokes another issued in the same second
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -61,25 +134,78 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        role: str = payload.get("role")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email, role=role)
-    except JWTError:
+    token = credentials.credentials
+    payload = await verify_token(db, token)
+    email: str = payload.get("sub")
+    role: str = payload.get("role")
+    if email is None or payload.get("type") == REFRESH_TOKEN_TYPE:
         raise credentials_exception
+    token_data = TokenData(email=email, role=role)
 
-    user = await db.users.find_one({"email": token_data.email})
+    if STATELESS_AUTH and payload.get("uid") and payload.get("name") and role:
+        # Authorized from the verified claims; tokens issued before the claims existed fall through
+        return {"_id": payload["uid"], "email": email, "name": payload["name"], "role": role}
 
-    if user is None:
+    user = await load_user(db, token_data.email)
+
+    if user is UNKNOWN_USER:
         raise credentials_exception
 
-    # Convert ObjectId to string for JSON serialization
-    user["_id"] = str(user["_id"])
-    return user
+    # Callers get their own copy of the cached document
+    return dict(user)
+
+
+async def verify_token(db: AsyncIOMotorDatabase, token: str) -> dict:
+    """
+    Claims of a valid, unrevoked token, from token_cache when it was verified before
+    Raises 401 for invalid or revoked tokens and 503 when revocations cannot be checked
+    """
+    try:
+        await revocations.ensure_fresh(db)
+    except PyMongoError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Could not check token revocation, try again",
+        )
+
+    key = token_hash(token)
+    if key in revocations:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    payload = token_cache.lookup(key)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        remember_claims(key, payload)
+    return payload
+
+
+async def load_user(db: AsyncIOMotorDatabase, email: str):
+    """The user with this email (without password hash) through user_cache, or UNKNOWN_USER"""
+    async def load():
+        user = await db.users.find_one({"email": email}, {"hashed_password": 0})
+        if user is None:
+            return UNKNOWN_USER
+        # Convert ObjectId to string for JSON serialization
+        user["_id"] = str(user["_id"])
+        return user
+
+    return await user_cache.get_or_load(email, load, tags=[email])
+
+
+def invalidate_users(*emails: str):
+    """Drop cached users (and cached misses) after a write to their documents"""
+    user_cache.invalidate(emails)
 
 
 def require_role(*allowed_roles: str):
@@ -0,0 +1,131 @@
+"""
+In-process read-through cache
+LRU with a per-entry TTL; entries carry tags so writes can drop exactly the entries they affect.
+Concurrent misses for the same key are coalesced: one loader runs and every caller awaits its result.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+
+class ReadThroughCache:
+    def __init__(self, name: str, max_size: int, ttl_seconds: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, tags, value)
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.loading: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Bumped by invalidate(): a load that started before an invalidation may have read
+        # the old data, so its result is returned to its waiters but not cached
+        self.generation = 0
+        CACHES.append(self)
+
+    def get(self, key: Hashable):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[2]
+
+    def lookup(self, key: Hashable):
+        """get() that counts towards the hit/miss statistics, for callers that fill the cache with put()"""
+        value = self.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value, tags: Iterable[Hashable] = (), ttl_seconds: Optional[float] = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.entries[key] = (time.monotonic() + ttl, frozenset(tags), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], tags: Iterable[Hashable] = ()):
+        """Return the cached value for key, or run loader() once for all concurrent callers and cache it"""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self.loading.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, loader, tuple(tags)))
+            self.loading[key] = task
+        # Shielded so a caller that goes away does not cancel the load the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], tags: tuple):
+        generation = self.generation
+        try:
+            value = await loader()
+            if value is not None and generation == self.generation:
+                self.put(key, value, tags)
+            return value
+        finally:
+            # invalidate() may have detached this load and a newer one may be running
+            if self.loading.get(key) is asyncio.current_task():
+                del self.loading[key]
+
+    def invalidate(self, tags: Iterable[Hashable]):
+        """Drop every entry carrying any of the given tags"""
+        tags = set(tags)
+        self.generation += 1
+        # Later lookups start a fresh load instead of joining one that may have read old data
+        self.loading.clear()
+        stale = [key for key, entry in self.entries.items() if entry[1] & tags]
+        for key in stale:
+            del self.entries[key]
+        self.invalidations += len(stale)
+
+    def discard(self, key: Hashable):
+        """
+        Drop one entry stored with put()
+        Unlike invalidate() it neither scans the cache nor touches loads in flight, so it is only
+        safe for keys that are never filled through get_or_load().
+        """
+        if self.entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self.generation += 1
+        self.loading.clear()
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            # Coalesced lookups did not query MongoDB either
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+
+CACHES: List[ReadThroughCache] = []
+
+
+def cache_stats() -> Dict[str, dict]:
+    return {cache.name: cache.stats() for cache in CACHES}
@@ -0,0 +1,76 @@
+"""
+ETag helpers for conditional requests (If-Match / If-None-Match)
+"""
+from typing import List, Optional
+from fastapi import HTTPException, status
+
+
+def make_etag(value) -> str:
+    """Format a strong ETag"""
+    return f'"{value}"'
+
+
+def parse_etags(header: Optional[str]) -> List[str]:
+    """Split an If-Match / If-None-Match header into bare ETag values ('*' is kept as is)"""
+    if not header:
+        return []
+    values = []
+    for part in header.split(","):
+        part = part.strip()
+        if part.startswith("W/"):
+            part = part[2:]
+        part = part.strip('"')
+        if part:
+            values.append(part)
+    return values
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header matches the given ETag (as made by make_etag)"""
+    values = parse_etags(if_none_match)
+    return "*" in values or etag.strip('"') in values
+
+
+def version_filter(if_match: Optional[str]) -> dict:
+    """
+    Translate an If-Match header into a query fragment on the document "version" field
+    Documents written before versioning have no version field and count as version 0
+    """
+    values = parse_etags(if_match)
+    if not values or "*" in values:
+        return {}
+
+    try:
+        versions = [int(value) for value in values]
+    except ValueError:
+        # An ETag we never issued can never match
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Precondition failed: resource has been modified",
+        )
+
+    return match_versions(versions)
+
+
+def match_versions(versions: List[int]) -> dict:
+    """Query fragment matching any of the given versions (0 also matches unversioned documents)"""
+    versions = list(versions)
+    if 0 in versions:
+        versions.append(None)
+    return {"version": {"$in": versions}}
+
+
+async def raise_missing_or_conflict(collection, document_id, if_match: Optional[str], not_found_detail: str):
+    """
+    Called when a conditional write matched nothing: tell a missing document (404)
+    apart from a stale If-Match (412). Only runs on the failure path.
+    """
+    if if_match and await collection.count_documents({"_id": document_id}, limit=1):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Precondition failed: resource has been modified",
+        )
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=not_found_detail,
+    )
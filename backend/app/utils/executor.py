@@ -0,0 +1,134 @@
+"""
+Bounded executor for CPU-bound work (bcrypt hashing and checks)
+A call made directly in an async route holds the event loop for its whole run, so every other
+request of the worker waits, /health included. CpuExecutor runs such calls on a small thread
+pool instead: bcrypt releases the GIL while it hashes, so the loop keeps serving other requests.
+
+The number of calls admitted (running plus queued) is capped. Past the cap, run() raises
+ExecutorBusy at once instead of letting the queue and its latency grow without bound.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class ExecutorBusy(Exception):
+    """The executor's queue is full; the call was not started"""
+
+
+class CpuExecutor:
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        # Calls allowed to wait for a free thread
+        self.max_queue = max_queue
+        self.pool: Optional[ThreadPoolExecutor] = None
+        # Admitted calls that have not finished (running + queued)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        # Calls abandoned by their caller before they started
+        self.cancelled = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.run_seconds = 0.0
+        EXECUTORS.append(self)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self.pool
+
+    async def run(self, fn: Callable, *args):
+        """Run fn(*args) on the pool and return its result; raises ExecutorBusy when the queue is full"""
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ExecutorBusy(f"{self.name} executor is saturated ({self.in_flight} calls in flight)")
+
+        loop = asyncio.get_running_loop()
+        submitted_at = time.monotonic()
+        timing = {}
+
+        def timed():
+            timing["started"] = time.monotonic()
+            try:
+                return fn(*args)
+            finally:
+                timing["ran"] = time.monotonic() - timing["started"]
+
+        def done(future):
+            # Runs on completion, error and cancellation (including while still queued)
+            waited = timing.get("started", time.monotonic()) - submitted_at
+            try:
+                # Account from the loop thread; the counters are not shared with the pool
+                loop.call_soon_threadsafe(self._finished, waited, timing.get("ran"), future.cancelled())
+            except RuntimeError:
+                # Loop already closed (shutdown): nothing left to account for
+                pass
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.submitted += 1
+        future = self._pool().submit(timed)
+        future.add_done_callback(done)
+        try:
+            # Cancelling the caller cancels a queued call; a running one holds its slot until it returns
+            return await asyncio.wrap_future(future)
+        except Exception:
+            self.failed += 1
+            raise
+
+    def _finished(self, waited: float, ran: Optional[float], cancelled: bool):
+        self.in_flight -= 1
+        if cancelled:
+            self.cancelled += 1
+            return
+        self.completed += 1
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self.run_seconds += ran or 0.0
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": max(0, self.in_flight - self.max_workers),
+            "peak_in_flight": self.peak_in_flight,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+            "avg_wait_ms": round(self.wait_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+            "avg_run_ms": round(self.run_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+        }
+
+
+EXECUTORS: List[CpuExecutor] = []
+
+
+def executor_stats() -> Dict[str, dict]:
+    return {executor.name: executor.stats() for executor in EXECUTORS}
+
+
+# Password hashing and checks of this worker; a bcrypt call takes ~250 ms of one core
+cpu_executor = CpuExecutor(
+    "cpu",
+    max_workers=int(os.getenv("CPU_EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    max_queue=int(os.getenv("CPU_EXECUTOR_MAX_QUEUE", "64")),
+)
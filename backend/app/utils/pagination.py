@@ -0,0 +1,71 @@
+"""
+Keyset (cursor) pagination helpers
+Cursors are opaque url-safe strings encoding the sort key of the last item on a page.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple, Union
+from bson import ObjectId
+from fastapi import HTTPException, status
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(sort_value: Union[datetime, str], document_id) -> str:
+    # Datetimes under "v" (the original format, so issued cursors stay valid), strings under "s"
+    if isinstance(sort_value, datetime):
+        payload = {"v": sort_value.isoformat(), "id": str(document_id)}
+    else:
+        payload = {"s": sort_value, "id": str(document_id)}
+    encoded = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(encoded.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Union[datetime, str], ObjectId]:
+    """Decode a cursor produced by encode_cursor, raising 400 if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if "s" in payload:
+            return str(payload["s"]), ObjectId(payload["id"])
+        return datetime.fromisoformat(payload["v"]), ObjectId(payload["id"])
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def keyset_filter(field: str, cursor: Optional[str], descending: bool = True) -> dict:
+    """
+    Build the query fragment that selects documents after the cursor
+    for a sort on (field, _id) in the given direction
+    """
+    if not cursor:
+        return {}
+
+    sort_value, document_id = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    return {
+        "$or": [
+            {field: {op: sort_value}},
+            {field: sort_value, "_id": {op: document_id}},
+        ]
+    }
+
+
+def keyset_sort(field: str, descending: bool = True) -> list:
+    direction = -1 if descending else 1
+    return [(field, direction), ("_id", direction)]
+
+
+def merge_filters(*filters: dict) -> dict:
+    """Combine query fragments with $and, skipping empty ones"""
+    parts = [f for f in filters if f]
+    if not parts:
+        return {}
+    if len(parts) == 1:
+        return parts[0]
+    return {"$and": parts}
@@ -0,0 +1,116 @@
+"""
+Verified-token memoization and token revocation
+
+A client presents the same access token on every request of its lifetime, so the claims of
+a verified token are kept in token_cache, keyed by the SHA-256 of the token, until the
+token's exp. A hit skips the signature check and claim parsing of jwt.decode.
+
+Revoked tokens (POST /api/auth/logout) are recorded in the revoked_tokens collection, which
+a TTL index empties once they would have expired anyway. Each worker mirrors it in memory and
+catches up at most every TOKEN_REVOCATION_REFRESH_SECONDS with one query. Every request is
+checked against the mirror, hit or miss. If the mirror cannot be brought up to date, the
+request is refused (fail closed) rather than served with possibly revoked credentials.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from dotenv import load_dotenv
+
+from app.utils.cache import ReadThroughCache
+
+load_dotenv()
+
+REVOKED_TOKENS_COLLECTION = "revoked_tokens"
+TOKEN_REVOCATION_REFRESH_SECONDS = float(os.getenv("TOKEN_REVOCATION_REFRESH_SECONDS", "5"))
+# Overlap between catch-up queries, covering clock differences between workers
+REVOCATION_CLOCK_SKEW = timedelta(seconds=30)
+
+# Entries expire at their token's exp (put with a per-entry TTL); the default TTL is unused
+token_cache = ReadThroughCache(
+    "tokens",
+    max_size=int(os.getenv("TOKEN_CACHE_SIZE", "10000")),
+    ttl_seconds=3600,
+)
+
+
+def token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def remember_claims(key: str, payload: dict):
+    """Memoize verified claims until the token expires (tokens without exp are not memoized)"""
+    exp = payload.get("exp")
+    if exp is None:
+        return
+    ttl = exp - time.time()
+    if ttl > 0:
+        token_cache.put(key, payload, tags=[key], ttl_seconds=ttl)
+
+
+class RevocationList:
+    """This worker's copy of the revoked_tokens collection"""
+
+    def __init__(self, refresh_seconds: float = TOKEN_REVOCATION_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        # token hash -> expires_at
+        self.revoked: Dict[str, datetime] = {}
+        self.refreshed_at: Optional[float] = None
+        # revoked_at of the last catch-up query, minus the clock skew
+        self.since: Optional[datetime] = None
+        self.lock = asyncio.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.revoked
+
+    async def ensure_fresh(self, db: AsyncIOMotorDatabase):
+        """Catch up with revocations from other workers; raises if MongoDB cannot be read"""
+        if self.refreshed_at is not None and time.monotonic() - self.refreshed_at < self.refresh_seconds:
+            return
+        async with self.lock:
+            if self.refreshed_at is not None and time.monotonic() - self.refreshed_at < self.refresh_seconds:
+                return
+            started = datetime.utcnow()
+            query = {"revoked_at": {"$gte": self.since}} if self.since else {}
+            async for entry in db[REVOKED_TOKENS_COLLECTION].find(query, {"expires_at": 1}):
+                self.add(entry["_id"], entry["expires_at"])
+            self.prune(started)
+            self.since = started - REVOCATION_CLOCK_SKEW
+            self.refreshed_at = time.monotonic()
+
+    def add(self, key: str, expires_at: datetime):
+        # ensure_fresh re-reads the last REVOCATION_CLOCK_SKEW of revocations on every refresh
+        if key in self.revoked:
+            return
+        self.revoked[key] = expires_at
+        # Claims are only ever stored with put(), so dropping the one entry is enough
+        token_cache.discard(key)
+
+    def prune(self, now: datetime):
+        """Expired tokens are rejected by their exp; stop remembering them"""
+        for key in [key for key, expires_at in self.revoked.items() if expires_at <= now]:
+            del self.revoked[key]
+
+    def clear(self):
+        self.revoked.clear()
+        self.refreshed_at = None
+        self.since = None
+
+
+revocations = RevocationList()
+
+
+async def revoke_token(db: AsyncIOMotorDatabase, token: str, payload: dict):
+    """Reject this token from now on, on every worker"""
+    key = token_hash(token)
+    now = datetime.utcnow()
+    expires_at = datetime.utcfromtimestamp(payload["exp"]) if payload.get("exp") else now + timedelta(days=1)
+    await db[REVOKED_TOKENS_COLLECTION].update_one(
+        {"_id": key},
+        {"$set": {"revoked_at": now, "expires_at": expires_at}},
+        upsert=True,
+    )
+    revocations.add(key, expires_at)
@@ -0,0 +1,121 @@
+"""
+Benchmark for the appointment list comment loading.
+Compares the old per-appointment comments query (N+1) with the batched loader
+used by GET /api/appointments, for a growing number of appointments.
+
+Runs against a scratch database (<DATABASE_NAME>_bench) which is dropped afterwards.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+from datetime import datetime
+from bson import ObjectId
+import os
+from dotenv import load_dotenv
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.services.appointment_service import build_appointment_responses, appointment_to_response
+
+load_dotenv()
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "careflowai")
+
+SIZES = [100, 500, 1000, 2000]
+COMMENTS_PER_APPOINTMENT = 3
+REPEATS = 3
+
+
+async def seed(db, count):
+    """Insert `count` appointments with a few comments each"""
+    await db.appointments.delete_many({})
+    await db.comments.delete_many({})
+
+    appointments = []
+    comments = []
+    for i in range(count):
+        appointment_id = ObjectId()
+        appointments.append({
+            "_id": appointment_id,
+            "patient_id": str(ObjectId()),
+            "patient_name": f"Patient {i}",
+            "doctor_id": str(ObjectId()),
+            "doctor_name": f"Dr. {i}",
+            "date": "2025-01-01",
+            "time": "09:00",
+            "reason": "Benchmark",
+            "status": "scheduled",
+            "created_at": datetime.utcnow(),
+            "updated_at": None,
+        })
+        for j in range(COMMENTS_PER_APPOINTMENT):
+            comments.append({
+                "_id": ObjectId(),
+                "appointment_id": str(appointment_id),
+                "user_id": str(ObjectId()),
+                "user_name": "Benchmark",
+                "user_role": "doctor",
+                "content": f"Comment {j}",
+                "timestamp": datetime.utcnow(),
+            })
+
+    await db.appointments.insert_many(appointments)
+    await db.comments.insert_many(comments)
+    await db.comments.create_index([("appointment_id", 1), ("timestamp", 1)])
+
+
+async def list_n_plus_one(db):
+    """The original implementation: one comments query per appointment"""
+    appointments = await db.appointments.find({}).sort("created_at", -1).to_list(length=None)
+    response = []
+    for appointment in appointments:
+        comments = await db.comments.find({"appointment_id": str(appointment["_id"])}).to_list(length=None)
+        response.append(appointment_to_response(appointment, comments))
+    return response
+
+
+async def list_batched(db):
+    """The current implementation: one batched comments query for the whole page"""
+    appointments = await db.appointments.find({}).sort("created_at", -1).to_list(length=None)
+    return await build_appointment_responses(db, appointments)
+
+
+async def best_of(fn, db):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        await fn(db)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+async def run_benchmark():
+    client = AsyncIOMotorClient(MONGODB_URL)
+    bench_db_name = f"{DATABASE_NAME}_bench"
+    db = client[bench_db_name]
+
+    print(f"Connected to MongoDB at {MONGODB_URL}")
+    print(f"Using scratch database: {bench_db_name}")
+    print()
+    print(f"{'appointments':>12} | {'N+1 (ms)':>10} | {'batched (ms)':>12} | {'speedup':>7}")
+    print("-" * 52)
+
+    try:
+        for size in SIZES:
+            await seed(db, size)
+            before = await best_of(list_n_plus_one, db)
+            after = await best_of(list_batched, db)
+            print(f"{size:>12} | {before:>10.1f} | {after:>12.1f} | {before / after:>6.1f}x")
+    finally:
+        await client.drop_database(bench_db_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
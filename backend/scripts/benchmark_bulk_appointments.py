@@ -0,0 +1,113 @@
+"""
+Throughput benchmark: POST /api/appointments (one request per appointment)
+versus POST /api/appointments/bulk (one request per batch).
+
+Requires a running backend, `pip install -r requirements-bench.txt` and a
+doctor/receptionist/admin account, e.g.:
+    python scripts/benchmark_bulk_appointments.py --email receptionist@test.com --password password123
+Every appointment created by the benchmark is deleted again at the end.
+"""
+
+import argparse
+import time
+from datetime import date, timedelta
+import requests
+
+API_BASE_URL = "http://localhost:8000"
+# Each appointment gets its own 30-minute slot (08:00-18:00), so none is refused as a double booking
+SLOTS_PER_DAY = 20
+FIRST_DAY = date(2099, 1, 1)
+
+
+def login(base_url, email, password, role):
+    response = requests.post(
+        f"{base_url}/api/auth/login",
+        json={"email": email, "password": password, "role": role},
+        timeout=30,
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def make_appointment(i, doctor_id):
+    minutes = 8 * 60 + (i % SLOTS_PER_DAY) * 30
+    return {
+        "patient_id": "benchmark-patient",
+        "patient_name": "Benchmark Patient",
+        "doctor_id": doctor_id,
+        "doctor_name": "Dr. Benchmark",
+        "date": (FIRST_DAY + timedelta(days=i // SLOTS_PER_DAY)).isoformat(),
+        "time": f"{minutes // 60:02d}:{minutes % 60:02d}",
+        "reason": f"Bulk benchmark {i}",
+    }
+
+
+def run_single(session, base_url, count, ids):
+    """Create count appointments one request each; created IDs are appended to ids as they come"""
+    start = time.perf_counter()
+    for i in range(count):
+        response = session.post(
+            f"{base_url}/api/appointments", json=make_appointment(i, "benchmark-doctor-single"), timeout=30
+        )
+        response.raise_for_status()
+        ids.append(response.json()["id"])
+    return time.perf_counter() - start
+
+
+def run_bulk(session, base_url, count, batch_size, ordered, ids):
+    start = time.perf_counter()
+    for offset in range(0, count, batch_size):
+        operations = [
+            {"op": "create", "appointment": make_appointment(i, "benchmark-doctor-bulk")}
+            for i in range(offset, min(offset + batch_size, count))
+        ]
+        response = session.post(
+            f"{base_url}/api/appointments/bulk",
+            json={"operations": operations, "ordered": ordered},
+            timeout=120,
+        )
+        response.raise_for_status()
+        ids.extend(r["id"] for r in response.json()["results"] if r["status_code"] == 201)
+    return time.perf_counter() - start
+
+
+def cleanup(session, base_url, ids):
+    for appointment_id in ids:
+        session.delete(f"{base_url}/api/appointments/{appointment_id}", timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-item and bulk appointment creation throughput")
+    parser.add_argument("--url", default=API_BASE_URL)
+    parser.add_argument("--email", default="receptionist@test.com")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--role", default="receptionist")
+    parser.add_argument("--count", type=int, default=500, help="Appointments to create per run")
+    parser.add_argument("--batch-size", type=int, default=250)
+    parser.add_argument("--unordered", action="store_true", help="Send bulk requests with ordered=false")
+    args = parser.parse_args()
+
+    session = requests.Session()
+    session.headers["Authorization"] = f"Bearer {login(args.url, args.email, args.password, args.role)}"
+
+    print(f"Creating {args.count} appointments against {args.url}")
+    print("-" * 60)
+
+    ids = []
+    try:
+        single_time = run_single(session, args.url, args.count, ids)
+        print(f"Single-item route: {single_time:8.2f}s  ({args.count / single_time:8.1f} appointments/s)")
+
+        bulk_time = run_bulk(session, args.url, args.count, args.batch_size, not args.unordered, ids)
+        print(f"Bulk route:        {bulk_time:8.2f}s  ({args.count / bulk_time:8.1f} appointments/s)"
+              f"  batch size {args.batch_size}")
+
+        print("-" * 60)
+        print(f"Speedup: {single_time / bulk_time:.1f}x")
+    finally:
+        print("\nCleaning up benchmark appointments...")
+        cleanup(session, args.url, ids)
+        print("Done.")
+
+if __name__ == "__main__":
+    main()
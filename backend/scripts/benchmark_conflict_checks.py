@@ -0,0 +1,54 @@
+"""
+Micro-benchmark for the in-memory double-booking check (DoctorIntervalIndex).
+Builds one doctor's index with tens of thousands of appointments and times
+overlap lookups. No database needed.
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.scheduling_service import APPOINTMENT_DURATION_MINUTES, DoctorIntervalIndex
+
+SIZES = [1_000, 10_000, 50_000]
+LOOKUPS = 100_000
+
+
+def build_index(count):
+    index = DoctorIntervalIndex()
+    duration = timedelta(minutes=APPOINTMENT_DURATION_MINUTES)
+    start = datetime(2020, 1, 1, 8, 0)
+    for i in range(count):
+        index.add(f"appt-{i}", start, start + duration)
+        start += duration
+        if start.hour >= 17:
+            start = start.replace(hour=8, minute=0) + timedelta(days=1)
+    return index, start
+
+
+def main():
+    duration = timedelta(minutes=APPOINTMENT_DURATION_MINUTES)
+    print(f"{'appointments':>12} | {'build (ms)':>10} | {'lookup (us)':>11}")
+    print("-" * 40)
+    for size in SIZES:
+        start = time.perf_counter()
+        index, last = build_index(size)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        span = (last - datetime(2020, 1, 1)).total_seconds()
+        probes = [datetime(2020, 1, 1) + timedelta(seconds=random.uniform(0, span)) for _ in range(LOOKUPS)]
+        start = time.perf_counter()
+        for probe in probes:
+            index.find_overlap(probe, probe + duration)
+        lookup_us = (time.perf_counter() - start) / LOOKUPS * 1_000_000
+
+        print(f"{size:>12} | {build_ms:>10.1f} | {lookup_us:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark for login admission control during a credential-stuffing burst.
+A burst of wrong-password logins from a few IPs is fired at once while a legitimate user logs
+in from another IP. Without admission control every attempt is queued for a bcrypt check and
+the user waits behind the whole burst; with login_admission, attempts past the per-IP limit
+and the concurrent-check cap are refused at once (429), so the user's latency stays bounded.
+
+Needs no database: the routes are a minimal app around the same password and admission helpers.
+Needs httpx: pip install -r requirements-bench.txt
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from app.utils.admission import login_admission
+from app.utils.auth import check_password, get_password_hash
+from app.utils.executor import cpu_executor
+
+ATTACKER_IPS = 4
+ATTEMPTS_PER_IP = 40
+USER_LOGINS = 5
+USER_INTERVAL = 0.2
+PASSWORD = "password123"
+HASHED = get_password_hash(PASSWORD)
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    async def verify(password: str):
+        if not await check_password(password, HASHED):
+            raise HTTPException(status_code=401, detail="Incorrect email or password")
+
+    @app.post("/login/unguarded")
+    async def login_unguarded(email: str, password: str):
+        await verify(password)
+        return {"ok": True}
+
+    @app.post("/login/admission")
+    async def login_guarded(email: str, password: str, request: Request):
+        login_admission.check(email, request.client.host)
+        async with login_admission.slot():
+            await verify(password)
+        login_admission.succeeded(email)
+        return {"ok": True}
+
+    return app
+
+
+def client_for(app, ip: str) -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=app, client=(ip, 40000))
+    return httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None)
+
+
+async def user_logins(client, path: str):
+    samples, codes = [], Counter()
+    for _ in range(USER_LOGINS):
+        start = time.perf_counter()
+        response = await client.post(path, params={"email": "user@example.com", "password": PASSWORD})
+        samples.append((time.perf_counter() - start) * 1000)
+        codes[response.status_code] += 1
+        await asyncio.sleep(USER_INTERVAL)
+    return samples, codes
+
+
+async def scenario(app, path: str):
+    login_admission.clear()
+    attackers = [client_for(app, f"203.0.113.{i}") for i in range(ATTACKER_IPS)]
+    user = client_for(app, "198.51.100.7")
+    burst = [
+        client.post(path, params={"email": f"victim{n}@example.com", "password": "guess"})
+        for client in attackers
+        for n in range(ATTEMPTS_PER_IP)
+    ]
+    start = time.perf_counter()
+    results = await asyncio.gather(user_logins(user, path), *burst)
+    elapsed = time.perf_counter() - start
+    for client in attackers + [user]:
+        await client.aclose()
+    samples, user_codes = results[0]
+    burst_codes = Counter(response.status_code for response in results[1:])
+    return samples, user_codes, burst_codes, elapsed
+
+
+async def run_benchmark():
+    app = make_app()
+    print(f"{ATTACKER_IPS * ATTEMPTS_PER_IP} wrong-password attempts from {ATTACKER_IPS} IPs, "
+          f"{USER_LOGINS} logins of a real user; {cpu_executor.max_workers} executor threads, "
+          f"{login_admission.max_concurrent} admission slots")
+    print()
+    print(f"{'mode':>10} | {'user p50 (ms)':>13} | {'user max (ms)':>13} | {'user codes':>12} | {'burst codes':>26} | {'total (s)':>9}")
+    print("-" * 100)
+    for mode in ("unguarded", "admission"):
+        samples, user_codes, burst_codes, elapsed = await scenario(app, f"/login/{mode}")
+        print(f"{mode:>10} | {statistics.median(samples):>13.0f} | {max(samples):>13.0f} | "
+              f"{str(dict(user_codes)):>12} | {str(dict(sorted(burst_codes.items()))):>26} | {elapsed:>9.1f}")
+    print()
+    print(f"admission: {login_admission.stats()}")
+    cpu_executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
@@ -0,0 +1,95 @@
+"""
+Benchmark for password hashing during a login burst.
+Probes /health while a burst of concurrent logins checks bcrypt passwords, once with the
+check made inline in the async route (as before) and once through cpu_executor.
+Inline, every check holds the event loop and /health waits behind the whole burst;
+through the executor, /health p99 stays close to its idle value.
+
+Needs no database: the routes are a minimal app around the same password helpers.
+Needs httpx: pip install -r requirements-bench.txt
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from fastapi import FastAPI
+from app.utils.auth import check_password, get_password_hash, verify_password
+from app.utils.executor import cpu_executor
+
+LOGINS = 16
+PROBE_INTERVAL = 0.02
+PASSWORD = "password123"
+HASHED = get_password_hash(PASSWORD)
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.post("/login/inline")
+    async def login_inline():
+        return {"ok": verify_password(PASSWORD, HASHED)}
+
+    @app.post("/login/executor")
+    async def login_executor():
+        return {"ok": await check_password(PASSWORD, HASHED)}
+
+    return app
+
+
+async def probe_health(client, stop: asyncio.Event):
+    """
+    /health every PROBE_INTERVAL; latency runs from when the probe was due, not when it was
+    sent, so probes held back by a blocked event loop count their wait
+    """
+    samples = []
+    due = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        await client.get("/health")
+        samples.append((time.perf_counter() - due) * 1000)
+        due += PROBE_INTERVAL
+    return samples
+
+
+async def burst(client, path: str):
+    """/health latencies (ms) while LOGINS logins run concurrently on `path` (None = idle)"""
+    stop = asyncio.Event()
+    prober = asyncio.ensure_future(probe_health(client, stop))
+    if path:
+        await asyncio.gather(*(client.post(path) for _ in range(LOGINS)))
+    else:
+        await asyncio.sleep(1)
+    stop.set()
+    samples = sorted(await prober)
+    return statistics.median(samples), samples[max(0, int(len(samples) * 0.99) - 1)], samples[-1]
+
+
+async def run_benchmark():
+    transport = httpx.ASGITransport(app=make_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{LOGINS} concurrent logins, bcrypt cost {HASHED.split('$')[2]}, "
+              f"{cpu_executor.max_workers} executor threads")
+        print()
+        print(f"{'/health during':>22} | {'p50 (ms)':>8} | {'p99 (ms)':>8} | {'max (ms)':>8}")
+        print("-" * 56)
+        for label, path in [("idle", None), ("inline bcrypt", "/login/inline"), ("cpu_executor", "/login/executor")]:
+            p50, p99, worst = await burst(client, path)
+            print(f"{label:>22} | {p50:>8.2f} | {p99:>8.2f} | {worst:>8.2f}")
+    print()
+    print(f"executor: {cpu_executor.stats()}")
+    cpu_executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
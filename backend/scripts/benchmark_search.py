@@ -0,0 +1,157 @@
+"""
+Benchmark for appointment search (GET /api/appointments/search).
+Compares a case-insensitive $regex scan over reasons and comments with the text-index
+search of search_service, on 100k appointments with 1M comments.
+
+Runs against a scratch database (<DATABASE_NAME>_bench) which is dropped afterwards.
+"""
+
+import asyncio
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from datetime import datetime
+from bson import ObjectId
+import os
+from dotenv import load_dotenv
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import TEXT
+from app.services.search_service import search_appointments
+from app.utils.pagination import merge_filters
+
+load_dotenv()
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "careflowai")
+
+APPOINTMENTS = 100_000
+COMMENTS_PER_APPOINTMENT = 10
+PATIENTS = 5_000
+BATCH_SIZE = 10_000
+PAGE_SIZE = 20
+REPEATS = 3
+QUERIES = ["migraine", "chest pain", "allergy follow-up", "fracture"]
+
+WORDS = (
+    "checkup fever cough headache rash blood pressure results dosage prescription refill "
+    "scan review diet sleep fatigue therapy vaccine insulin thyroid knee back shoulder"
+).split()
+RARE_WORDS = ["migraine", "chest", "pain", "allergy", "fracture"]
+
+
+def sentence(rng: random.Random, length: int) -> str:
+    words = [rng.choice(WORDS) for _ in range(length)]
+    if rng.random() < 0.01:
+        words[rng.randrange(length)] = rng.choice(RARE_WORDS)
+    return " ".join(words)
+
+
+async def seed(db):
+    """Insert the appointments and their comments in batches"""
+    rng = random.Random(42)
+    patient_ids = [str(ObjectId()) for _ in range(PATIENTS)]
+    appointments, comments = [], []
+
+    async def flush():
+        if appointments:
+            await db.appointments.insert_many(appointments, ordered=False)
+            appointments.clear()
+        if comments:
+            await db.comments.insert_many(comments, ordered=False)
+            comments.clear()
+
+    for i in range(APPOINTMENTS):
+        appointment_id = ObjectId()
+        appointments.append({
+            "_id": appointment_id,
+            "patient_id": rng.choice(patient_ids),
+            "patient_name": f"Patient {i}",
+            "doctor_id": str(ObjectId()),
+            "doctor_name": f"Dr. {i}",
+            "date": "2025-01-01",
+            "time": "09:00",
+            "reason": sentence(rng, 6),
+            "status": "scheduled",
+            "created_at": datetime.utcnow(),
+            "updated_at": None,
+        })
+        for j in range(COMMENTS_PER_APPOINTMENT):
+            comments.append({
+                "appointment_id": str(appointment_id),
+                "user_id": str(ObjectId()),
+                "user_name": "Benchmark",
+                "user_role": "doctor",
+                "content": sentence(rng, 12),
+                "timestamp": datetime.utcnow(),
+            })
+        if len(comments) >= BATCH_SIZE:
+            await flush()
+    await flush()
+
+    await db.appointments.create_index([("reason", TEXT)], name="reason_text")
+    await db.appointments.create_index([("patient_id", 1), ("created_at", -1), ("_id", -1)])
+    await db.comments.create_index([("content", TEXT)], name="content_text")
+    await db.comments.create_index([("appointment_id", 1), ("timestamp", 1)])
+    return patient_ids
+
+
+async def regex_scan(db, visible_query, search):
+    """Naive search: unindexed regex over every reason and comment"""
+    pattern = {"$regex": re.escape(search), "$options": "i"}
+    ids = {a["_id"] async for a in db.appointments.find(merge_filters(visible_query, {"reason": pattern}), {"_id": 1})}
+    comment_ids = {c["appointment_id"] async for c in db.comments.find({"content": pattern}, {"appointment_id": 1})}
+    object_ids = [ObjectId(i) for i in comment_ids]
+    async for appointment in db.appointments.find(merge_filters(visible_query, {"_id": {"$in": object_ids}}), {"_id": 1}):
+        ids.add(appointment["_id"])
+    return ids
+
+
+async def text_search(db, visible_query, search):
+    return await search_appointments(db, visible_query, search, 0, PAGE_SIZE)
+
+
+async def best_of(fn, *args):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        await fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+async def run_benchmark():
+    client = AsyncIOMotorClient(MONGODB_URL)
+    bench_db_name = f"{DATABASE_NAME}_bench"
+    db = client[bench_db_name]
+
+    print(f"Connected to MongoDB at {MONGODB_URL}")
+    print(f"Using scratch database: {bench_db_name}")
+    print(f"Seeding {APPOINTMENTS} appointments with {APPOINTMENTS * COMMENTS_PER_APPOINTMENT} comments...")
+
+    try:
+        await client.drop_database(bench_db_name)
+        patient_ids = await seed(db)
+        scopes = [("receptionist", {}), ("patient", {"patient_id": patient_ids[0]})]
+
+        print()
+        print(f"{'query':>18} | {'scope':>12} | {'regex (ms)':>10} | {'text (ms)':>9} | {'speedup':>7}")
+        print("-" * 70)
+        for search in QUERIES:
+            for scope, visible_query in scopes:
+                before = await best_of(regex_scan, db, visible_query, search)
+                after = await best_of(text_search, db, visible_query, search)
+                print(f"{search:>18} | {scope:>12} | {before:>10.1f} | {after:>9.1f} | {before / after:>6.1f}x")
+    finally:
+        await client.drop_database(bench_db_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
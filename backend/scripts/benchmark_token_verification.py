@@ -0,0 +1,60 @@
+"""
+Benchmark for access-token verification (get_current_user).
+Compares the CPU time of a full jwt.decode (signature check and claim parsing) with a
+memo hit of verify_token, which hashes the token and reads token_cache.
+
+Needs no database: the revocation list is marked fresh so no catch-up query is made.
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from bson import ObjectId
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from jose import jwt
+from app.utils.auth import ALGORITHM, JWT_SECRET_KEY, create_access_token, token_claims, verify_token
+from app.utils.tokens import revocations, token_cache
+
+REQUESTS = 20_000
+ROUNDS = 5
+
+
+def cpu_per_call(fn) -> float:
+    """Median CPU microseconds per call over ROUNDS rounds of REQUESTS calls"""
+    samples = []
+    for _ in range(ROUNDS):
+        start = time.process_time()
+        for _ in range(REQUESTS):
+            fn()
+        samples.append((time.process_time() - start) / REQUESTS * 1_000_000)
+    return statistics.median(samples)
+
+
+def run_benchmark():
+    token = create_access_token(token_claims({
+        "_id": ObjectId(), "email": "bench@example.com", "name": "Bench", "role": "doctor",
+    }))
+    loop = asyncio.new_event_loop()
+    revocations.refreshed_at = float("inf")
+    token_cache.clear()
+    loop.run_until_complete(verify_token(None, token))
+
+    decode = cpu_per_call(lambda: jwt.decode(token, JWT_SECRET_KEY, algorithms=[ALGORITHM]))
+    memo = cpu_per_call(lambda: loop.run_until_complete(verify_token(None, token)))
+    loop.close()
+
+    print(f"{'verification':>14} | {'CPU (us/request)':>16}")
+    print("-" * 34)
+    print(f"{'jwt.decode':>14} | {decode:>16.1f}")
+    print(f"{'memo hit':>14} | {memo:>16.1f}")
+    print(f"speedup: {decode / memo:.1f}x (memo hit includes an event-loop round trip)")
+    print(f"token cache: {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,98 @@
+"""
+Benchmark for the user typeahead (GET /api/auth/users/search).
+Times search_users on 50k users for prefixes of growing length and compares it with
+loading every user of a role, which is what the pickers did before.
+
+Runs against a scratch database (<DATABASE_NAME>_bench) which is dropped afterwards.
+"""
+
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from bson import ObjectId
+import os
+from dotenv import load_dotenv
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING
+from app.services.user_service import search_users, user_search_fields
+
+load_dotenv()
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "careflowai")
+
+USERS = 50_000
+REPEATS = 50
+PREFIXES = ["s", "sa", "sar", "sarah", "sarah jo"]
+FIRST_NAMES = ["Sarah", "Samuel", "John", "Jane", "Michael", "Emily", "Bob", "Maria", "José", "Chen"]
+LAST_NAMES = ["Johnson", "Smith", "Wilson", "Chen", "Davis", "Garcia", "Núñez", "Brown", "Lee", "Khan"]
+
+
+async def seed(db):
+    rng = random.Random(7)
+    users = []
+    for i in range(USERS):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        email = f"{name.lower().replace(' ', '.')}{i}@example.com"
+        users.append({
+            "_id": ObjectId(),
+            "name": name,
+            "email": email,
+            "hashed_password": "x" * 60,
+            "role": "doctor" if i % 10 == 0 else "patient",
+            **user_search_fields(name, email),
+        })
+    await db.users.insert_many(users, ordered=False)
+    await db.users.create_index([("role", ASCENDING)], name="role")
+    await db.users.create_index([("search_terms", ASCENDING), ("role", ASCENDING)], name="search_terms_role")
+
+
+async def timings(fn, *args):
+    samples = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        await fn(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+async def load_role(db, role):
+    return await db.users.find({"role": role}).to_list(length=None)
+
+
+async def run_benchmark():
+    client = AsyncIOMotorClient(MONGODB_URL)
+    bench_db_name = f"{DATABASE_NAME}_bench"
+    db = client[bench_db_name]
+
+    print(f"Connected to MongoDB at {MONGODB_URL}")
+    print(f"Using scratch database: {bench_db_name}")
+
+    try:
+        await client.drop_database(bench_db_name)
+        await seed(db)
+
+        print()
+        print(f"{'query':>22} | {'p50 (ms)':>8} | {'p99 (ms)':>8}")
+        print("-" * 46)
+        for role in ("patient", "doctor"):
+            p50, p99 = await timings(load_role, db, role)
+            print(f"{'all ' + role + 's':>22} | {p50:>8.2f} | {p99:>8.2f}")
+            for prefix in PREFIXES:
+                p50, p99 = await timings(search_users, db, prefix, role, 10)
+                print(f"{repr(prefix) + ' ' + role:>22} | {p50:>8.2f} | {p99:>8.2f}")
+    finally:
+        await client.drop_database(bench_db_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
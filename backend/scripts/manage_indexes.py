@@ -0,0 +1,57 @@
+"""
+Script to check the MongoDB indexes against the registry in app/indexes.py.
+Reports missing, unregistered and unused indexes; --apply creates the missing ones.
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+import os
+from dotenv import load_dotenv
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.indexes import ensure_indexes, index_report
+
+load_dotenv()
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "careflowai")
+
+
+async def main(apply: bool):
+    client = AsyncIOMotorClient(MONGODB_URL)
+    db = client[DATABASE_NAME]
+
+    print(f"Connected to MongoDB at {MONGODB_URL}")
+    print(f"Using database: {DATABASE_NAME}")
+
+    if apply:
+        print("\nCreating missing indexes...")
+        created = await ensure_indexes(db)
+        for collection, names in created.items():
+            print(f"  {collection}: {', '.join(names) or '-'}")
+
+    report = await index_report(db)
+    print()
+    print(f"{'collection':<16} | {'missing':<30} | {'unregistered':<20} | unused")
+    print("-" * 90)
+    for collection, entry in report.items():
+        print(
+            f"{collection:<16} | {', '.join(entry['missing']) or '-':<30} | "
+            f"{', '.join(entry['unregistered']) or '-':<20} | {', '.join(entry['unused']) or '-'}"
+        )
+    print("\n(unused = no accesses recorded by $indexStats since the last server restart)")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report or create the registered MongoDB indexes")
+    parser.add_argument("--apply", action="store_true", help="Create missing indexes before reporting")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.apply))
@@ -0,0 +1,86 @@
+"""
+Script to apply the data migrations registered in app/migrations.py.
+Safe to run while the API is live: documents are migrated in _id-ordered batches paced to a
+target write rate, and an interrupted run resumes from its last checkpoint.
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+import os
+from dotenv import load_dotenv
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.migrations import MIGRATIONS
+from app.services.migration_service import (
+    MIGRATION_BATCH_SIZE,
+    MIGRATION_MAX_WRITES_PER_SECOND,
+    MigrationLocked,
+    migration_status,
+    run_migrations,
+)
+from app.services.version_service import bump_all_scopes
+
+load_dotenv()
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "careflowai")
+
+
+def print_status(status_list):
+    print(f"{'version':>7} | {'name':<28} | {'state':<8} | {'scanned':>9} | {'modified':>9}")
+    print("-" * 74)
+    for entry in status_list:
+        print(
+            f"{entry['version']:>7} | {entry['name']:<28} | {entry['state']:<8} | "
+            f"{entry['scanned']:>9} | {entry['modified']:>9}"
+        )
+
+
+def print_progress(checkpoint):
+    print(f"  {checkpoint['name']}: scanned {checkpoint['scanned']}, modified {checkpoint['modified']}")
+
+
+async def main(args):
+    client = AsyncIOMotorClient(MONGODB_URL)
+    db = client[DATABASE_NAME]
+
+    print(f"Connected to MongoDB at {MONGODB_URL}")
+    print(f"Using database: {DATABASE_NAME}")
+    print()
+
+    try:
+        if not args.status:
+            finished = await run_migrations(
+                db,
+                MIGRATIONS,
+                target=args.target,
+                batch_size=args.batch_size,
+                max_writes_per_second=args.max_writes_per_second,
+                progress=print_progress,
+            )
+            if finished:
+                # Migrated documents may change list responses
+                await bump_all_scopes(db)
+            print(f"Applied {len(finished)} migration(s)\n")
+        print_status(await migration_status(db, MIGRATIONS))
+    except MigrationLocked as e:
+        print(f"Stopped: {e}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply the registered data migrations")
+    parser.add_argument("--status", action="store_true", help="Only report the state of every migration")
+    parser.add_argument("--target", type=int, help="Stop after this migration version")
+    parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE)
+    parser.add_argument(
+        "--max-writes-per-second", type=float, default=MIGRATION_MAX_WRITES_PER_SECOND,
+        help="Target write rate (0 = unthrottled)",
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,42 @@
+"""
+Script to recompute comment_count and last_comment on every appointment from the comments collection.
+Run once after deploying the summary list view (?view=summary), or after comments were written
+outside the API.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+import os
+from dotenv import load_dotenv
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.services.appointment_service import rebuild_comment_summaries
+from app.services.version_service import bump_all_scopes
+
+load_dotenv()
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "careflowai")
+
+
+async def main():
+    client = AsyncIOMotorClient(MONGODB_URL)
+    db = client[DATABASE_NAME]
+
+    print(f"Connected to MongoDB at {MONGODB_URL}")
+    print(f"Using database: {DATABASE_NAME}")
+
+    print("Rebuilding comment summaries from comments...")
+    count = await rebuild_comment_summaries(db)
+    await bump_all_scopes(db)
+    print(f"Comment summaries rebuilt: {count} appointments with comments")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
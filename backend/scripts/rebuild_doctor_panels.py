@@ -0,0 +1,39 @@
+"""
+Script to rebuild the doctor_patients panel collection from existing appointments.
+Run once after deploying the panel index, or any time the panels are suspected to drift.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+import os
+from dotenv import load_dotenv
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.services.panel_service import rebuild_doctor_panels
+
+load_dotenv()
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "careflowai")
+
+
+async def main():
+    client = AsyncIOMotorClient(MONGODB_URL)
+    db = client[DATABASE_NAME]
+
+    print(f"Connected to MongoDB at {MONGODB_URL}")
+    print(f"Using database: {DATABASE_NAME}")
+
+    print("Rebuilding doctor panels from appointments...")
+    count = await rebuild_doctor_panels(db)
+    print(f"Doctor panels rebuilt: {count} doctor/patient pairs")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
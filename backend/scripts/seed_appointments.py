@@ -16,6 +16,9 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.utils.auth import get_password_hash
+from app.services.panel_service import rebuild_doctor_panels
+from app.services.appointment_service import rebuild_comment_summaries
+from app.services.version_service import bump_all_scopes
 
 load_dotenv()
 
@@ -248,6 +251,9 @@ async def seed_database():
     result = await db.appointments.insert_many(appointments)
     print(f"Created {len(appointments)} appointments")
 
+    panel_count = await rebuild_doctor_panels(db)
+    print(f"Rebuilt doctor panels ({panel_count} doctor/patient pairs)")
+
     # Add some sample comments
     print("Creating comments...")
 
@@ -289,6 +295,10 @@ async def seed_database():
     if comments:
         await db.comments.insert_many(comments)
         print(f"Created {len(comments)} comments")
+        await rebuild_comment_summaries(db)
+
+    # Cached list ETags no longer describe the data
+    await bump_all_scopes(db)
 
     # Print summary
     print("\n" + "="*60)
@@ -0,0 +1,93 @@
+"""
+Test login admission control: sliding-window attempt limits and the password-check slot cap
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Request
+
+from app.utils.admission import LoginAdmission, SlidingWindowCounter, client_ip
+
+
+def test_sliding_window_limits_attempts_per_key():
+    counter = SlidingWindowCounter("email", limit=3, window_seconds=60)
+    assert [counter.hit("a", now=t) for t in (0, 10, 20)] == [None, None, None]
+    # The oldest attempt leaves the window at t=60
+    assert counter.hit("a", now=30) == 30
+    assert counter.hit("b", now=30) is None
+    assert counter.hit("a", now=61) is None
+    assert counter.rejected == 1
+
+
+def test_sliding_window_forgets_least_recent_keys():
+    counter = SlidingWindowCounter("ip", limit=1, window_seconds=60, max_keys=2)
+    for key in ("a", "b", "c"):
+        counter.hit(key, now=0)
+    assert list(counter.attempts) == ["b", "c"]
+
+
+def test_email_and_ip_limits_answer_429_with_retry_after():
+    admission = LoginAdmission(per_email=2, per_ip=3, window_seconds=60)
+    admission.check("Sam@x.com", "10.0.0.1")
+    admission.check("sam@x.com", "10.0.0.2")
+    with pytest.raises(HTTPException) as exc_info:
+        admission.check("SAM@x.com", "10.0.0.3")
+    assert exc_info.value.status_code == 429
+    assert 1 <= int(exc_info.value.headers["Retry-After"]) <= 60
+
+    # A successful login clears its email's count
+    admission.succeeded("sam@x.com")
+    admission.check("sam@x.com", "10.0.0.3")
+
+    # Credential stuffing from one IP: different emails, same client
+    for i in range(3):
+        admission.check(f"user{i}@x.com", "10.0.0.9")
+    with pytest.raises(HTTPException):
+        admission.check("user3@x.com", "10.0.0.9")
+    assert admission.stats()["rejected_ip"] == 1 and admission.stats()["rejected_email"] == 1
+
+
+def test_slots_cap_concurrent_checks_and_fail_fast():
+    admission = LoginAdmission(max_concurrent=2, wait_seconds=0.05)
+    release = None
+    peak = []
+
+    async def check():
+        async with admission.slot():
+            peak.append(admission.running)
+            await release.wait()
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        running = [asyncio.ensure_future(check()) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException) as exc_info:
+            await check()
+        # A waiter gets the slot freed while it waits
+        waiter = asyncio.ensure_future(check())
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(*running, waiter)
+        return exc_info.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 429 and rejected.headers["Retry-After"] == "1"
+    assert max(peak) == 2
+    stats = admission.stats()
+    assert stats["admitted"] == 3 and stats["rejected_busy"] == 1 and stats["running"] == 0
+
+
+def test_client_ip_comes_from_the_trusted_proxies_only():
+    def request(forwarded_for=None):
+        headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+        return Request({"type": "http", "headers": headers, "client": ("10.0.0.2", 443)})
+
+    # Client -> API Gateway -> ALB: the client may prepend anything, the proxies append
+    chain = request("6.6.6.6, 203.0.113.7, 10.0.1.9")
+    assert client_ip(chain, trusted_hops=2) == "203.0.113.7"
+    assert client_ip(chain, trusted_hops=0) == "10.0.0.2"
+    # Not configured: every login would seem to come from the load balancer, so no per-IP limit
+    assert client_ip(chain, trusted_hops=None) is None
+    # Health checks and other requests that skip the proxies
+    assert client_ip(request(), trusted_hops=2) == "10.0.0.2"
@@ -0,0 +1,132 @@
+"""
+Test the availability bitmaps: working hours minus booked intervals, decoded per day
+"""
+import asyncio
+from datetime import date, datetime
+
+from bson import ObjectId
+
+from app.services import availability_service
+from app.services.availability_service import (
+    CELLS_PER_DAY,
+    WORKING_HOURS_END,
+    WORKING_HOURS_START,
+    AvailabilityCache,
+    bitmap_to_days,
+    booked_bitmap,
+    get_availability,
+    working_bitmap,
+)
+from app.services.scheduling_service import ConflictDetector, DoctorIntervalIndex, appointment_interval
+from app.services.version_service import VERSIONS_COLLECTION, doctor_scope
+
+MONDAY = date(2025, 1, 6)
+
+
+def test_working_bitmap_skips_weekends():
+    days = bitmap_to_days(working_bitmap(date(2025, 1, 10), 3), date(2025, 1, 10), 3)
+    assert [day["date"] for day in days] == ["2025-01-10", "2025-01-11", "2025-01-12"]
+    assert days[0]["free"] == [{"start": WORKING_HOURS_START, "end": WORKING_HOURS_END}]
+    assert days[1]["free"] == []
+    assert days[2]["free"] == []
+
+
+def test_booked_intervals_are_cut_out_of_working_hours():
+    range_start = datetime.combine(MONDAY, datetime.min.time())
+    intervals = [
+        (*appointment_interval("2025-01-06", "10:00"), "a"),
+        (*appointment_interval("2025-01-06", "10:30"), "b"),
+        (*appointment_interval("2025-01-07", "13:15"), "c"),
+    ]
+    free = working_bitmap(MONDAY, 2) & ~booked_bitmap(intervals, range_start, 2)
+    days = bitmap_to_days(free, MONDAY, 2)
+
+    assert days[0]["free"] == [
+        {"start": WORKING_HOURS_START, "end": "10:00"},
+        {"start": "11:00", "end": WORKING_HOURS_END},
+    ]
+    assert days[1]["free"] == [
+        {"start": WORKING_HOURS_START, "end": "13:15"},
+        {"start": "13:45", "end": WORKING_HOURS_END},
+    ]
+
+
+def test_booked_bitmap_clips_to_range():
+    range_start = datetime.combine(MONDAY, datetime.min.time())
+    intervals = [
+        (datetime(2025, 1, 5, 23, 45), datetime(2025, 1, 6, 0, 15), "before"),
+        (datetime(2025, 1, 6, 23, 45), datetime(2025, 1, 7, 0, 15), "after"),
+    ]
+    bitmap = booked_bitmap(intervals, range_start, 1)
+    assert bitmap.bit_length() <= CELLS_PER_DAY
+    assert bitmap_to_days(bitmap, MONDAY, 1)[0]["free"] == [
+        {"start": "00:00", "end": "00:15"},
+        {"start": "23:45", "end": "24:00"},
+    ]
+
+
+def test_interval_index_version_tracks_changes():
+    index = DoctorIntervalIndex()
+    index.add("a", *appointment_interval("2025-01-06", "10:00"))
+    version = index.version
+    index.remove("missing")
+    assert index.version == version
+    index.remove("a")
+    assert index.version > version
+    assert index.between(datetime(2025, 1, 6), datetime(2025, 1, 7)) == []
+
+
+class FakeCollection:
+    """find() over a list of documents, matching on equality and $in"""
+
+    def __init__(self, documents=()):
+        self.documents = list(documents)
+        self.finds = 0
+
+    def find(self, query, projection=None):
+        self.finds += 1
+
+        def matches(document):
+            return all(
+                document.get(field) in value["$in"] if isinstance(value, dict) else document.get(field) == value
+                for field, value in query.items()
+            )
+
+        async def iterate():
+            for document in [d for d in self.documents if matches(d)]:
+                yield document
+        return iterate()
+
+
+class FakeDb:
+    def __init__(self):
+        self.appointments = FakeCollection()
+        self.versions = FakeCollection()
+
+    def __getitem__(self, name):
+        assert name == VERSIONS_COLLECTION
+        return self.versions
+
+
+def test_bookings_from_other_workers_invalidate_cached_availability(monkeypatch):
+    monkeypatch.setattr(availability_service, "conflict_detector", ConflictDetector(ttl_seconds=3600))
+    monkeypatch.setattr(availability_service, "availability_cache", AvailabilityCache())
+    db = FakeDb()
+
+    def free_on_monday():
+        return asyncio.run(get_availability(db, ["doc-1"], MONDAY, MONDAY))["doc-1"][0]["free"]
+
+    assert free_on_monday() == [{"start": WORKING_HOURS_START, "end": WORKING_HOURS_END}]
+    loads = db.appointments.finds
+    free_on_monday()
+    assert db.appointments.finds == loads
+
+    # Another worker books 10:00 and bumps the doctor's counter
+    db.appointments.documents.append(
+        {"_id": ObjectId(), "doctor_id": "doc-1", "status": "scheduled", "date": "2025-01-06", "time": "10:00"}
+    )
+    db.versions.documents.append({"_id": doctor_scope("doc-1"), "version": 1})
+    assert free_on_monday() == [
+        {"start": WORKING_HOURS_START, "end": "10:00"},
+        {"start": "10:30", "end": WORKING_HOURS_END},
+    ]
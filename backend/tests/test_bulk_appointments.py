@@ -0,0 +1,225 @@
+"""
+Test per-item results of POST /api/appointments/bulk
+"""
+import asyncio
+from collections import Counter
+
+import pytest
+from bson import ObjectId
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+
+from app.routes import appointments as routes
+from app.schemas.appointment import BulkAppointmentRequest
+
+RECEPTIONIST = {"_id": ObjectId(), "role": "receptionist"}
+
+
+class FakeAppointments:
+    """
+    Applies bulk writes like MongoDB: a unique slot_keys index, updates pinned to their version,
+    ordered writes stop at the first error, and a BulkWriteError reports nMatched
+    `before_write` runs just before bulk_write, to make concurrent changes.
+    """
+
+    def __init__(self, documents):
+        self.documents = {document["_id"]: document for document in documents}
+        self.before_write = None
+
+    def find(self, query, projection=None):
+        ids = query["_id"]["$in"]
+
+        async def iterate():
+            for document_id in ids:
+                if document_id in self.documents:
+                    yield dict(self.documents[document_id])
+        return iterate()
+
+    def taken_slots(self, exclude_id=None):
+        return {
+            key
+            for document_id, document in self.documents.items()
+            if document_id != exclude_id
+            for key in document.get("slot_keys") or []
+        }
+
+    async def bulk_write(self, requests, ordered=True):
+        if self.before_write:
+            self.before_write(self)
+        matched, errors = 0, []
+        for index, request in enumerate(requests):
+            if isinstance(request, InsertOne):
+                document = request._doc
+                if set(document.get("slot_keys") or []) & self.taken_slots():
+                    errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key"})
+                else:
+                    self.documents[document["_id"]] = dict(document)
+            else:
+                query, update = request._filter, request._doc
+                document = self.documents.get(query["_id"])
+                if document is None or document.get("version") not in query["version"]["$in"]:
+                    continue
+                slots = update["$set"].get("slot_keys") or []
+                if set(slots) & self.taken_slots(exclude_id=query["_id"]):
+                    errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key"})
+                else:
+                    matched += 1
+                    document.update(update["$set"])
+                    for field in update.get("$unset", {}):
+                        document.pop(field, None)
+                    document["version"] += update["$inc"]["version"]
+            if errors and ordered:
+                break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nMatched": matched})
+        return type("BulkWriteResult", (), {"matched_count": matched})()
+
+
+class FakeDb:
+    def __init__(self, documents=()):
+        self.appointments = FakeAppointments(documents)
+
+
+class FakeConflictDetector:
+    def __init__(self):
+        self.recorded = []
+
+    def record(self, doctor_id, appointment_id, date, time_str, appointment_status):
+        self.recorded.append(appointment_id)
+
+
+@pytest.fixture
+def side_effects(monkeypatch):
+    """Replace the endpoint's collaborators outside the appointments collection; returns what they saw"""
+    seen = {"panel_deltas": Counter(), "detector": FakeConflictDetector()}
+
+    async def next_change_seq(db, count=1):
+        return 1
+
+    async def ensure_bookable(db, doctor_id, date, time_str, appointment_status, exclude_id=None, schedule_changed=True):
+        if appointment_status != "scheduled":
+            return {"slot_keys": None}
+        return {"starts_at": None, "slot_keys": [f"{doctor_id}|{date}T{time_str}"]}
+
+    async def apply_panel_deltas(db, deltas):
+        seen["panel_deltas"].update(deltas)
+
+    async def bump_scopes(db, scopes):
+        pass
+
+    monkeypatch.setattr(routes, "next_change_seq", next_change_seq)
+    monkeypatch.setattr(routes, "ensure_bookable", ensure_bookable)
+    monkeypatch.setattr(routes, "apply_panel_deltas", apply_panel_deltas)
+    monkeypatch.setattr(routes, "bump_scopes", bump_scopes)
+    monkeypatch.setattr(routes, "conflict_detector", seen["detector"])
+    return seen
+
+
+def stored(doctor_id="doc-1", time="10:00", version=1):
+    return {
+        "_id": ObjectId(), "doctor_id": doctor_id, "patient_id": "pat-1", "date": "2025-01-31",
+        "time": time, "status": "scheduled", "version": version,
+        "slot_keys": [f"{doctor_id}|2025-01-31T{time}"],
+    }
+
+
+def create(time, doctor_id="doc-1", patient_id="pat-2"):
+    return {"op": "create", "appointment": {
+        "patient_id": patient_id, "patient_name": "P", "doctor_id": doctor_id,
+        "doctor_name": "D", "date": "2025-01-31", "time": time,
+    }}
+
+
+def cancel(document, version=None):
+    return {"op": "status", "id": str(document["_id"]), "status": "cancelled", "version": version}
+
+
+def run_bulk(db, operations, ordered):
+    request = BulkAppointmentRequest(operations=operations, ordered=ordered)
+    response = asyncio.run(routes.bulk_appointments(request, db=db, current_user=RECEPTIONIST))
+    return response, [result.status_code for result in response.results]
+
+
+def test_ordered_batch_stops_at_a_write_error(side_effects):
+    existing = stored()
+    db = FakeDb([existing])
+    # The second create takes the slot the first one just took: only the unique index sees it
+    response, codes = run_bulk(db, [create("09:00"), create("09:00"), cancel(existing)], ordered=True)
+
+    assert codes == [201, 409, 424]
+    assert (response.created, response.failed, response.skipped) == (1, 1, 1)
+    assert db.appointments.documents[existing["_id"]]["status"] == "scheduled"
+    assert side_effects["panel_deltas"] == Counter({("doc-1", "pat-2"): 1})
+    assert side_effects["detector"].recorded == [response.results[0].id]
+
+
+def test_unordered_batch_attempts_every_operation(side_effects):
+    existing = stored()
+    db = FakeDb([existing])
+    response, codes = run_bulk(db, [create("09:00"), create("09:00"), cancel(existing)], ordered=False)
+
+    assert codes == [201, 409, 200]
+    assert (response.created, response.updated, response.failed, response.skipped) == (1, 1, 1, 0)
+    assert db.appointments.documents[existing["_id"]]["status"] == "cancelled"
+
+
+def test_stale_version_is_412_and_skips_the_rest_when_ordered(side_effects):
+    existing = stored(version=3)
+    db = FakeDb([existing])
+    _, codes = run_bulk(db, [cancel(existing, version=2), create("09:00")], ordered=True)
+    assert codes == [412, 424]
+
+    _, codes = run_bulk(db, [cancel(existing, version=2), create("09:00")], ordered=False)
+    assert codes == [412, 201]
+
+
+def test_update_that_lost_a_race_is_reported_even_alongside_write_errors(side_effects):
+    raced, untouched = stored(time="10:00"), stored(time="11:00")
+    db = FakeDb([raced, untouched])
+
+    def concurrent_write(collection):
+        # Another request wins: same version number as this batch's write would give
+        collection.documents[raced["_id"]]["version"] += 1
+        collection.documents[raced["_id"]]["change_seq"] = 1000
+
+    db.appointments.before_write = concurrent_write
+    # The duplicate create makes bulk_write raise, so matched counts come from the error details
+    response, codes = run_bulk(
+        db, [create("09:00"), create("09:00"), cancel(raced), cancel(untouched)], ordered=False
+    )
+
+    assert codes == [201, 409, 409, 200]
+    assert response.results[2].error == "Appointment was modified concurrently, please retry"
+    assert db.appointments.documents[raced["_id"]]["status"] == "scheduled"
+    assert str(raced["_id"]) not in side_effects["detector"].recorded
+    assert str(untouched["_id"]) in side_effects["detector"].recorded
+
+
+def test_update_that_lost_a_race_without_write_errors(side_effects):
+    raced = stored()
+    db = FakeDb([raced])
+
+    def concurrent_write(collection):
+        collection.documents[raced["_id"]]["version"] += 1
+        collection.documents[raced["_id"]]["change_seq"] = 1000
+
+    db.appointments.before_write = concurrent_write
+    response, codes = run_bulk(db, [cancel(raced), create("09:00")], ordered=True)
+
+    assert codes == [409, 201]
+    assert side_effects["panel_deltas"] == Counter({("doc-1", "pat-2"): 1})
+
+
+def test_overlapping_operations_in_one_batch(side_effects):
+    existing = stored(time="11:00")
+    db = FakeDb([existing])
+    # The fake slot keys of 09:00 and 09:15 differ: only the batch check sees the overlap
+    reschedule = {"op": "update", "id": str(existing["_id"]), "changes": {"time": "09:15"}}
+    response, codes = run_bulk(
+        db, [create("09:00"), create("09:15"), create("09:15", doctor_id="doc-2"), reschedule], ordered=False
+    )
+
+    assert codes == [201, 409, 201, 409]
+    assert "earlier in this batch" in response.results[1].error
+    assert len(db.appointments.documents) == 3
+    assert db.appointments.documents[existing["_id"]]["time"] == "11:00"
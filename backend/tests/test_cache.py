@@ -0,0 +1,102 @@
+"""
+Test the read-through cache: TTL, LRU eviction, tag invalidation and miss coalescing
+"""
+import asyncio
+import time
+
+from app.utils.cache import ReadThroughCache
+
+
+def test_hits_misses_and_ttl():
+    cache = ReadThroughCache("test-ttl", max_size=10, ttl_seconds=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return ["result"]
+
+    async def scenario():
+        assert await cache.get_or_load("key", loader) == ["result"]
+        assert await cache.get_or_load("key", loader) == ["result"]
+        # Expire the entry
+        cache.entries["key"] = (time.monotonic() - 1,) + cache.entries["key"][1:]
+        assert await cache.get_or_load("key", loader) == ["result"]
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_rate"] == round(1 / 3, 4)
+
+
+def test_lru_eviction_and_tag_invalidation():
+    cache = ReadThroughCache("test-lru", max_size=2, ttl_seconds=60)
+    cache.put("a", 1, tags=["appointments"])
+    cache.put("b", 2, tags=["users"])
+    assert cache.get("a") == 1
+    cache.put("c", 3, tags=["appointments"])
+
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+    cache.invalidate(["appointments"])
+    assert cache.get("a") is None
+    assert cache.get("c") is None
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_concurrent_misses_are_coalesced():
+    cache = ReadThroughCache("test-coalesce", max_size=10, ttl_seconds=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"items": []}
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(20)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert cache.stats()["coalesced"] == 19
+
+
+def test_failed_load_is_not_cached():
+    cache = ReadThroughCache("test-failure", max_size=10, ttl_seconds=60)
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    async def scenario():
+        try:
+            await cache.get_or_load("key", failing)
+        except RuntimeError:
+            pass
+        return await cache.get_or_load("key", lambda: asyncio.sleep(0, result="ok"))
+
+    assert asyncio.run(scenario()) == "ok"
+    assert not cache.loading
+
+
+def test_load_racing_an_invalidation_is_not_cached():
+    cache = ReadThroughCache("test-race", max_size=10, ttl_seconds=60)
+    state = {"role": "patient"}
+
+    async def loader():
+        role = state["role"]
+        await asyncio.sleep(0.01)
+        return {"role": role}
+
+    async def scenario():
+        stale = asyncio.ensure_future(cache.get_or_load("user", loader, tags=["user"]))
+        await asyncio.sleep(0.001)
+        # The write lands while the first load is in flight
+        state["role"] = "doctor"
+        cache.invalidate(["user"])
+        assert (await stale)["role"] == "patient"
+        return await cache.get_or_load("user", loader, tags=["user"])
+
+    assert asyncio.run(scenario())["role"] == "doctor"
+    assert cache.get("user") == {"role": "doctor"}
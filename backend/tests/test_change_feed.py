@@ -0,0 +1,117 @@
+"""
+Test change feed fan-out: role-based visibility and slow-client overflow
+"""
+import asyncio
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.services.change_feed import ChangeFeed
+
+NOW = datetime(2025, 1, 6, 9, 0)
+
+
+def appointment(patient_id: str, doctor_id: str = "doc-1") -> dict:
+    return {
+        "_id": ObjectId(),
+        "patient_id": patient_id,
+        "patient_name": "Patient",
+        "doctor_id": doctor_id,
+        "doctor_name": "Doctor",
+        "date": "2025-01-06",
+        "time": "09:00",
+        "reason": "Checkup",
+        "status": "scheduled",
+        "created_at": NOW,
+        "updated_at": NOW,
+    }
+
+
+def change(operation: str, collection: str, document: dict, before: dict = None) -> dict:
+    event = {
+        "operationType": operation,
+        "ns": {"db": "careflowai", "coll": collection},
+        "documentKey": {"_id": document["_id"]},
+    }
+    if operation != "delete":
+        event["fullDocument"] = document
+    if before is not None:
+        event["fullDocumentBeforeChange"] = before
+    return event
+
+
+def drain(subscription) -> list:
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+def test_events_follow_role_visibility():
+    feed = ChangeFeed()
+    patient = feed.subscribe({"_id": "patient-1", "role": "patient"})
+    other_patient = feed.subscribe({"_id": "patient-2", "role": "patient"})
+    receptionist = feed.subscribe({"_id": "rec-1", "role": "receptionist"})
+    doctor = feed.subscribe({"_id": "doc-2", "role": "doctor"})
+    doctor.panel = {"patient-1"}
+
+    appt = appointment("patient-1")
+    asyncio.run(feed.dispatch(None, change("insert", "appointments", appt)))
+
+    for subscription in (patient, receptionist, doctor):
+        (event,) = drain(subscription)
+        assert event["operation"] == "insert"
+        assert event["id"] == str(appt["_id"])
+        assert event["data"]["patient_id"] == "patient-1"
+        assert "comments" not in event["data"]
+    assert drain(other_patient) == []
+
+
+def test_comment_events_use_the_appointment_owner():
+    feed = ChangeFeed()
+    patient = feed.subscribe({"_id": "patient-1", "role": "patient"})
+    other_patient = feed.subscribe({"_id": "patient-2", "role": "patient"})
+
+    appt = appointment("patient-1")
+    asyncio.run(feed.dispatch(None, change("insert", "appointments", appt)))
+    drain(patient)
+
+    comment = {
+        "_id": ObjectId(),
+        "appointment_id": str(appt["_id"]),
+        "user_id": "doc-1",
+        "user_name": "Doctor",
+        "user_role": "doctor",
+        "content": "Bring previous reports",
+        "timestamp": NOW,
+    }
+    asyncio.run(feed.dispatch(None, change("insert", "comments", comment)))
+
+    (event,) = drain(patient)
+    assert event["collection"] == "comments"
+    assert event["appointment_id"] == str(appt["_id"])
+    assert event["data"]["content"] == "Bring previous reports"
+    assert drain(other_patient) == []
+
+
+def test_deletes_without_pre_image_are_bare_ids():
+    feed = ChangeFeed()
+    patient = feed.subscribe({"_id": "patient-1", "role": "patient"})
+    appt = appointment("patient-9")
+
+    asyncio.run(feed.dispatch(None, change("delete", "appointments", appt)))
+    (event,) = drain(patient)
+    assert event == {"collection": "appointments", "operation": "delete", "id": str(appt["_id"])}
+
+    asyncio.run(feed.dispatch(None, change("delete", "appointments", appt, before=appt)))
+    assert drain(patient) == []
+
+
+def test_slow_subscriber_gets_a_single_reset():
+    feed = ChangeFeed(queue_size=2)
+    receptionist = feed.subscribe({"_id": "rec-1", "role": "receptionist"})
+    for _ in range(5):
+        asyncio.run(feed.dispatch(None, change("insert", "appointments", appointment("patient-1"))))
+
+    assert drain(receptionist) == [None]
+    assert receptionist.overflowed
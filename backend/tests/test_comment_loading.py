@@ -0,0 +1,62 @@
+"""
+Test batched comment loading for appointment lists
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from app.services.appointment_service import load_comments_for_appointments
+
+
+class FakeComments:
+    """Evaluates the $match/$group/$topN pipeline of load_comments_for_appointments; find() is not allowed"""
+
+    def __init__(self, comments):
+        self.comments = comments
+        self.round_trips = 0
+
+    def find(self, *args, **kwargs):
+        raise AssertionError("comments_limit must not query comments per appointment")
+
+    def aggregate(self, pipeline):
+        self.round_trips += 1
+        match, group = pipeline
+        ids = match["$match"]["appointment_id"]["$in"]
+        top = group["$group"]["latest"]["$topN"]
+        sort_by = list(top["sortBy"].items())
+        groups = {}
+        for comment in self.comments:
+            if comment["appointment_id"] in ids:
+                groups.setdefault(comment["appointment_id"], []).append(comment)
+
+        async def results():
+            for appointment_id, comments in groups.items():
+                for field, direction in reversed(sort_by):
+                    comments.sort(key=lambda c: c[field], reverse=direction < 0)
+                yield {"_id": appointment_id, "latest": comments[: top["n"]]}
+        return results()
+
+
+class FakeDb:
+    def __init__(self, comments):
+        self.comments = FakeComments(comments)
+
+
+def test_latest_comments_of_many_appointments_in_one_round_trip():
+    start = datetime(2025, 1, 6, 9, 0)
+    comments = [
+        {"_id": ObjectId(), "appointment_id": f"appt-{i % 3}", "content": str(i), "timestamp": start + timedelta(minutes=i)}
+        for i in range(12)
+    ]
+    db = FakeDb(comments)
+
+    loaded = asyncio.run(load_comments_for_appointments(db, ["appt-0", "appt-1", "appt-empty"], comments_limit=2))
+
+    assert db.comments.round_trips == 1
+    # The latest two of each, oldest first
+    assert [c["content"] for c in loaded["appt-0"]] == ["6", "9"]
+    assert [c["content"] for c in loaded["appt-1"]] == ["7", "10"]
+    assert loaded["appt-empty"] == []
+    assert asyncio.run(load_comments_for_appointments(db, ["appt-0"], comments_limit=0)) == {"appt-0": []}
+    assert db.comments.round_trips == 1
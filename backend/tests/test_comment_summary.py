@@ -0,0 +1,145 @@
+"""
+Test the denormalized comment summary kept on appointment documents
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo.errors import AutoReconnect
+
+from app.routes import appointments as routes
+from app.schemas.appointment import CommentCreate
+from app.services.appointment_service import (
+    COMMENT_PREVIEW_LENGTH,
+    appointment_to_summary,
+    comment_preview,
+    comment_summary_update,
+)
+
+
+def make_comment(content: str) -> dict:
+    return {
+        "_id": ObjectId(),
+        "appointment_id": "appt",
+        "user_id": "doc-1",
+        "user_name": "Dr. X",
+        "user_role": "doctor",
+        "content": content,
+        "timestamp": datetime(2025, 1, 6, 9, 30),
+    }
+
+
+def test_preview_is_truncated_and_ordered_by_timestamp_first():
+    preview = comment_preview(make_comment("x" * 500))
+    # $max compares embedded documents field by field, so timestamp must come first
+    assert list(preview)[0] == "timestamp"
+    assert len(preview["content"]) == COMMENT_PREVIEW_LENGTH
+
+
+def test_comment_summary_update_is_a_single_atomic_update():
+    comment = make_comment("See you soon")
+    update = comment_summary_update(comment)
+    assert update["$inc"] == {"comment_count": 1}
+    assert update["$max"]["last_comment"]["id"] == str(comment["_id"])
+
+
+def test_appointment_to_summary():
+    comment = make_comment("Bring previous reports")
+    appointment = {
+        "_id": ObjectId(),
+        "patient_id": "p1",
+        "patient_name": "Patient",
+        "doctor_id": "doc-1",
+        "doctor_name": "Dr. X",
+        "date": "2025-01-06",
+        "time": "09:00",
+        "status": "scheduled",
+        "comment_count": 3,
+        "last_comment": comment_preview(comment),
+    }
+    summary = appointment_to_summary(appointment)
+    assert summary.comment_count == 3
+    assert summary.last_comment.user_name == "Dr. X"
+    assert not hasattr(summary, "comments")
+
+    # Written before the summary fields existed
+    del appointment["comment_count"], appointment["last_comment"]
+    legacy = appointment_to_summary(appointment)
+    assert legacy.comment_count == 0
+    assert legacy.last_comment is None
+
+
+class FakeComments:
+    def __init__(self, fail=False):
+        self.documents = {}
+        self.fail = fail
+
+    async def insert_one(self, document):
+        if self.fail:
+            raise AutoReconnect("connection lost")
+        self.documents[document["_id"]] = document
+
+    async def delete_one(self, query):
+        self.documents.pop(query["_id"], None)
+
+
+class FakeAppointments:
+    def __init__(self, documents=()):
+        self.documents = {document["_id"]: document for document in documents}
+        self.updates = 0
+
+    async def find_one_and_update(self, query, update, projection=None):
+        self.updates += 1
+        document = self.documents.get(query["_id"])
+        if document is not None:
+            document["comment_count"] = document.get("comment_count", 0) + update["$inc"]["comment_count"]
+        return document
+
+
+class FakeDb:
+    def __init__(self, appointments=(), fail_inserts=False):
+        self.appointments = FakeAppointments(appointments)
+        self.comments = FakeComments(fail_inserts)
+
+
+@pytest.fixture
+def quiet_side_effects(monkeypatch):
+    async def next_change_seq(db, count=1):
+        return 1
+
+    async def bump_scopes(db, scopes):
+        pass
+
+    monkeypatch.setattr(routes, "next_change_seq", next_change_seq)
+    monkeypatch.setattr(routes, "bump_scopes", bump_scopes)
+
+
+AUTHOR = {"_id": ObjectId(), "name": "Dr. X", "role": "doctor"}
+
+
+def add_comment(db, appointment_id):
+    return asyncio.run(routes.add_comment(appointment_id, CommentCreate(content="Hi"), db=db, current_user=AUTHOR))
+
+
+def test_failed_comment_insert_leaves_the_summary_alone(quiet_side_effects):
+    appointment = {"_id": ObjectId(), "patient_id": "p1"}
+    db = FakeDb([appointment], fail_inserts=True)
+    with pytest.raises(AutoReconnect):
+        add_comment(db, str(appointment["_id"]))
+    assert db.appointments.updates == 0
+    assert "comment_count" not in appointment
+
+
+def test_comment_on_missing_appointment_is_not_kept(quiet_side_effects):
+    db = FakeDb()
+    with pytest.raises(HTTPException) as exc_info:
+        add_comment(db, str(ObjectId()))
+    assert exc_info.value.status_code == 404
+    assert db.comments.documents == {}
+
+    appointment = {"_id": ObjectId(), "patient_id": "p1"}
+    db = FakeDb([appointment])
+    add_comment(db, str(appointment["_id"]))
+    assert appointment["comment_count"] == 1 and len(db.comments.documents) == 1
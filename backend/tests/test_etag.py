@@ -0,0 +1,60 @@
+"""
+Test ETag / If-Match / If-None-Match helpers
+"""
+import pytest
+from fastapi import HTTPException
+
+from app.services.version_service import (
+    APPOINTMENTS_SCOPE,
+    appointment_scopes,
+    list_etag,
+    list_scopes,
+    patient_scope,
+)
+from app.utils.etag import etag_matches, make_etag, parse_etags, version_filter
+
+
+def test_parse_etags():
+    assert parse_etags(None) == []
+    assert parse_etags('"3"') == ["3"]
+    assert parse_etags('W/"3", "4"') == ["3", "4"]
+    assert parse_etags("*") == ["*"]
+    assert parse_etags(make_etag(7)) == ["7"]
+
+
+def test_version_filter():
+    assert version_filter(None) == {}
+    assert version_filter("*") == {}
+    assert version_filter('"2"') == {"version": {"$in": [2]}}
+    # Unversioned (legacy) documents count as version 0
+    assert version_filter('"0"') == {"version": {"$in": [0, None]}}
+
+
+def test_version_filter_rejects_foreign_etags():
+    with pytest.raises(HTTPException) as exc_info:
+        version_filter('"abc"')
+    assert exc_info.value.status_code == 412
+
+
+def test_if_none_match():
+    etag = make_etag("abc")
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('W/"abc", "def"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"def"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_list_etag_depends_on_scope_versions_and_request():
+    versions = {APPOINTMENTS_SCOPE: 3}
+    etag = list_etag(versions, "user-1", "receptionist", "scheduled")
+    assert etag == list_etag({APPOINTMENTS_SCOPE: 3}, "user-1", "receptionist", "scheduled")
+    assert etag != list_etag({APPOINTMENTS_SCOPE: 4}, "user-1", "receptionist", "scheduled")
+    assert etag != list_etag(versions, "user-2", "receptionist", "scheduled")
+    assert etag != list_etag(versions, "user-1", "receptionist", None)
+
+
+def test_list_scopes():
+    assert list_scopes({"_id": "p1", "role": "patient"}) == [patient_scope("p1")]
+    assert list_scopes({"_id": "d1", "role": "doctor"}) == [APPOINTMENTS_SCOPE]
+    assert appointment_scopes("p1", "p1", None) == [APPOINTMENTS_SCOPE, patient_scope("p1")]
@@ -0,0 +1,97 @@
+"""
+Test the bounded CPU executor used for password hashing
+"""
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils import auth
+from app.utils.executor import CpuExecutor, ExecutorBusy
+
+
+def test_calls_run_off_the_event_loop():
+    executor = CpuExecutor("test", max_workers=2, max_queue=2)
+
+    async def scenario():
+        loop_thread = threading.get_ident()
+        thread = await executor.run(threading.get_ident)
+        await asyncio.sleep(0.01)
+        return loop_thread, thread
+
+    loop_thread, thread = asyncio.run(scenario())
+    executor.shutdown()
+    assert thread != loop_thread
+    stats = executor.stats()
+    assert stats["submitted"] == 1 and stats["completed"] == 1 and stats["in_flight"] == 0
+
+
+def test_full_queue_rejects_at_once():
+    executor = CpuExecutor("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        admitted = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        with pytest.raises(ExecutorBusy):
+            await executor.run(release.wait)
+        stats = executor.stats()
+        release.set()
+        await asyncio.gather(*admitted)
+        await asyncio.sleep(0.01)
+        return stats
+
+    stats = asyncio.run(scenario())
+    executor.shutdown()
+    assert stats["in_flight"] == 2 and stats["queued"] == 1 and stats["rejected"] == 1
+    assert executor.stats()["completed"] == 2
+
+
+def test_cancelled_queued_call_frees_its_slot():
+    executor = CpuExecutor("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        queued = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.01)
+        # The client went away while its call was still waiting for a thread
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        release.set()
+        await running
+        await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    executor.shutdown()
+    stats = executor.stats()
+    assert stats["in_flight"] == 0
+    assert (stats["submitted"], stats["completed"], stats["cancelled"]) == (2, 1, 1)
+
+
+def test_password_work_goes_through_the_executor(monkeypatch):
+    executor = CpuExecutor("test", max_workers=1, max_queue=0)
+    monkeypatch.setattr(auth, "cpu_executor", executor)
+    # Cheapest bcrypt cost, to keep the test fast
+    gensalt = auth.bcrypt.gensalt
+    monkeypatch.setattr(auth.bcrypt, "gensalt", lambda: gensalt(rounds=4))
+
+    async def scenario():
+        hashed = await auth.hash_password("secret")
+        return hashed, await auth.check_password("secret", hashed), await auth.check_password("wrong", hashed)
+
+    hashed, right, wrong = asyncio.run(scenario())
+    executor.shutdown()
+    assert right and not wrong
+    assert executor.stats()["completed"] == 3
+
+
+def test_saturated_executor_answers_503(monkeypatch):
+    executor = CpuExecutor("test", max_workers=0, max_queue=0)
+    monkeypatch.setattr(auth, "cpu_executor", executor)
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(auth.hash_password("secret"))
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "1"
@@ -0,0 +1,29 @@
+"""
+Test the data migration registry and its write builders
+"""
+import asyncio
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.migrations import MIGRATIONS, set_starts_at
+from app.services.scheduling_service import to_utc
+
+
+def test_versions_are_unique_and_increasing():
+    versions = [migration.version for migration in MIGRATIONS]
+    assert versions == sorted(set(versions))
+    assert all(migration.pending for migration in MIGRATIONS)
+
+
+def test_starts_at_writes_never_replace_a_live_value():
+    good, bad = ObjectId(), ObjectId()
+    requests = asyncio.run(set_starts_at(None, [
+        {"_id": good, "date": "2025-01-31", "time": "9:30 AM"},
+        {"_id": bad, "date": "soon", "time": "later"},
+    ]))
+
+    assert requests[0]._filter == {"_id": good, "starts_at": {"$exists": False}}
+    assert requests[0]._doc == {"$set": {"starts_at": to_utc(datetime(2025, 1, 31, 9, 30))}}
+    # Unparseable dates are marked done with None so they are not scanned again
+    assert requests[1]._doc == {"$set": {"starts_at": None}}
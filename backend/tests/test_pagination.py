@@ -0,0 +1,54 @@
+"""
+Test keyset pagination cursor helpers
+"""
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.utils.pagination import decode_cursor, encode_cursor, keyset_filter, merge_filters
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 1, 2, 3, 4, 5, 678000)
+    document_id = ObjectId()
+
+    assert decode_cursor(encode_cursor(created_at, document_id)) == (created_at, document_id)
+
+
+def test_string_cursor_round_trip():
+    document_id = ObjectId()
+
+    assert decode_cursor(encode_cursor("Dr. Sarah Johnson", document_id)) == ("Dr. Sarah Johnson", document_id)
+    assert keyset_filter("name", encode_cursor("Jane", document_id), descending=False) == {
+        "$or": [
+            {"name": {"$gt": "Jane"}},
+            {"name": "Jane", "_id": {"$gt": document_id}},
+        ]
+    }
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor("not-a-cursor")
+    assert exc_info.value.status_code == 400
+
+
+def test_keyset_filter_seeks_past_cursor():
+    created_at = datetime(2025, 1, 1)
+    document_id = ObjectId()
+
+    assert keyset_filter("created_at", None) == {}
+    assert keyset_filter("created_at", encode_cursor(created_at, document_id)) == {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": document_id}},
+        ]
+    }
+
+
+def test_merge_filters_skips_empty_fragments():
+    assert merge_filters({}, {}) == {}
+    assert merge_filters({"status": "scheduled"}, {}) == {"status": "scheduled"}
+    assert merge_filters({"a": 1}, {"b": 2}) == {"$and": [{"a": 1}, {"b": 2}]}
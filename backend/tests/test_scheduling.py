@@ -0,0 +1,151 @@
+"""
+Test appointment interval normalization and the per-doctor interval index
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import scheduling_service
+from app.services.scheduling_service import (
+    APPOINTMENT_DURATION_MINUTES,
+    SLOT_MINUTES,
+    DoctorIntervalIndex,
+    appointment_interval,
+    apply_schedule_fields,
+    ensure_bookable,
+    load_timezone,
+    parse_appointment_start,
+    parse_range_bound,
+    schedule_fields,
+    slot_keys,
+    starts_at_filter,
+)
+
+
+def test_parse_appointment_start_formats():
+    expected = datetime(2025, 1, 31, 9, 30)
+    assert parse_appointment_start("2025-01-31", "09:30") == expected
+    assert parse_appointment_start("2025-01-31", "9:30 AM") == expected
+    assert parse_appointment_start("01/31/2025", "9:30am") == expected
+    assert parse_appointment_start("2025-01-31", "2:00 PM") == datetime(2025, 1, 31, 14, 0)
+    assert parse_appointment_start("tomorrow", "09:30") is None
+    assert parse_appointment_start("2025-01-31", "morning") is None
+
+
+def test_overlapping_intervals_share_a_slot_key():
+    first = slot_keys("doc", *appointment_interval("2025-01-31", "09:00"))
+    second = slot_keys("doc", *appointment_interval("2025-01-31", f"09:{SLOT_MINUTES:02d}"))
+    other_doctor = slot_keys("other", *appointment_interval("2025-01-31", "09:00"))
+
+    assert set(first) & set(second)
+    assert not set(first) & set(other_doctor)
+    assert len(slot_keys("doc", *appointment_interval("2025-01-31", "09:00"))) == (
+        APPOINTMENT_DURATION_MINUTES // SLOT_MINUTES
+    )
+
+
+def test_adjacent_bookings_do_not_share_a_slot_key():
+    first = slot_keys("doc", *appointment_interval("2025-01-31", "09:00"))
+    second = slot_keys("doc", *appointment_interval("2025-01-31", f"09:{APPOINTMENT_DURATION_MINUTES:02d}"))
+    assert first and second
+    assert not set(first) & set(second)
+
+
+def test_off_grid_overlaps_share_a_slot_key():
+    # Legacy start times off the grid still claim every cell they touch
+    for first_time, second_time in (("09:10", "09:25"), ("09:10", "09:20"), ("09:05", "09:00")):
+        first = slot_keys("doc", *appointment_interval("2025-01-31", first_time))
+        second = slot_keys("doc", *appointment_interval("2025-01-31", second_time))
+        assert set(first) & set(second), (first_time, second_time)
+
+
+def test_new_bookings_must_start_on_the_grid():
+    # Rejected before any lookup
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(ensure_bookable(None, "doc", "2025-01-31", "09:10", "scheduled"))
+    assert exc_info.value.status_code == 400
+    # Off-grid start times are only refused when they are being written
+    fields = asyncio.run(ensure_bookable(None, "doc", "2025-01-31", "09:10", "cancelled"))
+    assert fields["slot_keys"] is None
+
+
+def test_legacy_dates_only_need_parsing_when_they_change():
+    # No lookup is made for an appointment that is not (or no longer) scheduled
+    fields = asyncio.run(ensure_bookable(None, "doc", "Jan 5th", "morning", "cancelled", schedule_changed=False))
+    update = {}
+    apply_schedule_fields(update, fields)
+    assert update == {"$unset": {"slot_keys": ""}}
+
+    # Reassigning the doctor of a legacy appointment leaves its date/time alone
+    fields = asyncio.run(ensure_bookable(None, "doc-2", "next tuesday", "morning", "scheduled", schedule_changed=False))
+    assert fields == {"slot_keys": None}
+
+    # A new date/time must be parseable
+    for appointment_status in ("scheduled", "cancelled"):
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(ensure_bookable(None, "doc", "Jan 5th", "morning", appointment_status))
+        assert exc_info.value.status_code == 400
+
+
+def test_interval_index_finds_overlaps():
+    index = DoctorIntervalIndex()
+    base = datetime(2025, 1, 31, 9, 0)
+    duration = timedelta(minutes=30)
+    index.add("a", base, base + duration)
+    index.add("b", base + 2 * duration, base + 3 * duration)
+
+    assert index.find_overlap(base + duration, base + 2 * duration) is None
+    assert index.find_overlap(base + timedelta(minutes=15), base + timedelta(minutes=45)) == "a"
+    assert index.find_overlap(base, base + duration, exclude_id="a") is None
+
+    index.remove("a")
+    assert index.find_overlap(base, base + duration) is None
+    assert len(index) == 1
+
+
+def test_interval_index_move_replaces_entry():
+    index = DoctorIntervalIndex()
+    base = datetime(2025, 1, 31, 9, 0)
+    index.add("a", base, base + timedelta(minutes=30))
+    index.add("a", base + timedelta(hours=2), base + timedelta(hours=2, minutes=30))
+
+    assert len(index) == 1
+    assert index.find_overlap(base, base + timedelta(minutes=30)) is None
+
+
+def test_starts_at_is_clinic_time_converted_to_utc(monkeypatch):
+    monkeypatch.setattr(scheduling_service, "CLINIC_TIMEZONE", ZoneInfo("America/New_York"))
+    fields = schedule_fields("doc", "2025-01-31", "09:30", "cancelled")
+    assert fields == {"starts_at": datetime(2025, 1, 31, 14, 30), "slot_keys": None}
+    # Summer time
+    assert schedule_fields("doc", "2025-07-01", "09:30", "scheduled")["starts_at"] == datetime(2025, 7, 1, 13, 30)
+
+
+def test_utc_needs_no_tz_database(monkeypatch):
+    def missing(name):
+        raise ZoneInfoNotFoundError(name)
+
+    monkeypatch.setattr(scheduling_service, "ZoneInfo", missing)
+    assert load_timezone("UTC") is timezone.utc
+    assert load_timezone("Etc/UTC") is timezone.utc
+    with pytest.raises(ZoneInfoNotFoundError):
+        load_timezone("Europe/Paris")
+
+
+def test_range_bounds(monkeypatch):
+    monkeypatch.setattr(scheduling_service, "CLINIC_TIMEZONE", ZoneInfo("Europe/Paris"))
+    # A date covers the whole clinic day, `to` inclusive
+    assert parse_range_bound("2025-01-31") == datetime(2025, 1, 30, 23, 0)
+    assert parse_range_bound("2025-01-31", end=True) == datetime(2025, 1, 31, 23, 0)
+    # Explicit offsets win over the clinic time zone
+    assert parse_range_bound("2025-01-31T09:00:00Z") == datetime(2025, 1, 31, 9, 0)
+    assert parse_range_bound(None) is None
+    with pytest.raises(HTTPException) as exc_info:
+        parse_range_bound("next week")
+    assert exc_info.value.status_code == 400
+
+    assert starts_at_filter(None, None) == {}
+    assert starts_at_filter(datetime(2025, 1, 1), None) == {"starts_at": {"$gte": datetime(2025, 1, 1)}}
@@ -0,0 +1,24 @@
+"""
+Test the appointment search helpers and the text index registry keys
+"""
+from app.indexes import _key
+from app.services.search_service import next_offset, text_filter
+
+
+def test_text_filter_keeps_visibility_at_top_level():
+    query = text_filter({"patient_id": "p1"}, "chest pain")
+    assert query == {"patient_id": "p1", "$text": {"$search": "chest pain"}}
+
+
+def test_next_offset_stops_at_total():
+    assert next_offset(0, 20, 45) == 20
+    assert next_offset(40, 20, 45) is None
+    assert next_offset(0, 20, 20) is None
+
+
+def test_text_index_key_matches_server_report():
+    # MongoDB reports a text index as {_fts: "text", _ftsx: 1} plus its weights
+    declared = _key([("reason", "text")])
+    reported = _key([("_fts", "text"), ("_ftsx", 1)], {"reason": 1})
+    assert declared == reported
+    assert _key([("patient_id", 1), ("created_at", -1.0)]) == (("patient_id", 1), ("created_at", -1))
@@ -0,0 +1,83 @@
+"""
+Test delta-sync tokens and tombstones
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import sync_service
+from app.services.sync_service import (
+    SYNC_TOKEN_MAX_AGE,
+    TOMBSTONES_COLLECTION,
+    decode_sync_token,
+    encode_sync_token,
+    record_tombstones,
+    tombstone_query,
+)
+
+NOW = datetime(2025, 1, 6, 9, 0)
+
+
+def test_sync_token_round_trip():
+    assert decode_sync_token(encode_sync_token(42, NOW), NOW) == 42
+    assert decode_sync_token(encode_sync_token(0, NOW), NOW + timedelta(days=1)) == 0
+
+
+def test_invalid_sync_token_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        decode_sync_token("not-a-token", NOW)
+    assert error.value.status_code == 400
+
+
+def test_expired_sync_token_requires_full_reload():
+    token = encode_sync_token(42, NOW - SYNC_TOKEN_MAX_AGE - timedelta(seconds=1))
+    with pytest.raises(HTTPException) as error:
+        decode_sync_token(token, NOW)
+    assert error.value.status_code == 410
+
+
+def test_doctors_see_deletions_of_their_own_appointments():
+    panel_query = {"patient_id": {"$in": ["patient-1"]}}
+    assert tombstone_query(panel_query, {"_id": "doc-1", "role": "doctor"}) == {
+        "$or": [panel_query, {"doctor_id": "doc-1"}]
+    }
+    assert tombstone_query({"patient_id": "patient-1"}, {"_id": "patient-1", "role": "patient"}) == {
+        "patient_id": "patient-1"
+    }
+
+
+class FakeTombstones:
+    """Applies upserts like MongoDB: $setOnInsert only when the _id is new"""
+
+    def __init__(self):
+        self.documents = {}
+
+    async def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            assert request._upsert
+            document_id = request._filter["_id"]
+            if document_id not in self.documents:
+                self.documents[document_id] = dict(request._doc["$setOnInsert"], _id=document_id)
+
+
+def test_racing_deletes_leave_one_tombstone(monkeypatch):
+    seqs = iter([10, 20])
+
+    async def next_change_seq(db, count=1):
+        return next(seqs)
+
+    monkeypatch.setattr(sync_service, "next_change_seq", next_change_seq)
+    tombstones = FakeTombstones()
+    db = {TOMBSTONES_COLLECTION: tombstones}
+    appointment = {"_id": "a1", "patient_id": "patient-1", "doctor_id": "doc-1"}
+
+    async def scenario():
+        # delete_appointment and the delete_user cascade both saw the appointment
+        await record_tombstones(db, [appointment], NOW)
+        await record_tombstones(db, [appointment, {**appointment, "_id": "a2"}], NOW)
+
+    asyncio.run(scenario())
+    assert tombstones.documents["a1"]["change_seq"] == 10
+    assert tombstones.documents["a2"]["change_seq"] == 21
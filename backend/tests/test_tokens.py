@@ -0,0 +1,158 @@
+"""
+Test stateless access-token claims, refresh tokens, token memoization and revocation
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app.utils import auth
+from app.utils.auth import (
+    create_access_token,
+    create_refresh_token,
+    get_current_user,
+    refresh_token_subject,
+    token_claims,
+    verify_token,
+)
+from app.utils.tokens import remember_claims, revocations, revoke_token, token_cache, token_hash
+
+USER = {"_id": ObjectId(), "email": "sam@x.com", "name": "Sam", "role": "doctor"}
+
+
+class FakeRevokedTokens:
+    """In-memory revoked_tokens collection; `down` makes every call fail like an unreachable server"""
+
+    def __init__(self):
+        self.entries = {}
+        self.finds = 0
+        self.down = False
+
+    def find(self, query, projection=None):
+        if self.down:
+            raise ServerSelectionTimeoutError("no servers")
+        self.finds += 1
+        since = query.get("revoked_at", {}).get("$gte", datetime.min)
+        entries = [dict(e, _id=k) for k, e in self.entries.items() if e["revoked_at"] >= since]
+
+        async def iterate():
+            for entry in entries:
+                yield entry
+        return iterate()
+
+    async def update_one(self, query, update, upsert=False):
+        self.entries[query["_id"]] = dict(update["$set"])
+
+
+class FakeDb:
+    def __init__(self):
+        self.revoked_tokens = FakeRevokedTokens()
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    token_cache.clear()
+    revocations.clear()
+    yield
+    token_cache.clear()
+    revocations.clear()
+
+
+def bearer(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def test_stateless_mode_authorizes_from_claims_without_a_lookup(monkeypatch):
+    monkeypatch.setattr(auth, "STATELESS_AUTH", True)
+    token = create_access_token(token_claims(USER))
+    # FakeDb has no users collection: any user lookup would fail
+    user = asyncio.run(get_current_user(bearer(token), db=FakeDb()))
+    assert user == {"_id": str(USER["_id"]), "email": "sam@x.com", "name": "Sam", "role": "doctor"}
+
+
+def test_refresh_tokens_are_not_access_tokens(monkeypatch):
+    monkeypatch.setattr(auth, "STATELESS_AUTH", True)
+    db = FakeDb()
+    refresh_token = create_refresh_token(USER)
+    assert refresh_token_subject(asyncio.run(verify_token(db, refresh_token))) == "sam@x.com"
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(get_current_user(bearer(refresh_token), db=db))
+    assert exc_info.value.status_code == 401
+
+    with pytest.raises(HTTPException) as exc_info:
+        refresh_token_subject(asyncio.run(verify_token(db, create_access_token(token_claims(USER)))))
+    assert exc_info.value.status_code == 401
+
+
+def test_verified_tokens_are_memoized(monkeypatch):
+    db = FakeDb()
+    token = create_access_token(token_claims(USER))
+    decodes = []
+    decode = auth.jwt.decode
+    monkeypatch.setattr(auth.jwt, "decode", lambda *a, **kw: decodes.append(1) or decode(*a, **kw))
+
+    async def scenario():
+        return [await verify_token(db, token) for _ in range(5)]
+
+    payloads = asyncio.run(scenario())
+    assert all(p["sub"] == "sam@x.com" for p in payloads)
+    assert len(decodes) == 1
+    # One catch-up query per refresh interval, not one per request
+    assert db.revoked_tokens.finds == 1
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(verify_token(db, token[:-2] + "xx"))
+    assert exc_info.value.status_code == 401
+
+
+def test_revoked_tokens_are_rejected_on_every_worker():
+    db = FakeDb()
+    token = create_access_token(token_claims(USER))
+
+    async def scenario():
+        payload = await verify_token(db, token)
+        await revoke_token(db, token, payload)
+        with pytest.raises(HTTPException) as exc_info:
+            await verify_token(db, token)
+        assert exc_info.value.detail == "Token has been revoked"
+
+        # Another worker: it memoized the token before the logout, then catches up
+        revocations.clear()
+        token_cache.clear()
+        remember_claims(token_hash(token), payload)
+        with pytest.raises(HTTPException) as exc_info:
+            await verify_token(db, token)
+        assert exc_info.value.status_code == 401
+
+    asyncio.run(scenario())
+
+
+def test_revocation_check_fails_closed():
+    db = FakeDb()
+    db.revoked_tokens.down = True
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(verify_token(db, create_access_token(token_claims(USER))))
+    assert exc_info.value.status_code == 503
+
+
+def test_revocation_drops_only_its_own_token():
+    other = {"sub": "kim@x.com", "exp": 4102444800}
+    remember_claims("other", other)
+    generation, invalidations = token_cache.generation, token_cache.invalidations
+
+    revocations.add("revoked", datetime(2100, 1, 1))
+    remember_claims("revoked", {"sub": "sam@x.com", "exp": 4102444800})
+    # A catch-up query returning the same revocation again leaves the cache alone
+    revocations.add("revoked", datetime(2100, 1, 1))
+
+    assert token_cache.lookup("other") == other
+    assert token_cache.generation == generation
+    assert token_cache.invalidations == invalidations
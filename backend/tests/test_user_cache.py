@@ -0,0 +1,48 @@
+"""
+Test the authenticated-user cache behind get_current_user
+"""
+import asyncio
+
+from bson import ObjectId
+
+from app.utils.auth import UNKNOWN_USER, invalidate_users, load_user, user_cache
+
+
+class FakeUsers:
+    """Counts lookups; just enough of a collection for load_user"""
+
+    def __init__(self, users):
+        self.users = users
+        self.lookups = 0
+
+    async def find_one(self, query, projection=None):
+        self.lookups += 1
+        user = self.users.get(query["email"])
+        return dict(user) if user else None
+
+
+class FakeDb:
+    def __init__(self, users):
+        self.users = FakeUsers(users)
+
+
+def test_users_and_misses_are_cached_until_invalidated():
+    user_cache.clear()
+    db = FakeDb({"a@x.com": {"_id": ObjectId(), "email": "a@x.com", "role": "patient"}})
+
+    async def scenario():
+        first = await load_user(db, "a@x.com")
+        second = await load_user(db, "a@x.com")
+        missing = [await load_user(db, "gone@x.com") for _ in range(3)]
+        return first, second, missing
+
+    first, second, missing = asyncio.run(scenario())
+    assert first["role"] == "patient" and isinstance(first["_id"], str)
+    assert second is first
+    assert all(user is UNKNOWN_USER for user in missing)
+    assert db.users.lookups == 2
+
+    db.users.users["a@x.com"]["role"] = "doctor"
+    invalidate_users("a@x.com")
+    assert asyncio.run(load_user(db, "a@x.com"))["role"] == "doctor"
+    assert db.users.lookups == 3
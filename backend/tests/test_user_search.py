@@ -0,0 +1,31 @@
+"""
+Test the user typeahead terms, queries and ranking
+"""
+from app.services.user_service import rank_key, search_terms, typeahead_query
+
+
+def test_search_terms_are_normalized_name_words_and_email():
+    assert search_terms("Dr. José Núñez", "Jose.Nunez@Hospital.com") == ["dr", "jose", "nunez", "jose.nunez@hospital.com"]
+
+
+def test_every_query_word_must_prefix_a_term():
+    query = typeahead_query("Sarah  JO", "doctor")
+    assert query == {
+        "$and": [{"search_terms": {"$regex": "^sarah"}}, {"search_terms": {"$regex": "^jo"}}],
+        "role": "doctor",
+    }
+
+
+def test_email_queries_match_the_whole_email_with_regex_escaped():
+    assert typeahead_query("s.j@hosp") == {"search_terms": {"$regex": "^s\\.j@hosp"}}
+    assert typeahead_query(" .- ") is None
+
+
+def test_names_starting_with_the_query_rank_first():
+    users = [
+        {"_id": 1, "name": "Dr. Sarah Johnson"},
+        {"_id": 2, "name": "Sam Adams"},
+        {"_id": 3, "name": "Sarah Connor"},
+    ]
+    ranked = sorted(users, key=rank_key("sa"))
+    assert [user["_id"] for user in ranked] == [2, 3, 1]
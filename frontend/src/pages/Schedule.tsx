@@ -44,6 +44,10 @@ export function Schedule() {
     }))
   })
 
+  // GET /api/appointments returns a bare array with ?all=true and a page ({ items, next_cursor }) otherwise
+  const transformAppointments = (data: any): Appointment[] =>
+    (Array.isArray(data) ? data : data.items || []).map(transformAppointment)
+
   // Fetch users for dropdowns
   useEffect(() => {
     const fetchUsers = async () => {
@@ -79,7 +83,7 @@ export function Schedule() {
         const doctorFilter = filterDoctor || undefined
 
         const data = await api.getAppointments(statusFilter, patientFilter, doctorFilter)
-        const transformedData = data.map(transformAppointment)
+        const transformedData = transformAppointments(data)
         setAppointments(transformedData)
       } catch (err: any) {
         console.error('Failed to fetch appointments:', err)
@@ -127,7 +131,7 @@ export function Schedule() {
       const patientFilter = filterPatient || undefined
       const doctorFilter = filterDoctor || undefined
       const data = await api.getAppointments(statusFilter, patientFilter, doctorFilter)
-      const transformedData = data.map(transformAppointment)
+      const transformedData = transformAppointments(data)
       setAppointments(transformedData)
     } catch (err) {
       console.error('Failed to add comment:', err)
@@ -169,7 +173,7 @@ export function Schedule() {
       const patientFilter = filterPatient || undefined
       const doctorFilter = filterDoctor || undefined
       const data = await api.getAppointments(statusFilter, patientFilter, doctorFilter)
-      const transformedData = data.map(transformAppointment)
+      const transformedData = transformAppointments(data)
       setAppointments(transformedData)
 
       setNewAppointment({
@@ -611,6 +615,7 @@ export function Schedule() {
                 </label>
                 <input
                   type="time"
+                  step={900}
                   value={newAppointment.time}
                   onChange={(e) => setNewAppointment({ ...newAppointment, time: e.target.value })}
                   className="w-full bg-gray-900/50 border border-gray-700 rounded-xl px-4 py-3 text-white focus:outline-none focus:ring-2 focus:ring-blue-500 transition-all duration-300 hover:border-gray-600"